@@ -33,53 +33,192 @@ from pathlib import Path
 from bpy_extras.object_utils import object_data_add
 from bpy.app.handlers import persistent
 import re
+from collections import namedtuple
+import hashlib
+import marshal
+import mmap
 
 # Ensemble des éléments de label
 label_elements = {"-txt", ".t", "-line"}
 
+# Rôles d'un objet selon son nom (label, ligne, label de groupe...)
+ROLE_TESTS = (
+    ('LABEL', lambda name: ".t" in name),
+    ('SUBTITLE', lambda name: ".st" in name),
+    ('LINE', lambda name: name.endswith('-line')),
+    ('GROUP', lambda name: name.endswith('.g')),
+    ('ELLIPSIS', lambda name: name.endswith('...')),
+    ('ALWAYS_SHOW', lambda name: 'always_show' in name),
+    ('LABEL_ELEMENT', lambda name: any(x in name for x in label_elements)),
+)
+ROLES = tuple(role for role, test in ROLE_TESTS)
+
+NameInfo = namedtuple('NameInfo', ('roles', 'base', 'suffix'))
+
+# Classification calculée une seule fois par nom : un objet renommé a un
+# nouveau nom, donc une nouvelle entrée
+name_infos = {}
+
+def name_info(name):
+    info = name_infos.get(name)
+    if info is None:
+        roles = frozenset(role for role, test in ROLE_TESTS if test(name))
+        info = name_infos[name] = NameInfo(roles, *split_suffix(name))
+    return info
+
+def has_role(name, role):
+    return role in name_info(name).roles
+
+def is_label(name):
+    return 'LABEL_ELEMENT' in name_info(name).roles
+
+# Index parent -> enfants de tous les objets, construit une fois par fichier
+# et tenu à jour par les handlers depsgraph/undo, pour que family() et
+# family_all() ne coûtent que la taille de leur résultat
+class LabelIndex:
+    def __init__(self):
+        self.children = {}  # nom du parent -> noms de tous ses enfants
+        self.labels = {}  # nom du parent -> noms de ses enfants labels
+        self.parent = {}  # nom de l'objet -> nom de son parent (None si racine)
+        self.roles = {role: set() for role in ROLES}  # rôle -> noms des objets
+        self.collection_groups = {}  # nom de collection -> noms de ses labels de groupe
+        self.valid = False
+
+    def invalidate(self):
+        # Reconstruit au prochain appel (chargement, annulation, renommage)
+        self.valid = False
+
+    def rebuild(self):
+        self.children = {}
+        self.labels = {}
+        self.parent = {}
+        self.roles = {role: set() for role in ROLES}
+        self.collection_groups = {}
+        for ob in bpy.data.objects:
+            self._add(ob.name, ob.parent.name if ob.parent else None)
+        self.valid = True
+
+    def _add(self, name, parent):
+        self.parent[name] = parent
+        for role in name_info(name).roles:
+            self.roles[role].add(name)
+        if parent is not None:
+            self.children.setdefault(parent, set()).add(name)
+            if is_label(name):
+                self.labels.setdefault(parent, set()).add(name)
+
+    def _remove(self, name):
+        for role in name_info(name).roles:
+            self.roles[role].discard(name)
+        parent = self.parent.pop(name, None)
+        if parent is not None:
+            self.children.get(parent, set()).discard(name)
+            self.labels.get(parent, set()).discard(name)
+
+    def update(self, ob):
+        # Appelé pour chaque objet modifié : seul son lien vers le parent est réindexé
+        if not self.valid:
+            return
+        parent = ob.parent.name if ob.parent else None
+        if ob.name not in self.parent or self.parent[ob.name] != parent:
+            self._remove(ob.name)
+            self._add(ob.name, parent)
+            # Un label de groupe apparu ou renommé change les groupes des collections
+            if 'GROUP' in name_info(ob.name).roles:
+                self.collection_groups.clear()
+        # Un objet supprimé ou renommé laisse un nom de trop
+        if len(self.parent) != len(bpy.data.objects):
+            self.valid = False
+
+    def with_role(self, role):
+        # Noms de tous les objets qui ont ce rôle
+        if not self.valid:
+            self.rebuild()
+        return self.roles[role]
+
+    def groups_in(self, collection):
+        # Labels de groupe de la collection (et de ses sous-collections)
+        groups = self.with_role('GROUP')
+        names = self.collection_groups.get(collection.name)
+        if names is None:
+            names = self.collection_groups[collection.name] = {o.name for o in collection.all_objects} & groups
+        return names
+
+    def objects(self, names):
+        # Retrouve les objets par leur nom ; un nom périmé force une reconstruction
+        try:
+            return tuple(bpy.data.objects[name] for name in names)
+        except KeyError:
+            self.rebuild()
+            return None
+
+    def family_all(self, object):
+        if not self.valid or object.name not in self.parent:
+            self.rebuild()
+        names = [object.name]
+        stack = list(self.children.get(object.name, ()))
+        while stack:
+            name = stack.pop()
+            names.append(name)
+            stack.extend(self.children.get(name, ()))
+        return self.objects(names)
+
+    def family(self, object):
+        if not self.valid or object.name not in self.parent:
+            self.rebuild()
+        names = list(self.labels.get(object.name, ())) + [object.name]
+        # Labels de chaque enfant direct, puis labels de ces labels
+        stack = list(self.children.get(object.name, ()))
+        while stack:
+            labels = self.labels.get(stack.pop(), ())
+            names.extend(labels)
+            stack.extend(labels)
+        return self.objects(names)
+
+label_index = LabelIndex()
+
 def family_all(object):
     ''' Object + Grand children without ancestors '''
-    # Initialisation de la famille avec l'objet et ses enfants directs
-    family = [object.children[:] + (object,)]
-
-    # Fonction récursive pour ajouter tous les enfants et petits-enfants
-    def rec(object, family):
-        family[0] += object.children
-        for ob in object.children:
-            rec(ob, family)
-
-    # Appel récursif pour chaque enfant de l'objet
-    for ob in object.children:
-        rec(ob, family)
-
-    # Retourne la famille complète
-    return family.pop()
+    family = label_index.family_all(object)
+    # Index périmé : reconstruit dans objects(), on refait la requête une fois
+    return family if family is not None else label_index.family_all(object)
 
 def family(object):
     ''' Object + Grand children without ancestors (labels only) '''
-    # Fonction interne pour filtrer les enfants qui sont des labels
-    def inner_elements(children):
-        return tuple(ob for ob in children if any(x in ob.name for x in label_elements))
-        # return [ob for ob in children if any(x in ob.name for x in label_elements)]
+    family = label_index.family(object)
+    return family if family is not None else label_index.family(object)
 
-    # Initialisation des labels avec les enfants directs de l'objet
-    labels = inner_elements(object.children)
-    family = [labels + (object,)]
+# Rôles des objets tournés vers la vue
+BILLBOARD_ROLES = {'LABEL', 'ELLIPSIS'}
 
-    # Fonction récursive pour ajouter tous les labels enfants
-    def rec(object, family):
-        labels = inner_elements(object.children)
-        family[0] += labels
-        for ob in labels:
-            rec(ob, family)
+# État du billboarding entre deux passages du timer
+billboard_state = {
+    "rotation": None,  # orientation de la vue déjà appliquée aux labels
+    "labels": [],  # labels visibles au dernier passage
+    "dirty": True,  # visibilité ou objets changés depuis le dernier passage
+}
 
-    # Appel récursif pour chaque enfant de l'objet
-    for ob in object.children:
-        rec(ob, family)
+def touches_visibility(update):
+    # La rotation d'un label par le billboarding ne change pas la visibilité
+    if isinstance(update.id, bpy.types.Object) and update.is_updated_transform and not update.is_updated_geometry:
+        return not (name_info(update.id.name).roles & BILLBOARD_ROLES)
+    return True
 
-    # Retourne la famille complète
-    return family.pop()
+# Handlers pour tenir l'index à jour
+@persistent
+def z_anatomy_depsgraph_update_post(scene, depsgraph):
+    for update in depsgraph.updates:
+        if isinstance(update.id, bpy.types.Object):
+            label_index.update(update.id.original)
+        elif isinstance(update.id, bpy.types.Collection):
+            label_index.collection_groups.clear()
+        if touches_visibility(update):
+            billboard_state["dirty"] = True
 
+@persistent
+def z_anatomy_undo_post(*args):
+    label_index.invalidate()
+    billboard_state["dirty"] = True
 
 import bpy
 
@@ -106,7 +245,7 @@ class OBJECT_OT_hide_wrapper(bpy.types.Operator):
                 if ob in objects_to:
                     objects_to.remove(ob)
                 # if '%' in ob.parent.name:
-                if not any(x in ob.name for x in label_elements):
+                if not is_label(ob.name):
                     return ob
                 if not ob.parent.parent and not self.unselected:
                     return ob
@@ -186,7 +325,7 @@ class OBJECT_OT_hide_view_clear_wrapper(bpy.types.Operator):
             bpy.ops.object.hide_view_clear(select=self.select)
 
         # Masquer les objets avec ".t" dans leur nom, sauf l'objet actif
-        for ob in (o for o in bpy.context.visible_objects if ".t" in o.name and o != context.object):
+        for ob in (o for o in bpy.context.visible_objects if has_role(o.name, 'LABEL') and o != context.object):
             if not ob.parent == context.object:
                 ob.hide_set(True)
                 for child in ob.children:
@@ -561,6 +700,7 @@ class OBJECT_OT_change_label_wrapper(bpy.types.Operator):
 
         # Met à jour le nom de l'objet de ligne
         line_object.name = line_object.data.name = f"{self.custom_label}-line"
+        label_index.invalidate()
 
         return {"FINISHED"}
 
@@ -588,7 +728,7 @@ class OBJECT_OT_local_view_wrapper(bpy.types.Operator):
             while ob and ob.parent:
                 if ob in objects_to:
                     objects_to.remove(ob)
-                if not any(x in ob.name for x in label_elements):
+                if not is_label(ob.name):
                     return ob
                 if not ob.parent.parent:
                     return ob
@@ -643,6 +783,10 @@ import bpy
 
 # Fonction pour nettoyer les noms en enlevant les suffixes spécifiques
 def clean_name(name):
+    info = name_info(name)
+    return info.base, info.suffix
+
+def split_suffix(name):
     for ending in ('.r', '.l', '.t', '.st', '.r.t', '.l.t', '.r-line', '.l-line', '.g', '-line', '.o', '.e', ''):
         if ending == '':
             return name, ending
@@ -675,6 +819,89 @@ def first_n_bytes(string, n=63):
             return out
     return out
 
+# Affecte une propriété seulement si sa valeur change (évite renommages et mises à jour inutiles)
+def set_if_changed(owner, attr, value):
+    if getattr(owner, attr) != value:
+        setattr(owner, attr, value)
+
+# Catalogue des traductions compilé une seule fois par contenu du texte
+# 'Translations' : une colonne de phrases par langue, indexée par nom anglais
+class TranslationCatalog:
+    def __init__(self, languages, keys, columns):
+        self.languages = list(languages)
+        self.keys = list(keys)
+        self.index = {key: row for row, key in enumerate(keys)}
+        self.columns = dict(zip(self.languages[1:], columns))
+        self.names = {}  # langue -> colonne coupée à 63 octets (noms d'objets)
+
+    @classmethod
+    def parse(cls, source):
+        translations = source.splitlines()
+        languages = translations[0].split(';')
+        keys = []
+        columns = [[] for lang in languages[1:]]
+        for line in translations[1:]:
+            phrases = line.split(';')
+            keys.append(phrases[0])
+            for i, column in enumerate(columns, 1):
+                column.append(phrases[i] if i < len(phrases) else None)
+        return cls(languages, keys, columns)
+
+    def dump(self, digest):
+        # L'empreinte du texte source voyage avec le catalogue
+        return marshal.dumps((digest, self.languages, self.keys, [self.columns[lang] for lang in self.languages[1:]]))
+
+    @classmethod
+    def load(cls, path, digest):
+        # Fichier projeté en mémoire : marshal lit directement les pages du fichier
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            stored, languages, keys, columns = marshal.loads(data)
+        # Le nom du fichier ne garde que 16 caractères de l'empreinte : vérifier l'empreinte complète
+        if stored != digest:
+            raise ValueError("translation cache built from another text")
+        return cls(languages, keys, columns)
+
+    def phrase(self, eng_name, lang):
+        row = self.index.get(eng_name)
+        return None if row is None else self.columns[lang][row]
+
+    def name(self, eng_name, lang):
+        row = self.index.get(eng_name)
+        if row is None or self.columns[lang][row] is None:
+            return None
+        names = self.names.get(lang)
+        if names is None:
+            names = self.names[lang] = [None if p is None else first_n_bytes(p) for p in self.columns[lang]]
+        return names[row]
+
+translation_catalogs = {}  # empreinte du contenu -> TranslationCatalog
+
+def translation_catalog(text, sidecar=False):
+    source = text.as_string()
+    digest = hashlib.sha1(source.encode()).hexdigest()
+    catalog = translation_catalogs.get(digest)
+    if catalog is not None:
+        return catalog
+
+    # Fichier cache à côté du .blend, optionnel
+    path = bpy.path.abspath(f"//Translations-{digest[:16]}.cache") if sidecar and bpy.data.filepath else None
+    if path and os.path.exists(path):
+        try:
+            catalog = TranslationCatalog.load(path, digest)
+        except (OSError, ValueError, EOFError, TypeError):
+            catalog = None
+    if catalog is None:
+        catalog = TranslationCatalog.parse(source)
+        if path:
+            try:
+                with open(path, 'wb') as f:
+                    f.write(catalog.dump(digest))
+            except OSError:
+                pass
+    translation_catalogs.clear()
+    translation_catalogs[digest] = catalog
+    return catalog
+
 class OBJECT_OT_translate_atlas(bpy.types.Operator):
     """Translate atlas"""
     bl_idname = "object.translate_atlas"  # Identifiant unique de l'opérateur
@@ -688,75 +915,71 @@ class OBJECT_OT_translate_atlas(bpy.types.Operator):
         default='ID',
         name="Language")  # Propriété pour sélectionner la langue
 
+    use_cache_file: bpy.props.BoolProperty(default=False, name="Cache file")  # Garder le catalogue compilé à côté du .blend
+
     def execute(self, context):
+        # Les noms vont changer : l'index des labels sera reconstruit
+        label_index.invalidate()
+
         if self.lang == "ID":
             # Si la langue est "ID", réinitialiser les noms en anglais
+            bfont = bpy.data.fonts.get('Bfont')
+            if bfont is None:
+                self.report(type={"WARNING"}, message="Font Bfont not found. Add it manually.")
             for ob in bpy.data.objects[:]:
                 if ob.type in {"MESH", "CURVE"}:
                     _, ending = clean_name(ob.name)
                     eng_name, _ = clean_name(ob.data.name)
-                    ob.name = eng_name + ending
+                    set_if_changed(ob, "name", eng_name + ending)
                 elif ob.type == "FONT":
-                    ob.name = ob.data.name
-                    ob.data.body = clean_name(ob.data.name)[0].upper()
-                    ob.data.font = bpy.data.fonts['Bfont']
-                    if not ob.name.endswith('.st'):
+                    set_if_changed(ob, "name", ob.data.name)
+                    set_if_changed(ob.data, "body", clean_name(ob.data.name)[0].upper())
+                    if bfont is not None:
+                        set_if_changed(ob.data, "font", bfont)
+                    if not ob.name.endswith('.st') and abs(ob.data.size - 0.003) > 1e-7:
                         ob.data.size = 0.003
 
             for col in bpy.data.collections[:]:
                 if 'ID' in col.keys():
-                    col.name = col['English']
+                    set_if_changed(col, "name", col['English'])
             return {"FINISHED"}
 
-        # Charger les traductions depuis un texte Blender
-        translations = bpy.data.texts['Translations'].as_string().splitlines()
-        languages = translations[0].split(';')
-        trans_dict = dict()
-        for langs in translations[1:]:
-            langs = list(zip(languages, langs.split(';')))
-            translated_phrase = trans_dict[langs[0][1]] = dict()
-            for lang in langs[1:]:
-                translated_phrase[lang[0]] = lang[1]
-
-        # Traduire les noms des objets et des collections
+        # Catalogue compilé, réutilisé tant que le texte 'Translations' ne change pas
+        catalog = translation_catalog(bpy.data.texts['Translations'], self.use_cache_file)
+        font = bpy.data.fonts.get(fonts[self.lang])
+        if font is None:
+            self.report(type={"WARNING"}, message=f"Font {fonts[self.lang]} not found. Add it manually.")
+        size = 0.006 if self.lang == '中國人' else 0.003
+
+        # Traduire les noms des objets et des collections (seulement ceux qui changent)
         for ob in bpy.data.objects[:]:
             if ob.type in {"MESH", "CURVE"}:
-                _, ending = clean_name(ob.name)
-                eng_name, _ = clean_name(ob.data.name)
-                if eng_name in trans_dict:
-                    new_name = trans_dict[eng_name][self.lang]
-                    new_name = first_n_bytes(new_name)
-                    ob.name = new_name + ending
+                new_name = catalog.name(clean_name(ob.data.name)[0], self.lang)
+                if new_name is not None:
+                    set_if_changed(ob, "name", new_name + clean_name(ob.name)[1])
             elif ob.type == "FONT":
-                _, ending = clean_name(ob.name)
-                eng_name, _ = clean_name(ob.data.name)
-                if eng_name in trans_dict:
-                    new_name = trans_dict[eng_name][self.lang]
-                    ob.data.body = new_name.upper()
-
-                    new_name = first_n_bytes(new_name)
-                    ob.name = new_name + ending
-
-                    try:
-                        ob.data.font = bpy.data.fonts[fonts[self.lang]]
-                    except:
-                        self.report(type={"WARNING"}, message=f"Font {fonts[self.lang]} not found. Add it manually.")
-
-                    if not ob.name.endswith('.st'):
-                        if self.lang == '中國人':
-                            ob.data.size = 0.006
-                        else:
-                            ob.data.size = 0.003
+                eng_name = clean_name(ob.data.name)[0]
+                new_name = catalog.name(eng_name, self.lang)
+                if new_name is not None:
+                    set_if_changed(ob.data, "body", catalog.phrase(eng_name, self.lang).upper())
+                    set_if_changed(ob, "name", new_name + clean_name(ob.name)[1])
+                    if font is not None:
+                        set_if_changed(ob.data, "font", font)
+                    # size est un float32 : comparaison avec une tolérance
+                    if not ob.name.endswith('.st') and abs(ob.data.size - size) > 1e-7:
+                        ob.data.size = size
 
         for col in bpy.data.collections[:]:
             if 'ID' in col.keys():
                 eng_name = col['English']
                 if eng_name.endswith("'"):
-                    eng_name = eng_name[:-1]
-                    if eng_name in trans_dict:
-                        col.name = trans_dict[eng_name][self.lang] + "'"
-                elif eng_name in trans_dict:
-                    col.name = trans_dict[eng_name][self.lang]
+                    new_name = catalog.phrase(eng_name[:-1], self.lang)
+                    if new_name is not None:
+                        set_if_changed(col, "name", new_name + "'")
+                else:
+                    new_name = catalog.phrase(eng_name, self.lang)
+                    if new_name is not None:
+                        set_if_changed(col, "name", new_name)
 
         return {"FINISHED"}
 
@@ -999,27 +1222,51 @@ class TEXT_OT_wiki_download(bpy.types.Operator):
 # Fonction persistante pour suivre la vue 3D
 @persistent
 def z_anatomy_load_post(scene=None):
+    label_index.invalidate()
+    name_infos.clear()
+    billboard_state["rotation"] = None
+    billboard_state["labels"] = []
+    billboard_state["dirty"] = True
+
     def refresh():
-        # Parcourir toutes les zones de l'écran pour trouver les zones de vue 3D
+        # Orientation de la vue 3D (la dernière de l'écran, comme avant)
+        viewport_orientation = None
         for area in bpy.context.screen.areas:
             if area.type == 'VIEW_3D':
-                area3D = area
-                viewport_orientation = area3D.spaces[0].region_3d.view_rotation
-
-                # Parcourir tous les objets visibles
-                for obj in bpy.context.visible_objects:
-                    # Vérifier si l'objet a un suffixe spécifique ou se termine par '...'
-                    if '.t' in obj.name or obj.name.endswith('...'):
-                        # Si la rotation de l'objet ne correspond pas à l'orientation de la vue, la mettre à jour
-                        if obj.rotation_quaternion != viewport_orientation:
-                            if obj.rotation_mode != 'QUATERNION':
-                                obj.rotation_mode = 'QUATERNION'
-                            obj.rotation_quaternion = viewport_orientation
-
-                    # Si l'objet a 'always_show' dans son nom et est masqué, le rendre visible
-                    if 'always_show' in obj.name and obj.hide_get():
-                        obj.hide_set(False)
-                        obj.hide_viewport = False
+                viewport_orientation = area.spaces[0].region_3d.view_rotation
+        if viewport_orientation is None:
+            return 0.0165
+
+        # Rien n'a bougé : aucun objet à parcourir
+        moved = billboard_state["rotation"] != viewport_orientation
+        if not moved and not billboard_state["dirty"]:
+            return 0.0165
+
+        if billboard_state["dirty"]:
+            billboard_state["dirty"] = False
+            visible = bpy.context.visible_objects
+            billboard_state["labels"] = [o for o in visible if name_info(o.name).roles & BILLBOARD_ROLES]
+
+            # Les objets 'always_show' ne sont jamais masqués
+            view_layer_objects = bpy.context.view_layer.objects
+            for name in label_index.with_role('ALWAYS_SHOW'):
+                obj = view_layer_objects.get(name)
+                if obj is not None and obj.hide_get():
+                    obj.hide_set(False)
+                    obj.hide_viewport = False
+
+        # Tourner les labels visibles vers la vue
+        try:
+            for obj in billboard_state["labels"]:
+                if obj.rotation_quaternion != viewport_orientation:
+                    if obj.rotation_mode != 'QUATERNION':
+                        obj.rotation_mode = 'QUATERNION'
+                    obj.rotation_quaternion = viewport_orientation
+        except ReferenceError:
+            # Un label a été supprimé : on refait la liste au prochain passage
+            billboard_state["dirty"] = True
+            return 0.0165
+        billboard_state["rotation"] = viewport_orientation.copy()
         return 0.0165
 
     # Enregistrer la fonction de rafraîchissement pour qu'elle soit appelée périodiquement
@@ -1075,25 +1322,59 @@ def msgbus_callback_workspace(*args):
         bpy.ops.object.mode_set(mode='OBJECT')
         bpy.context.window.view_layer = bpy.data.scenes['Scene'].view_layers["Anatomy"]
 
+# Visibilité simulée en mémoire : les règles masquent et montrent des noms,
+# puis apply() n'appelle hide_set que pour les objets qui changent vraiment
+class VisibilityDiff:
+    def __init__(self, context):
+        self.before = {o.name for o in context.visible_objects}
+        self.visible = set(self.before)
+
+    def show(self, names):
+        self.visible.update(names)
+
+    def hide(self, names):
+        self.visible.difference_update(names)
+
+    def apply(self):
+        objects = bpy.data.objects
+        for name in self.visible - self.before:
+            ob = objects.get(name)
+            if ob is not None:
+                ob.hide_set(False)
+        for name in self.before - self.visible:
+            ob = objects.get(name)
+            if ob is not None:
+                ob.hide_set(True)
+
+def group_lines(name):
+    # Lignes des labels de groupe
+    return label_index.children.get(name, set()) & label_index.with_role('LINE')
+
+def hide_group_labels(diff):
+    for name in label_index.with_role('GROUP'):
+        diff.hide({name} | group_lines(name))
+
+def show_collection_group_labels(diff, collection, visible_only=True):
+    # Seuls les labels de groupe de la collection restent visibles
+    shown = label_index.groups_in(collection)
+    groups = label_index.with_role('GROUP')
+    if visible_only:
+        groups = groups & diff.visible
+    for name in groups - shown:
+        diff.hide({name} | group_lines(name))
+    for name in shown - diff.visible:
+        diff.show({name} | group_lines(name))
+
 # Fonction pour mettre à jour la visibilité des labels de groupe
 def label_group_checkbox_update(*args):
     active_object = bpy.context.active_object
+    diff = VisibilityDiff(bpy.context)
 
     if not bpy.context.scene.zanatomy.enable_group_labels:
-        for ob in (c for c in bpy.context.scene.objects if c.name.endswith('.g') or (c.name.endswith('-line') and c.parent and c.parent.name.endswith('.g'))):
-            ob.hide_set(True)
+        hide_group_labels(diff)
     else:
-        for ob in (o for o in set(bpy.context.scene.objects) - set(active_object.users_collection[0].all_objects) if o.name.endswith('.g')):
-            ob.hide_set(True)
-
-            for child in (c for c in bpy.context.scene.objects if c.parent == ob and c.name.endswith('-line')):
-                child.hide_set(True)
-
-        for ob in (o for o in active_object.users_collection[0].all_objects if not o.visible_get() and o.name.endswith('.g')):
-            ob.hide_set(False)
-
-            for child in (c for c in bpy.context.scene.objects if c.parent == ob and not c.visible_get() and c.name.endswith('-line')):
-                child.hide_set(False)
+        show_collection_group_labels(diff, active_object.users_collection[0], visible_only=False)
+    diff.apply()
 
 # Fonction pour synchroniser la sélection avec l'éditeur de texte
 def msgbus_callback(*args):
@@ -1113,43 +1394,31 @@ def msgbus_callback(*args):
         text_editor_area.spaces[0].text.select_set(0, 0, 0, 0)
 
     # Seulement le label de l'objet visible doit être visible
-    if ".t" in active_object.name or ".st" in active_object.name:
+    if name_info(active_object.name).roles & {'LABEL', 'SUBTITLE'}:
         return
 
-    for child in family(active_object):
-        child.hide_set(False)
+    diff = VisibilityDiff(bpy.context)
+    diff.show(ob.name for ob in family(active_object))
 
     if not bpy.context.scene.zanatomy.enable_group_labels or active_object.users_collection[0] is bpy.context.view_layer.layer_collection.collection:
-        for ob in (c for c in bpy.context.visible_objects if c.name.endswith('.g') or (c.name.endswith('-line') and c.parent and c.parent.name.endswith('.g'))):
-            ob.hide_set(True)
+        hide_group_labels(diff)
     else:
-        for ob in (o for o in set(bpy.context.visible_objects) - set(active_object.users_collection[0].all_objects) if o.name.endswith('.g')):
-            ob.hide_set(True)
+        show_collection_group_labels(diff, active_object.users_collection[0])
 
-            for child in (c for c in bpy.context.visible_objects if c.parent == ob and c.name.endswith('-line')):
-                child.hide_set(True)
+    # Labels visibles d'autres objets : masqués avec leurs lignes
+    for name in label_index.with_role('LABEL') & diff.visible:
+        if label_index.parent.get(name) != active_object.name:
+            diff.hide({name} | label_index.children.get(name, set()))
 
-        for ob in (o for o in active_object.users_collection[0].all_objects if not o.visible_get() and o.name.endswith('.g')):
-            ob.hide_set(False)
-
-            for child in (c for c in bpy.context.scene.objects if c.parent == ob and not c.visible_get() and c.name.endswith('-line')):
-                child.hide_set(False)
-
-    for ob in (o for o in bpy.context.visible_objects if ".t" in o.name):
-        if not ob.parent == active_object:
-            ob.hide_set(True)
-            for child in ob.children:
-                child.hide_set(True)
-
-    for ob in (o for o in bpy.context.visible_objects if o.name.endswith('...')):
-        if ob == active_object:
-            for child in ob.children:
-                child.hide_set(False)
+    for name in label_index.with_role('ELLIPSIS') & diff.visible:
+        if name == active_object.name:
+            diff.show(label_index.children.get(name, ()))
         else:
-            for child in ob.children:
-                child.hide_set(True)
+            diff.hide(label_index.children.get(name, ()))
+
+    diff.apply()
 
-    if active_object.name.endswith('.g'):
+    if has_role(active_object.name, 'GROUP'):
         bpy.ops.object.select_grouped('INVOKE_DEFAULT', type='CHILDREN_RECURSIVE')
         active_object.select_set(True)
 
@@ -1501,6 +1770,9 @@ def draw_callback_px(self, context):
 def register():
     z_anatomy_load_post()
     bpy.app.handlers.load_post.append(z_anatomy_load_post)
+    bpy.app.handlers.depsgraph_update_post.append(z_anatomy_depsgraph_update_post)
+    bpy.app.handlers.undo_post.append(z_anatomy_undo_post)
+    bpy.app.handlers.redo_post.append(z_anatomy_undo_post)
     for c in classes:
         bpy.utils.register_class(c)
     bpy.types.Scene.zanatomy = bpy.props.PointerProperty(type=ZAnatomyProps)
@@ -1517,6 +1789,9 @@ def unregister():
     remove_shortkeys()
 
     bpy.app.handlers.load_post.remove(z_anatomy_load_post)
+    bpy.app.handlers.depsgraph_update_post.remove(z_anatomy_depsgraph_update_post)
+    bpy.app.handlers.undo_post.remove(z_anatomy_undo_post)
+    bpy.app.handlers.redo_post.remove(z_anatomy_undo_post)
 
     bpy.msgbus.clear_by_owner(owner)
 
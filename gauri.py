@@ -1,337 +1,246 @@
-import mysql.connector
+import os
+
+from hms_billing import printBill
+from hms_cache import CustomerCache
+from hms_db import DB_ERRORS, ConnectionPool, MySQLBackend, SQLiteBackend
+from hms_ops import HISTORY_PAGE, Hotel, HotelError, NotFound
+from hms_querylog import QueryLog
+from hms_rooms import ROOM_CATEGORIES
+from hms_schema import migrate
+from hms_shards import SHARDS_FILE, ShardRouter
 
 # GLOBAL VARIABLES DECLARATION
-myConnection = "" 
-cursor = "" 
-userName = "" 
-password = "" 
-roomrent = 0 
-restaurentbill = 0 
-gamingbill = 0 
-fashionbill = 0 
-totalAmount = 0 
+pool = None
+hotel = None
+shard = None  # (ShardRouter, property) when this terminal serves one property of the group
+userName = ""
+password = ""
 cid = ""
+POOL_SIZE = 5
+customers = CustomerCache(maxSize=1024, ttl=300)
+# statements slower than HMS_SLOW_QUERY_MS milliseconds are appended to HMS_SLOW_QUERY_LOG
+SLOW_QUERY_MS = float(os.environ.get("HMS_SLOW_QUERY_MS", 100))
+SLOW_QUERY_LOG = os.environ.get("HMS_SLOW_QUERY_LOG", "hms-slow-queries.log")
+queryLog = QueryLog(slowMs=SLOW_QUERY_MS, path=SLOW_QUERY_LOG)
 
 # MODULE TO CHECK MYSQL CONNECTIVITY
 def MYSQLconnectionCheck():
-    global myConnection
-    global userName 
+    global userName
     global password
     userName = input("\nENTER MYSQL SERVER'S USERNAME: ")
     password = input("\nENTER MYSQL SERVER'S PASSWORD: ")
-    
+    host = input("ENTER MYSQL SERVER'S HOST [localhost]: ") or "localhost"
+    database = input("ENTER THE HOTEL'S DATABASE [HMS]: ") or "HMS"
+
     try:
-        myConnection = mysql.connector.connect(
-            host="localhost",
-            user=userName,
-            passwd=password,  # Use the input password
-            auth_plugin='mysql_native_password'
-        )
-        
-        if myConnection.is_connected():
-            print("\nCONGRATULATIONS! YOUR MYSQL CONNECTION HAS BEEN ESTABLISHED!")
-            cursor = myConnection.cursor()
-            cursor.execute("CREATE DATABASE IF NOT EXISTS HMS")
-            myConnection.commit() 
-            cursor.close()
-        else:
-            print("\nERROR ESTABLISHING MYSQL CONNECTION! CHECK USERNAME AND PASSWORD!")
-    except mysql.connector.Error as err:
+        backend = MySQLBackend(userName, password, host, database)
+        backend.createDatabase()
+        print("\nCONGRATULATIONS! YOUR MYSQL CONNECTION HAS BEEN ESTABLISHED!")
+        return backend
+    except (RuntimeError,) + DB_ERRORS as err:
         print(f"\nERROR: {err}")
+        print("\nERROR ESTABLISHING MYSQL CONNECTION! CHECK USERNAME AND PASSWORD!")
 
-# MODULE TO ESTABLISH MYSQL CONNECTION
-def MYSQLconnection():
-    global userName 
-    global password 
-    global myConnection 
-    global cid
-    
+# MODULE TO CHOOSE WHERE THE HOTEL DATA IS STORED
+def selectBackend():
+    global shard
+    shard = None
+    print("""
+1---> MySQL Server
+2---> Embedded SQLite File (No Server Needed)
+3---> One Property Of The Hotel Group (Shard Map)
+""")
+    choice = input("Enter Your Storage Choice: ")
+    if choice == "2":
+        path = input("ENTER SQLITE DATABASE FILE [HMS.db]: ") or "HMS.db"
+        return SQLiteBackend(path)
+    if choice == "3":
+        return selectProperty()
+    return MYSQLconnectionCheck()
+
+# MODULE TO PICK THIS TERMINAL'S PROPERTY FROM THE SHARD MAP
+def selectProperty():
+    global shard
+    path = input(f"ENTER SHARD MAP FILE [{SHARDS_FILE}]: ") or SHARDS_FILE
     try:
-        myConnection = mysql.connector.connect(
-            host="localhost",
-            user=userName,
-            passwd=password,
-            database="HMS",  # Updated to use the correct database name
-            auth_plugin='mysql_native_password'
-        )
-        
-        if myConnection.is_connected():
-            return myConnection
-        else:
-            print("\nERROR ESTABLISHING MYSQL CONNECTION!")
-            myConnection.close()
-    except mysql.connector.Error as err:
+        router = ShardRouter.load(path)
+    except (OSError, ValueError, KeyError) as err:
+        print(f"\nERROR READING SHARD MAP: {err}")
+        return None
+    for number, name in enumerate(router.properties, 1):
+        print(f"{number}---> {name} ({router.describe(name)})")
+    choice = input("Enter Your Property: ").strip()
+    if not choice.isdigit() or not 1 <= int(choice) <= len(router.properties):
+        print("Sorry, maybe you are giving me the wrong input. Please try again!")
+        return None
+    name = router.properties[int(choice) - 1]
+    try:
+        backend = router.backend(name)
+        backend.createDatabase()
+    except (RuntimeError, ValueError, KeyError) + DB_ERRORS as err:
+        print(f"\nERROR: {err}")
+        return None
+    shard = (router, name)
+    return backend
+
+# MODULE TO ESTABLISH THE CONNECTION POOL AND BRING THE SCHEMA UP TO DATE
+def MYSQLconnection(backend, size=POOL_SIZE):
+    global pool
+    global hotel
+
+    try:
+        pool = ConnectionPool(backend, size, queryLog=queryLog)
+        with pool.connection() as myConnection:
+            connected = myConnection.is_connected()
+        if connected:
+            migrate(pool)
+            hotel = Hotel(pool, customers, shard=shard)
+            return pool
+        print("\nERROR ESTABLISHING MYSQL CONNECTION!")
+        pool.close()
+        pool = None
+    except DB_ERRORS as err:
         print(f"\nERROR: {err}")
-def userEntry(): 
+        pool = None
+
+def userEntry():
     global cid
-    if myConnection:
-        cursor = myConnection.cursor()
-        
-        createTable = """CREATE TABLE IF NOT EXISTS C_DETAILS (
-            CID VARCHAR(20),
-            C_NAME VARCHAR(30),
-            C_ADDRESS VARCHAR(30),
-            C_AGE VARCHAR(30),
-            C_COUNTRY VARCHAR(30),
-            P_NO VARCHAR(30),
-            C_EMAIL VARCHAR(30)
-        )"""
-        cursor.execute(createTable)
-
-        cid = input("Enter Customer Identification Number: ") 
+    if pool:
+        cid = input("Enter Customer Identification Number: ")
         name = input("Enter Customer Name: ")
-        address = input("Enter Customer Address: ") 
+        address = input("Enter Customer Address: ")
         age = input("Enter Customer Age: ")
-        nationality = input("Enter Customer Country: ") 
-        phoneno = input("Enter Customer Contact Number: ") 
+        nationality = input("Enter Customer Country: ")
+        phoneno = input("Enter Customer Contact Number: ")
         email = input("Enter Customer Email: ")
-        
-        sql = "INSERT INTO C_DETAILS VALUES (%s, %s, %s, %s, %s, %s, %s)"
-        values = (cid, name, address, age, nationality, phoneno, email) 
-        cursor.execute(sql, values)
-        myConnection.commit()  # Use commit on the connection, not the cursor
+
+        try:
+            hotel.addCustomer(cid, name, address, age, nationality, phoneno, email)
+        except HotelError as err:
+            print(f"\nERROR: {err}")
+            return
         print("\nNew Customer Entered In The System Successfully!")
-        cursor.close()
     else:
         print("\nERROR ESTABLISHING MYSQL CONNECTION!")
 
 
 def bookingRecord():
-    global cid 
-    customer = searchCustomer() 
+    global cid
+    customer = searchCustomer()
     if customer:
-        if myConnection:
-            cursor = myConnection.cursor()
-            
-            createTable = """CREATE TABLE IF NOT EXISTS BOOKING_RECORD (
-                CID VARCHAR(20),
-                CHECK_IN DATE,
-                CHECK_OUT DATE
-            )"""
-            cursor.execute(createTable)
-
-            checkin = input("\nEnter Customer Check-IN Date [YYYY-MM-DD]: ") 
-            checkout = input("\nEnter Customer Check-OUT Date [YYYY-MM-DD]: ") 
-            
-            sql = "INSERT INTO BOOKING_RECORD VALUES (%s, %s, %s)"
-            values = (cid, checkin, checkout) 
-            cursor.execute(sql, values)
-            myConnection.commit() 
+        if pool:
+            checkin = input("\nEnter Customer Check-IN Date [YYYY-MM-DD]: ")
+            checkout = input("\nEnter Customer Check-OUT Date [YYYY-MM-DD]: ")
+
+            try:
+                if hotel.rooms.configured:
+                    print("\n##### Free Rooms For These Dates #####")
+                    for category, name in ROOM_CATEGORIES.items():
+                        free = hotel.freeRooms(category, checkin, checkout)
+                        print(f"{category}. {name} > {len(free)} free:", *free[:15])
+                roomno = input("Enter Customer Room No: ")
+                hotel.book(cid, checkin, checkout, roomno)
+            except HotelError as err:
+                print(f"Sorry, {err}, please try again!")
+                return
             print("\nCHECK-IN AND CHECK-OUT ENTRY MADE SUCCESSFULLY!")
-            cursor.close() 
         else:
             print("\nERROR ESTABLISHING MYSQL CONNECTION!")
 
+# MODULE TO SHOW THE ITEMS AND PRICES OF A SERVICE
+def printMenu(service, unit=""):
+    for choice, (item, price) in hotel.tariff.menu(service).items():
+        print(f"{choice}. {item} > {price} Rs.{unit}")
+
 def roomRent():
-    global cid 
-    customer = searchCustomer() 
+    global cid
+    customer = searchCustomer()
     if customer:
-        global roomrent 
-        if myConnection:
-            cursor = myConnection.cursor()
-            
-            createTable = """CREATE TABLE IF NOT EXISTS ROOM_RENT (
-                CID VARCHAR(20),
-                ROOM_CHOICE INT,
-                NO_OF_DAYS INT,
-                ROOMNO INT,
-                ROOMRENT INT
-            )"""
-            cursor.execute(createTable)
-
-            print("\n##### We have The Following Rooms For You #####") 
-            print("1. Ultra Royal > 10000 Rs.")
-            print("2. Royal > 5000 Rs.")
-            print("3. Elite > 3500 Rs.")
-            print("4. Budget > 2500 Rs.")
-
-            roomchoice = int(input("Enter Your Option: ")) 
-            roomno = int(input("Enter Customer Room No: ")) 
+        if pool:
+            print("\n##### We have The Following Rooms For You #####")
+            printMenu("ROOM_RENT")
+
+            roomchoice = int(input("Enter Your Option: "))
+            roomno = int(input("Enter Customer Room No: "))
             noofdays = int(input("Enter No. Of Days: "))
 
-            if roomchoice == 1:
-                roomrent = noofdays * 10000
-                print("\nUltra Royal Room Rent: ", roomrent) 
-            elif roomchoice == 2:
-                roomrent = noofdays * 5000
-                print("\nRoyal Room Rent: ", roomrent)
-            elif roomchoice == 3:
-                roomrent = noofdays * 3500 
-                print("\nElite Room Rent: ", roomrent) 
-            elif roomchoice == 4:
-                roomrent = noofdays * 2500
-                print("\nBudget Room Rent: ", roomrent)
-            else:
-                print("Sorry, maybe you are giving me wrong input, please try again!")
+            try:
+                item, roomrent = hotel.charge("ROOM_RENT", cid, roomchoice, noofdays, roomno)
+            except HotelError as err:
+                print(f"Sorry, {err}, please try again!")
                 return
-
-            sql = "INSERT INTO ROOM_RENT VALUES (%s, %s, %s, %s, %s)"
-            values = (cid, roomchoice, noofdays, roomno, roomrent)
-            cursor.execute(sql, values)
-            myConnection.commit()
+            print(f"\n{item} Room Rent: ", roomrent)
             print("Thank you, your room has been booked for: ", noofdays, "days.")
             print("Your total room rent is: Rs. ", roomrent)
-            cursor.close()
         else:
             print("\nERROR ESTABLISHING MYSQL CONNECTION!")
 
 
 def restaurant():
-    global cid 
-    customer = searchCustomer() 
+    global cid
+    customer = searchCustomer()
     if customer:
-        global restaurentbill
-        if myConnection:
-            cursor = myConnection.cursor()
-            
-            createTable = """CREATE TABLE IF NOT EXISTS RESTAURANT (
-                CID VARCHAR(20),
-                CUISINE VARCHAR(30),
-                QUANTITY INT,
-                BILL INT
-            )"""
-            cursor.execute(createTable)
-
-            print("1. Vegetarian Combo > 300 Rs.")
-            print("2. Non-Vegetarian Combo > 500 Rs.")
-            print("3. Vegetarian & Non-Vegetarian Combo > 750 Rs.")
-            choice_dish = int(input("Enter Your Cuisine: ")) 
-            quantity = int(input("Enter Quantity: ")) 
-            
-            if choice_dish == 1:
-                print("\nSO YOU HAVE ORDERED: Vegetarian Combo")
-                restaurentbill = quantity * 300
-            elif choice_dish == 2:
-                print("\nSO YOU HAVE ORDERED: Non-Vegetarian Combo")
-                restaurentbill = quantity * 500
-            elif choice_dish == 3:
-                print("\nSO YOU HAVE ORDERED: Vegetarian & Non-Vegetarian Combo")
-                restaurentbill = quantity * 750
-            else:
-                print("Sorry, maybe you are giving me wrong input, please try again!")
-                return
+        if pool:
+            printMenu("RESTAURANT")
+            choice_dish = int(input("Enter Your Cuisine: "))
+            quantity = int(input("Enter Quantity: "))
 
-            sql = "INSERT INTO RESTAURANT VALUES (%s, %s, %s, %s)"
-            values = (cid, choice_dish, quantity, restaurentbill)
-            cursor.execute(sql, values)
-            myConnection.commit()
-            print("Your total bill amount is: Rs. ", restaurentbill) 
-            print("\n\n** WE HOPE YOU WILL ENJOY YOUR MEAL *\n\n") 
-            cursor.close()
+            try:
+                item, restaurentbill = hotel.charge("RESTAURANT", cid, choice_dish, quantity)
+            except HotelError as err:
+                print(f"Sorry, {err}, please try again!")
+                return
+            print("\nSO YOU HAVE ORDERED:", item)
+            print("Your total bill amount is: Rs. ", restaurentbill)
+            print("\n\n** WE HOPE YOU WILL ENJOY YOUR MEAL *\n\n")
         else:
             print("\nERROR ESTABLISHING MYSQL CONNECTION!")
 
 def Gaming():
-    global cid 
+    global cid
     customer = searchCustomer()
     if customer:
-        global gamingbill 
-        if myConnection:
-            cursor = myConnection.cursor()
-            
-            createTable = """CREATE TABLE IF NOT EXISTS GAMING (
-                CID VARCHAR(20),
-                GAMES VARCHAR(30),
-                HOURS INT,
-                GAMING_BILL INT
-            )""" 
-            cursor.execute(createTable)
-            
-            print("""1. Table Tennis > 150 Rs./HR
-2. Bowling > 100 Rs./HR
-3. Snooker > 250 Rs./HR
-4. VR World Gaming > 400 Rs./HR
-5. Video Games > 300 Rs./HR
-6. Swimming Pool Games > 350 Rs./HR
-7. Exit
-""")
-            game = int(input("Enter What Game You Want To Play: ")) 
-            hour = int(input("Enter No Of Hours You Want To Play: ")) 
-            print("\n\n#################################################")
-            
-            if game == 1:
-                print("YOU HAVE SELECTED TO PLAY: Table Tennis")
-                gamingbill = hour * 150
-            elif game == 2:
-                print("YOU HAVE SELECTED TO PLAY: Bowling")
-                gamingbill = hour * 100
-            elif game == 3:
-                print("YOU HAVE SELECTED TO PLAY: Snooker")
-                gamingbill = hour * 250
-            elif game == 4:
-                print("YOU HAVE SELECTED TO PLAY: VR World Gaming")
-                gamingbill = hour * 400
-            elif game == 5:
-                print("YOU HAVE SELECTED TO PLAY: Video Games")
-                gamingbill = hour * 300
-            elif game == 6:
-                print("YOU HAVE SELECTED TO PLAY: Swimming Pool Games")
-                gamingbill = hour * 350
-            elif game == 7:
+        if pool:
+            printMenu("GAMING", "/HR")
+            exitChoice = len(hotel.tariff.menu("GAMING")) + 1
+            print(f"{exitChoice}. Exit\n")
+            game = int(input("Enter What Game You Want To Play: "))
+            if game == exitChoice:
                 print("Exiting...")
                 return
-            else:
-                print("Sorry, maybe you are giving me wrong input, please try again!")
+            hour = int(input("Enter No Of Hours You Want To Play: "))
+            print("\n\n#################################################")
+
+            try:
+                item, gamingbill = hotel.charge("GAMING", cid, game, hour)
+            except HotelError as err:
+                print(f"Sorry, {err}, please try again!")
                 return
-            
-            sql = "INSERT INTO GAMING VALUES (%s, %s, %s, %s)"
-            values = (cid, game, hour, gamingbill) 
-            cursor.execute(sql, values)
-            myConnection.commit()
+            print("YOU HAVE SELECTED TO PLAY:", item)
             print("Your Total Gaming Bill Is: Rs. ", gamingbill)
-            print("FOR: ", hour, " HOURS", "\n** WE HOPE YOU WILL ENJOY YOUR GAME **") 
+            print("FOR: ", hour, " HOURS", "\n** WE HOPE YOU WILL ENJOY YOUR GAME **")
             print("\n\n#################################################")
-            cursor.close()
         else:
             print("ERROR ESTABLISHING MYSQL CONNECTION!")
 
 
 def Fashion():
-    global cid 
-    customer = searchCustomer() 
+    global cid
+    customer = searchCustomer()
     if customer:
-        global fashionbill 
-        if myConnection:
-            cursor = myConnection.cursor()
-            
-            createTable = """CREATE TABLE IF NOT EXISTS FASHION (
-                CID VARCHAR(20),
-                DRESS VARCHAR(30),
-                AMOUNT INT,
-                BILL INT
-            )"""
-            cursor.execute(createTable)
-            
-            print("""1. Shirts > 1500 Rs.
-2. T-Shirts > 300 Rs.
-3. Pants > 2000 Rs.
-4. Jeans > 4000 Rs.
-""")
+        if pool:
+            printMenu("FASHION")
+            print()
             choice_dress = int(input("Enter Your Choice of Dress: "))
             quantity = int(input("Enter Quantity: "))
-            
-            if choice_dress == 1:
-                fashionbill = quantity * 1500
-                print("You have selected Shirts, Total Bill: Rs.", fashionbill)
-            elif choice_dress == 2:
-                fashionbill = quantity * 300
-                print("You have selected T-Shirts, Total Bill: Rs.", fashionbill)
-            elif choice_dress == 3:
-                fashionbill = quantity * 2000
-                print("You have selected Pants, Total Bill: Rs.", fashionbill)
-            elif choice_dress == 4:
-                fashionbill = quantity * 4000
-                print("You have selected Jeans, Total Bill: Rs.", fashionbill)
-            else:
-                print("Sorry, maybe you are giving me wrong input, please try again!")
+
+            try:
+                item, fashionbill = hotel.charge("FASHION", cid, choice_dress, quantity)
+            except HotelError as err:
+                print(f"Sorry, {err}, please try again!")
                 return
-            
-            sql = "INSERT INTO FASHION VALUES (%s, %s, %s, %s)"
-            values = (cid, choice_dress, quantity, fashionbill)
-            cursor.execute(sql, values)
-            myConnection.commit()
+            print(f"You have selected {item}, Total Bill: Rs.", fashionbill)
             print("Thank you for your purchase!")
-            cursor.close()
         else:
             print("ERROR ESTABLISHING MYSQL CONNECTION!")
 
@@ -339,82 +248,84 @@ def totalAmount():
     global cid
     customer = searchCustomer()
     if customer:
-        global grandTotal
-        global roomrent
-        global restaurentbill 
-        global fashionbill 
-        global gamingbill 
-        
-        if myConnection: 
-            cursor = myConnection.cursor()
-            createTable = """CREATE TABLE IF NOT EXISTS TOTAL (
-                CID VARCHAR(20),
-                C_NAME VARCHAR(30),
-                ROOMRENT INT,
-                RESTAURANTBILL INT,
-                GAMINGBILL INT,
-                FASHIONBILL INT,
-                TOTALAMOUNT INT
-            )"""
-            cursor.execute(createTable)
-            
-            sql = "INSERT INTO TOTAL VALUES (%s, %s, %s, %s, %s, %s, %s)"
-            name = input("Enter Customer Name: ")
-            grandTotal = roomrent + restaurentbill + fashionbill + gamingbill
-            values = (cid, name, roomrent, restaurentbill, gamingbill, fashionbill, grandTotal)
-            cursor.execute(sql, values)
-            myConnection.commit() 
-            cursor.close()
-            
-            print("\n ** CROWN PLAZA MIAMI ** CUSTOMER BILLING **") 
-            print("\n CUSTOMER NAME: ", name)
-            print("\n ROOM RENT: Rs. ", roomrent) 
-            print("\n RESTAURANT BILL: Rs. ", restaurentbill) 
-            print("\n FASHION BILL: Rs. ", fashionbill) 
-            print("\n GAMING BILL: Rs. ", gamingbill)
-            print("\n TOTAL AMOUNT: Rs. ", grandTotal)
+        if pool:
+            printBill(hotel.bill(cid, save=True))
         else:
             print("\nERROR ESTABLISHING MYSQL CONNECTION!")
 
+# MODULE TO BILL EVERY GUEST WHOSE STAY HAS ENDED
+def checkoutBilling():
+    if pool:
+        bills = hotel.billCheckedOut()
+        for bill in bills:
+            printBill(bill)
+        print("\n", len(bills), "BILLS GENERATED FOR CHECKED-OUT GUESTS")
+    else:
+        print("\nERROR ESTABLISHING MYSQL CONNECTION!")
+
 def searchOldBill():
-    global cid 
-    customer = searchCustomer() 
+    global cid
+    customer = searchCustomer()
     if customer:
-        if myConnection: 
-            cursor = myConnection.cursor()
-            sql = "SELECT * FROM TOTAL WHERE CID = %s"
-            cursor.execute(sql, (cid,)) 
-            data = cursor.fetchall() 
-            if data:
-                for record in data:
-                    print(record)
-            else:
-                print("Record Not Found, Try Again!") 
-            cursor.close()
+        if pool:
+            since = input("FROM DATE (YYYY-MM-DD, blank for all): ").strip()
+            until = input("TO DATE (YYYY-MM-DD, blank for all): ").strip()
+            shown = 0
+            try:
+                for page in hotel.historyPages(cid, since, until, pageSize=HISTORY_PAGE):
+                    for billno, billedAt, name, roomrent, food, games, shop, total in page:
+                        print(f"BILL {billno:<8}{str(billedAt or '-'):<12}ROOM {roomrent:<8}RESTAURANT {food:<8}"
+                              f"GAMING {games:<8}FASHION {shop:<8}TOTAL Rs. {total}")
+                    shown += len(page)
+                    if len(page) == HISTORY_PAGE and input("Press Enter for more, Q to stop: ").strip().upper() == "Q":
+                        break
+            except HotelError as err:
+                print(f"Sorry, {err}, please try again!")
+                return
+            if not shown:
+                print("Record Not Found, Try Again!")
+            print("\n CURRENT BALANCE: Rs. ", hotel.bill(cid).total)
         else:
             print("\nSomething Went Wrong, Please Try Again!")
 
-def searchCustomer(): 
+# MODULE TO SHOW WHICH DATABASE STATEMENTS TAKE THE MOST TIME
+def queryStatistics():
+    print("\n##### TOP OFFENDERS (MOST TOTAL DATABASE TIME) #####")
+    print(queryLog.report(top=10))
+
+def searchCustomer():
     global cid
-    if myConnection:
-        cursor = myConnection.cursor() 
-        cid = input("ENTER CUSTOMER ID: ")
-        sql = "SELECT * FROM C_DETAILS WHERE CID = %s"
-        cursor.execute(sql, (cid,)) 
-        data = cursor.fetchall()
-        if data:
-            print(data)
-            return True
-        else:
-            print("Record Not Found, Try Again!") 
-            return False
-        cursor.close()
+    if pool:
+        cid = input("ENTER CUSTOMER ID (OR NAME / PHONE / EMAIL TO SEARCH): ")
+        try:
+            data = hotel.customer(cid)
+        except NotFound:
+            data = pickCustomer(cid)
+            if not data:
+                print("Record Not Found, Try Again!")
+                return False
+            cid = data[0]
+        print([data])
+        return True
+
+# MODULE TO LIST THE CLOSEST CUSTOMERS AND LET THE CLERK PICK ONE
+def pickCustomer(text):
+    matches = hotel.findCustomers(text, limit=5)
+    if not matches:
+        return None
+    print("\n##### Did You Mean #####")
+    for number, (score, matchCid, name, phone, email) in enumerate(matches, 1):
+        print(f"{number}. {matchCid} > {name}, {phone}, {email}")
+    choice = input(f"Select A Customer (1-{len(matches)}), Or Press Enter To Cancel: ").strip()
+    if not choice.isdigit() or not 1 <= int(choice) <= len(matches):
+        return None
+    return hotel.customer(matches[int(choice) - 1][1])
+
 
+def main():
+    backend = selectBackend()
+    if backend and MYSQLconnection(backend):
 
-    myConnection = MYSQLconnectionCheck() 
-    if myConnection:
-        MYSQLconnection()
-        
         while True:
             print("""
 1---> Enter Customer Details
@@ -426,30 +337,38 @@ def searchCustomer():
 7---> Display Customer Details
 8---> GENERATE TOTAL BILL AMOUNT
 9---> GENERATE OLD BILL
-10---> EXIT
+10---> GENERATE BILLS FOR ALL CHECKED-OUT GUESTS
+11---> QUERY STATISTICS
+12---> EXIT
 """)
-            choice = int(input("Enter Your Choice: ")) 
+            choice = int(input("Enter Your Choice: "))
             if choice == 1:
-                userEntry() 
+                userEntry()
             elif choice == 2:
-                bookingRecord() 
+                bookingRecord()
             elif choice == 3:
-                roomRent() 
+                roomRent()
             elif choice == 4:
-                Restaurent() 
+                restaurant()
             elif choice == 5:
-                Gaming() 
+                Gaming()
             elif choice == 6:
-                Fashion() 
+                Fashion()
             elif choice == 7:
-                searchCustomer() 
+                searchCustomer()
             elif choice == 8:
-                totalAmount() 
+                totalAmount()
             elif choice == 9:
-                searchOldBill() 
+                searchOldBill()
             elif choice == 10:
+                checkoutBilling()
+            elif choice == 11:
+                queryStatistics()
+            elif choice == 12:
                 print("Exiting the system. Thank you!")
-                break 
+                print("CUSTOMER CACHE:", customers.stats())
+                pool.close()
+                break
             else:
                 print("Sorry, maybe you are giving me the wrong input. Please try again!")
 
@@ -467,9 +386,4 @@ def searchCustomer():
 
 # Call the main function to start the program
 if __name__ == "__main__":
-    myConnection = MYSQLconnectionCheck()
-    if myConnection:
-        MYSQLconnection()
-        # Call other functions based on user input
-        userEntry()
-        bookingRecord()
+    main()
@@ -0,0 +1,421 @@
+# ASYNCIO DATA ACCESS FOR THE HOTEL MANAGEMENT SYSTEM
+#
+# AsyncHotel offers the gauri.py data functions (addCustomer, customer, book,
+# charge, bill, history, billCheckedOut) as coroutines, so one event loop can
+# serve hundreds of clerk and web sessions with a handful of database
+# connections instead of one OS thread per session. AsyncConnectionPool hands
+# out connections through:
+#
+#   aiosqlite   for a SQLite file, when aiosqlite is installed
+#   aiomysql    for MySQL, when aiomysql is installed
+#   threads     otherwise: the ordinary driver, with every call on a pooled
+#               connection run in that connection's own thread, so there are
+#               never more database threads than connections
+#
+#   pool = AsyncConnectionPool(SQLiteBackend("HMS.db"), size=8)
+#   hotel = await AsyncHotel.open(pool)
+#   bill = await hotel.bill("C042")
+#   await pool.close()
+#
+#   python hms_async.py --sessions 500                  # benchmark on a seeded file
+#   python hms_async.py --sessions 500 --compare-threads --customers 10000
+#
+# The checks that need no database (prices, rooms, dates) are the same
+# HotelRules that hms_ops.Hotel uses, and the SQL comes from hms_billing, so
+# both paths bill identically.
+
+import argparse
+import asyncio
+import inspect
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import date
+
+try:
+    import aiosqlite
+except ImportError:
+    aiosqlite = None
+
+try:
+    import aiomysql
+except ImportError:
+    aiomysql = None
+
+from hms_bench import MIX, ROOMS, customerId, replay, seedDatabase
+from hms_billing import BILLS, UNBILLED_STAYS, billStatements, chargeStatements, historyQuery, makeBill
+from hms_cache import CUSTOMER_SQL, CustomerCache
+from hms_db import DB_ERRORS, ConnectionPool, MySQLBackend, PoolTimeout, SQLiteBackend
+from hms_ops import BOOKING_INSERT, CUSTOMER_INSERT, HISTORY_PAGE, Conflict, Hotel, HotelError, HotelRules, NotFound
+from hms_rooms import ROOMS_SQL, STAYS_SQL, AvailabilityEngine, toDate
+from hms_schema import migrate
+from hms_stats import LatencyStats
+from hms_tariff import SERVICES, TariffCatalog
+
+# Errors raised by any of the drivers, sync or async
+ASYNC_DB_ERRORS = DB_ERRORS + ((aiomysql.Error,) if aiomysql else ())
+
+
+def chooseDriver(backend):
+    if isinstance(backend, SQLiteBackend) and backend.path != ":memory:" and aiosqlite:
+        return "aiosqlite"
+    if isinstance(backend, MySQLBackend) and aiomysql:
+        return "aiomysql"
+    return "threads"
+
+
+async def awaitIfNeeded(result):
+    return await result if inspect.isawaitable(result) else result
+
+
+# ONE CONNECTION AND ITS CURSORS, WHATEVER THE DRIVER
+class AsyncConnection:
+    def __init__(self, connection, executor=None, placeholder="%s"):
+        """executor: the connection's own single thread, for a blocking driver."""
+        self.connection = connection
+        self.executor = executor
+        self.placeholder = placeholder
+
+    async def call(self, method, *args):
+        if self.executor is None:
+            return await awaitIfNeeded(method(*args))
+        return await asyncio.get_running_loop().run_in_executor(self.executor, method, *args)
+
+    async def cursor(self):
+        return AsyncCursor(await self.call(self.connection.cursor), self)
+
+    async def commit(self):
+        await self.call(self.connection.commit)
+
+    async def rollback(self):
+        await self.call(self.connection.rollback)
+
+    async def close(self):
+        try:
+            await self.call(self.connection.close)
+        finally:
+            if self.executor is not None:
+                self.executor.shutdown(wait=False)
+
+
+class AsyncCursor:
+    def __init__(self, cursor, connection):
+        self.cursor = cursor
+        self.connection = connection
+
+    def sql(self, sql):
+        return sql if self.connection.placeholder == "%s" else sql.replace("%s", self.connection.placeholder)
+
+    async def execute(self, sql, params=()):
+        await self.connection.call(self.cursor.execute, self.sql(sql), tuple(params))
+        return self
+
+    async def executemany(self, sql, seq_of_params):
+        await self.connection.call(self.cursor.executemany, self.sql(sql), list(seq_of_params))
+        return self
+
+    async def fetchone(self):
+        return await self.connection.call(self.cursor.fetchone)
+
+    async def fetchall(self):
+        return await self.connection.call(self.cursor.fetchall)
+
+    async def close(self):
+        await self.connection.call(self.cursor.close)
+
+    @property
+    def rowcount(self):
+        return self.cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self.cursor.lastrowid
+
+
+# BOUNDED POOL OF ASYNC CONNECTIONS
+class AsyncConnectionPool:
+    def __init__(self, backend, size=8, timeout=30, driver=None):
+        self.backend = backend
+        self.size = size
+        self.timeout = timeout
+        self.driver = driver or chooseDriver(backend)
+        self._idle = []
+        self._slots = asyncio.Semaphore(size)
+        self._closed = False
+
+    async def connect(self):
+        if self.driver == "aiosqlite":
+            connection = await aiosqlite.connect(self.backend.path, timeout=self.backend.timeout)
+            await connection.execute("PRAGMA journal_mode=WAL")
+            await connection.execute("PRAGMA foreign_keys=ON")
+            return AsyncConnection(connection, placeholder="?")
+        if self.driver == "aiomysql":
+            connection = await aiomysql.connect(host=self.backend.host, user=self.backend.user,
+                                                password=self.backend.password, db=self.backend.database,
+                                                autocommit=False)
+            return AsyncConnection(connection)
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="hms-async-db")
+        loop = asyncio.get_running_loop()
+        try:
+            connection = await loop.run_in_executor(executor, self.backend.connect)
+        except BaseException:
+            executor.shutdown(wait=False)
+            raise
+        # SQLiteConnection/SQLiteCursor already turn %s into ?
+        return AsyncConnection(connection, executor)
+
+    async def acquire(self):
+        if self._closed:
+            raise RuntimeError("connection pool is closed")
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.timeout)
+        except asyncio.TimeoutError:
+            raise PoolTimeout(f"no free connection after {self.timeout}s (pool size {self.size})")
+        try:
+            if self._idle:
+                return self._idle.pop()
+            return await self.connect()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    async def release(self, connection, discard=False):
+        try:
+            if discard or self._closed:
+                try:
+                    await connection.close()
+                except ASYNC_DB_ERRORS:
+                    pass
+            else:
+                self._idle.append(connection)
+        finally:
+            self._slots.release()
+
+    @asynccontextmanager
+    async def transaction(self):
+        """Borrow a connection and yield a cursor; commit when the block ends, roll back on error."""
+        connection = await self.acquire()
+        broken = False
+        try:
+            cursor = await connection.cursor()
+            try:
+                yield cursor
+                await connection.commit()
+            finally:
+                await cursor.close()
+        except BaseException:
+            try:
+                await connection.rollback()
+            except ASYNC_DB_ERRORS:
+                broken = True
+            raise
+        finally:
+            await self.release(connection, discard=broken)
+
+    async def close(self):
+        self._closed = True
+        while self._idle:
+            await self._idle.pop().close()
+
+
+# THE gauri.py DATA FUNCTIONS AS COROUTINES
+class AsyncHotel(HotelRules):
+    def __init__(self, pool, rooms, tariff, customers=None):
+        self.pool = pool
+        self.rooms = rooms
+        self.tariff = tariff
+        self.customers = customers or CustomerCache()
+
+    @classmethod
+    async def open(cls, pool, customers=None):
+        """Load the room engine and the tariff through pool and return the hotel."""
+        async with pool.transaction() as cursor:
+            await cursor.execute(ROOMS_SQL)
+            rooms = await cursor.fetchall()
+            await cursor.execute(STAYS_SQL)
+            stays = await cursor.fetchall()
+            await cursor.execute("SELECT SERVICE, CHOICE, ITEM, PRICE FROM TARIFF")
+            tariff = TariffCatalog(await cursor.fetchall())
+        return cls(pool, AvailabilityEngine.fromRows(rooms, stays), tariff, customers)
+
+    # CUSTOMERS
+    async def addCustomer(self, cid, name, address="", age="", country="", phone="", email=""):
+        values = self.customerValues(cid, name, address, age, country, phone, email)
+        try:
+            async with self.pool.transaction() as cursor:
+                await cursor.execute(CUSTOMER_INSERT, values)
+                await cursor.execute("INSERT INTO BALANCE (CID) VALUES (%s)", (values[0],))
+        except ASYNC_DB_ERRORS as err:
+            if await self.lookup(values[0]):
+                raise Conflict(f"customer {values[0]} already exists")
+            raise HotelError(str(err))
+        self.customers.put(values[0], values)
+        return values
+
+    async def lookup(self, cid):
+        # a miss is not cached by get(), so the row read here is put() afterwards
+        record = self.customers.get(cid, lambda key: None)
+        if record is None:
+            async with self.pool.transaction() as cursor:
+                await cursor.execute(CUSTOMER_SQL, (cid,))
+                record = await cursor.fetchone()
+            if record is not None:
+                self.customers.put(cid, record)
+        return record
+
+    async def customer(self, cid):
+        record = await self.lookup(cid)
+        if not record:
+            raise NotFound(f"customer {cid} not found")
+        return record
+
+    # ROOMS
+    async def book(self, cid, checkin, checkout, roomno):
+        await self.customer(cid)
+        checkin, checkout, roomno = self.reserveRoom(cid, checkin, checkout, roomno)
+        try:
+            async with self.pool.transaction() as cursor:
+                await cursor.execute(BOOKING_INSERT, (cid, checkin.isoformat(), checkout.isoformat(), roomno))
+        except BaseException:
+            self.rooms.release(roomno, checkin, checkout, cid)
+            raise
+        return (cid, checkin, checkout, roomno)
+
+    # CHARGES
+    async def charge(self, service, cid, choice, quantity, roomno=None):
+        """Record one charge and return (item, amount). quantity is days for ROOM_RENT."""
+        if str(service).upper() in SERVICES:
+            await self.customer(cid)
+        service, values, item, amount = self.priceCharge(service, cid, choice, quantity, roomno)
+        stay = self.holdChargedRoom(service, values)
+        try:
+            async with self.pool.transaction() as cursor:
+                if stay:
+                    checkin, checkout, roomno = stay
+                    await cursor.execute(BOOKING_INSERT, (cid, checkin.isoformat(), checkout.isoformat(), roomno))
+                for sql, params in chargeStatements(service, [values]):
+                    await cursor.executemany(sql, params)
+        except BaseException:
+            if stay:
+                self.rooms.release(stay[2], stay[0], stay[1], cid)
+            raise
+        return item, amount
+
+    # BILLS
+    async def bill(self, cid, save=False):
+        await self.customer(cid)
+        async with self.pool.transaction() as cursor:
+            await cursor.execute(BILLS.format(customers="C.CID = %s"), (cid,))
+            bill = makeBill(await cursor.fetchone())
+            if save:
+                for sql, params in billStatements([bill]):
+                    await cursor.executemany(sql, params)
+        return bill
+
+    async def history(self, cid, since=None, until=None, after=0, limit=HISTORY_PAGE):
+        await self.customer(cid)
+        since, until, after, limit = self.historyArguments(since, until, after, limit)
+        async with self.pool.transaction() as cursor:
+            await cursor.execute(*historyQuery(cid, after, since, until, limit))
+            return await cursor.fetchall()
+
+    async def billCheckedOut(self, asOf=None):
+        asOf = toDate(asOf) if asOf else date.today()
+        guests = f"C.CID IN ({UNBILLED_STAYS})"
+        async with self.pool.transaction() as cursor:
+            await cursor.execute(BILLS.format(customers=guests), (asOf.isoformat(),))
+            bills = [makeBill(row) for row in await cursor.fetchall()]
+            if bills:
+                for sql, params in billStatements(bills, asOf):
+                    await cursor.executemany(sql, params)
+        return bills
+
+
+# MODULE TO BENCHMARK MANY CONCURRENT SESSIONS ON ONE EVENT LOOP
+async def runSessions(hotel, customers, sessions, operations, seed=1, firstNew=None):
+    """sessions coroutines, each making `operations` calls of hms_bench.MIX; return (LatencyStats, seconds).
+
+    Existing customers are B0000000 .. customers - 1; new ones are numbered from firstNew."""
+    stats = LatencyStats(window=max(sessions * operations, 1))
+    firstNew = customers if firstNew is None else firstNew
+    newCustomers = iter(range(firstNew, firstNew + sessions * operations))
+
+    async def session(number):
+        rng = random.Random(f"{seed}-{number}")
+        for name in rng.choices(list(MIX), weights=list(MIX.values()), k=operations):
+            started = time.perf_counter()
+            ok = True
+            try:
+                if name == "userEntry":
+                    cid = customerId(next(newCustomers))
+                    await hotel.addCustomer(cid, f"Guest {cid}", "Walk In", 35, "India", "9000000000",
+                                            f"{cid.lower()}@example.com")
+                elif name == "roomRent":
+                    room = rng.randint(1, ROOMS)
+                    await hotel.charge("ROOM_RENT", customerId(rng.randrange(customers)), 1 + room % 4,
+                                       rng.randint(1, 3), room)
+                elif name == "restaurant":
+                    await hotel.charge("RESTAURANT", customerId(rng.randrange(customers)), rng.randint(1, 3),
+                                       rng.randint(1, 4))
+                elif name == "searchCustomer":
+                    await hotel.customer(customerId(rng.randrange(customers)))
+                else:
+                    await hotel.bill(customerId(rng.randrange(customers)), save=True)
+            except HotelError:
+                ok = False
+            stats.record(name, time.perf_counter() - started, ok)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(session(number) for number in range(sessions)))
+    return stats, time.perf_counter() - started
+
+
+async def benchmarkAsync(path, customers, sessions, operations, poolSize, seed, firstNew=None):
+    pool = AsyncConnectionPool(SQLiteBackend(path), size=poolSize)
+    try:
+        hotel = await AsyncHotel.open(pool)
+        stats, elapsed = await runSessions(hotel, customers, sessions, operations, seed, firstNew)
+    finally:
+        await pool.close()
+    return pool.driver, stats, elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the asyncio HMS data path with many concurrent sessions.")
+    parser.add_argument("--sessions", type=int, default=500, help="concurrent simulated sessions (default 500)")
+    parser.add_argument("--operations", type=int, default=10, help="calls per session (default 10)")
+    parser.add_argument("--customers", type=int, default=10000, help="customers seeded (default 10000)")
+    parser.add_argument("--charges-per-customer", type=int, default=5)
+    parser.add_argument("--pool-size", type=int, default=8, help="database connections (default 8)")
+    parser.add_argument("--compare-threads", action="store_true",
+                        help="also replay the same number of calls with one OS thread per session")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="hmsasync-") as scratch:
+        path = os.path.join(scratch, "async.db")
+        pool = ConnectionPool(SQLiteBackend(path), size=args.pool_size)
+        migrate(pool, verbose=False)
+        seedDatabase(pool, args.customers, args.customers * args.charges_per_customer, random.Random(args.seed))
+
+        calls = args.sessions * args.operations
+        if args.compare_threads:
+            # new customers of this run are numbered from args.customers, the async run's after them
+            stats, elapsed = replay(Hotel(pool), args.customers, calls, args.sessions, args.seed)
+            print(f"\n##### THREADS: {args.sessions} OS THREADS, {args.pool_size} CONNECTIONS #####")
+            print(f"{calls / elapsed:.0f} OPERATIONS/SECOND")
+            print(stats.report())
+        pool.close()
+
+        driver, stats, elapsed = asyncio.run(benchmarkAsync(path, args.customers, args.sessions, args.operations,
+                                                            args.pool_size, args.seed, args.customers + calls))
+        print(f"\n##### ASYNCIO: {args.sessions} SESSIONS ON ONE EVENT LOOP, {args.pool_size} CONNECTIONS ({driver}) #####")
+        print(f"{calls / elapsed:.0f} OPERATIONS/SECOND")
+        print(stats.report())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# GROUP COMMIT OF SERVICE CHARGES FOR THE HOTEL MANAGEMENT SYSTEM
+#
+# Posting a charge used to be one INSERT, one BALANCE update and one commit,
+# so every restaurant order paid a full fsync of its own. ChargeBatcher sits
+# between the callers and the database: post() queues the charge and blocks,
+# and a single writer thread commits everything queued in one transaction.
+# With maxDelay=0 a group is whatever arrived while the previous group was
+# being committed; a positive maxDelay holds each group open that many seconds
+# longer, which pays off when fsync is slow. A group never exceeds maxRows.
+# post() returns only after its group has committed, so the acknowledgement is
+# as durable as before, but one fsync now covers a whole group of charges.
+#
+#   batcher = ChargeBatcher(pool, maxDelay=0, maxRows=500)
+#   hotel = Hotel(pool, batcher=batcher)
+#   ...
+#   batcher.close()          # commits whatever is still queued
+#
+# If a group fails, its charges are retried one by one, so a bad charge fails
+# only its own caller. A charge whose future was cancelled before its group was
+# collected is dropped; once collected, it can no longer be cancelled.
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from hms_billing import recordCharges
+
+STOP = object()
+
+
+class ChargeBatcher:
+    def __init__(self, pool, maxDelay=0, maxRows=500):
+        self.pool = pool
+        self.maxDelay = maxDelay
+        self.maxRows = maxRows
+        self.batches = 0
+        self.rows = 0
+        self.largest = 0
+        self._queue = queue.Queue()
+        self._closed = False
+        self._lock = threading.Lock()
+        self._writer = threading.Thread(target=self._run, name="hms-group-commit", daemon=True)
+        self._writer.start()
+
+    def submit(self, table, values):
+        """Queue one service-table row (CID first, charge last); return a Future."""
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("charge batcher is closed")
+            self._queue.put((table, tuple(values), future))
+        return future
+
+    def post(self, table, values, timeout=None):
+        """Record one charge and return once the group holding it has committed."""
+        return self.submit(table, values).result(timeout)
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(STOP)
+        self._writer.join()
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "rows": self.rows,
+            "averageBatch": round(self.rows / self.batches, 1) if self.batches else 0.0,
+            "largestBatch": self.largest,
+        }
+
+    # MODULE THAT COLLECTS A GROUP AND COMMITS IT (WRITER THREAD ONLY)
+    def _run(self):
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is STOP:
+                break
+            batch = [first]
+            deadline = time.monotonic() + self.maxDelay
+            while len(batch) < self.maxRows:
+                try:
+                    remaining = deadline - time.monotonic()
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            # claim the futures; a cancelled one is not written and not resolved
+            batch = [item for item in batch if item[2].set_running_or_notify_cancel()]
+            if batch:
+                self._commit(batch)
+
+    def _commit(self, batch):
+        try:
+            self._write(batch)
+        except Exception as err:
+            if len(batch) == 1:
+                batch[0][2].set_exception(err)
+                return
+            for item in batch:
+                self._commit([item])
+            return
+        self.batches += 1
+        self.rows += len(batch)
+        self.largest = max(self.largest, len(batch))
+        for table, values, future in batch:
+            future.set_result(None)
+
+    def _write(self, batch):
+        byTable = {}
+        for table, values, future in batch:
+            byTable.setdefault(table, []).append(values)
+        with self.pool.transaction() as cursor:
+            for table, rows in byTable.items():
+                recordCharges(cursor, table, rows)
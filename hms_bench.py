@@ -0,0 +1,213 @@
+# BENCHMARK OF HMS OPERATIONS AT SEVERAL DATABASE SIZES
+#
+#   python hms_bench.py                                   # 1k/10k/100k customers
+#   python hms_bench.py --scales 1000,50000 --charges-per-customer 20 --threads 8
+#   python hms_bench.py --dir /tmp/hmsbench --json results.json
+#   python hms_bench.py --memory                          # in-memory, one thread
+#
+# For every scale a fresh SQLite database (a file in a temporary directory or
+# under --dir, or with --memory an in-memory database) is
+# seeded with N customers and N * --charges-per-customer charges spread over the
+# four service tables. Then --operations calls are replayed through
+# hms_ops.Hotel in the same mix the front desk produces from gauri.py:
+# userEntry, roomRent, restaurant, searchCustomer and totalAmount. Throughput
+# and p50/p99 per operation are printed per scale, and --json writes them in
+# a form that can be compared between runs. In-memory databases use SQLite's
+# shared cache, which fails concurrent writers with "table is locked" instead of
+# waiting, so --memory always replays on a single thread.
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from hms_batch import ChargeBatcher
+from hms_billing import openBalances, recordCharges
+from hms_db import ConnectionPool, SQLiteBackend
+from hms_ops import Hotel, HotelError
+from hms_schema import migrate
+from hms_stats import LatencyStats
+from hms_tariff import MENUS
+
+# operation -> relative weight in the replayed mix
+MIX = {
+    "userEntry": 5,
+    "roomRent": 10,
+    "restaurant": 30,
+    "searchCustomer": 40,
+    "totalAmount": 15,
+}
+ROOMS = 400
+SEED_CHUNK = 5000
+
+
+def customerId(number):
+    return f"B{number:07d}"
+
+
+# MODULE TO FILL A FRESH DATABASE WITH CUSTOMERS AND CHARGES
+def seedDatabase(pool, customers, charges, rng):
+    with pool.transaction() as cursor:
+        cursor.executemany("INSERT INTO ROOMS (ROOMNO, ROOM_CHOICE) VALUES (%s, %s)",
+                           [(room, 1 + room % 4) for room in range(1, ROOMS + 1)])
+    for first in range(0, customers, SEED_CHUNK):
+        cids = [customerId(number) for number in range(first, min(first + SEED_CHUNK, customers))]
+        with pool.transaction() as cursor:
+            cursor.executemany(
+                "INSERT INTO C_DETAILS VALUES (%s, %s, %s, %s, %s, %s, %s)",
+                [(cid, f"Guest {cid}", "Seed Street", str(rng.randint(18, 80)), "India",
+                  str(rng.randint(7000000000, 9999999999)), f"{cid.lower()}@example.com") for cid in cids],
+            )
+            openBalances(cursor, cids)
+    services = list(MENUS)
+    for first in range(0, charges, SEED_CHUNK):
+        rows = {service: [] for service in services}
+        for number in range(first, min(first + SEED_CHUNK, charges)):
+            cid = customerId(rng.randrange(customers))
+            service = rng.choice(services)
+            choice = rng.choice(list(MENUS[service]))
+            quantity = rng.randint(1, 4)
+            amount = quantity * MENUS[service][choice][1]
+            if service == "ROOM_RENT":
+                rows[service].append((cid, choice, quantity, rng.randint(1, ROOMS), amount))
+            else:
+                rows[service].append((cid, choice, quantity, amount))
+        with pool.transaction() as cursor:
+            for service, serviceRows in rows.items():
+                if serviceRows:
+                    recordCharges(cursor, service, serviceRows)
+
+
+# ONE CALL PER MENU ENTRY, AS gauri.py MAKES THEM
+class Workload:
+    def __init__(self, hotel, customers, seed):
+        self.hotel = hotel
+        self.customers = customers
+        self.seed = seed
+
+    def run(self, index, name):
+        """Make operation number index of the plan.
+
+        Its arguments depend only on the seed and index, never on which thread
+        runs it or when, so the same seed replays the same calls."""
+        if name == "userEntry":
+            return self.userEntry(customerId(self.customers + index))
+        return getattr(self, name)(random.Random(f"{self.seed}-{index}"))
+
+    def anyCustomer(self, rng):
+        return customerId(rng.randrange(self.customers))
+
+    def userEntry(self, cid):
+        self.hotel.addCustomer(cid, f"Guest {cid}", "Walk In", 35, "India", "9000000000", f"{cid.lower()}@example.com")
+
+    def roomRent(self, rng):
+        room = rng.randint(1, ROOMS)
+        self.hotel.charge("ROOM_RENT", self.anyCustomer(rng), 1 + room % 4, rng.randint(1, 3), room)
+
+    def restaurant(self, rng):
+        self.hotel.charge("RESTAURANT", self.anyCustomer(rng), rng.randint(1, 3), rng.randint(1, 4))
+
+    def searchCustomer(self, rng):
+        self.hotel.customer(self.anyCustomer(rng))
+
+    def totalAmount(self, rng):
+        self.hotel.bill(self.anyCustomer(rng), save=True)
+
+
+def replay(hotel, customers, operations, threads, seed):
+    """Run `operations` calls of MIX on `threads` threads; return (LatencyStats, seconds)."""
+    workload = Workload(hotel, customers, seed)
+    plan = random.Random(seed).choices(list(MIX), weights=list(MIX.values()), k=operations)
+    stats = LatencyStats(window=max(operations, 1))
+
+    def run(index, name):
+        started = time.perf_counter()
+        ok = True
+        try:
+            workload.run(index, name)
+        except HotelError:
+            ok = False
+        stats.record(name, time.perf_counter() - started, ok)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        for _ in executor.map(run, range(len(plan)), plan):
+            pass
+    return stats, time.perf_counter() - started
+
+
+def benchmark(customers, chargesPerCustomer, operations, threads, directory=None, seed=1, groupCommit=None):
+    """Seed a fresh database in directory (in memory if None) and replay the mix on it.
+
+    groupCommit, if given, is the ChargeBatcher delay in seconds."""
+    path = ":memory:"
+    if directory:
+        path = os.path.join(directory, f"bench-{customers}.db")
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+    pool = ConnectionPool(SQLiteBackend(path), size=threads)
+    try:
+        migrate(pool, verbose=False)
+        started = time.perf_counter()
+        seedDatabase(pool, customers, customers * chargesPerCustomer, random.Random(seed))
+        seeded = time.perf_counter() - started
+        batcher = ChargeBatcher(pool, groupCommit) if groupCommit is not None else None
+        try:
+            stats, elapsed = replay(Hotel(pool, batcher=batcher), customers, operations, threads, seed)
+        finally:
+            if batcher:
+                batcher.close()
+    finally:
+        pool.close()
+    result = {
+        "customers": customers,
+        "charges": customers * chargesPerCustomer,
+        "seed_seconds": round(seeded, 3),
+        "operations": operations,
+        "threads": threads,
+        "group_commit_ms": groupCommit * 1000 if groupCommit is not None else None,
+        "ops_per_second": round(operations / elapsed, 1) if elapsed else 0.0,
+        "latency": stats.summary(),
+    }
+    return result, stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark HMS operations at several database sizes.")
+    parser.add_argument("--scales", default="1000,10000,100000", help="comma-separated customer counts")
+    parser.add_argument("--charges-per-customer", type=int, default=10)
+    parser.add_argument("--operations", type=int, default=5000, help="calls replayed per scale")
+    parser.add_argument("--threads", type=int, default=4, help="concurrent front-desk sessions")
+    parser.add_argument("--dir", help="keep the SQLite files here (default: a temporary directory)")
+    parser.add_argument("--memory", action="store_true", help="use in-memory databases (single thread)")
+    parser.add_argument("--group-commit-ms", type=float, help="post charges through a ChargeBatcher with this delay")
+    parser.add_argument("--seed", type=int, default=1, help="random seed, for repeatable runs")
+    parser.add_argument("--json", metavar="FILE", help="also write the results as JSON")
+    args = parser.parse_args(argv)
+    threads = 1 if args.memory else args.threads
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="hmsbench-") as scratch:
+        directory = None if args.memory else args.dir or scratch
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        for customers in [int(scale) for scale in args.scales.split(",") if scale.strip()]:
+            groupCommit = args.group_commit_ms / 1000 if args.group_commit_ms is not None else None
+            result, stats = benchmark(customers, args.charges_per_customer, args.operations,
+                                      threads, directory, args.seed, groupCommit)
+            results.append(result)
+            print(f"\n##### {customers} CUSTOMERS, {result['charges']} CHARGES "
+                  f"(seeded in {result['seed_seconds']:.2f} s) #####")
+            print(f"{result['ops_per_second']:.0f} OPERATIONS/SECOND ON {threads} THREADS")
+            print(stats.report())
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+# BILL COMPUTATION FOR THE HOTEL MANAGEMENT SYSTEM
+#
+# Every charge is appended to LEDGER (ROOM_RENT, RESTAURANT, GAMING and FASHION
+# are read-only views over it), and every customer has one BALANCE row holding
+# the running sum of their charges per service. recordCharge() appends the
+# charge and adds it to BALANCE in the same transaction, so producing a bill is
+# a primary-key read instead of a scan of the ledger. BALANCE also holds what
+# the customer's bills have covered so far (BILLED_* and the last ledger entry
+# billed); a bill is the difference, so it only covers charges since the last
+# one. The grouped aggregate over the ledger is still used to rebuild BALANCE
+# and to check it (--check / --rebuild-balances); hms_ledger.py has snapshots,
+# audits and replay.
+#
+#   python hms_billing.py --sqlite HMS.db              # bill every checked-out guest
+#   python hms_billing.py --sqlite HMS.db --as-of 2026-01-31
+#   python hms_billing.py --sqlite HMS.db --check
+
+import argparse
+from collections import namedtuple
+from datetime import date, datetime
+
+from hms_db import ConnectionPool, addBackendArguments, backendFromArguments
+from hms_schema import BILLED_COLUMNS, LEDGER_COLUMNS, columnNames, migrate
+
+# Field order matches BILL_INSERT; entry is the last LEDGER entry the bill covers
+Bill = namedtuple("Bill", "cid name roomrent restaurant gaming fashion total entry", defaults=(None,))
+
+# BALANCE column each service table's charge (its last column) is added to
+BALANCE_COLUMN = {
+    "ROOM_RENT": "ROOMRENT",
+    "RESTAURANT": "RESTAURANTBILL",
+    "GAMING": "GAMINGBILL",
+    "FASHION": "FASHIONBILL",
+}
+
+# Per-charge amounts split by service, from the ledger
+LEDGER_CHARGES = """
+    SELECT CID,
+           CASE WHEN SERVICE = 'ROOM_RENT' THEN AMOUNT ELSE 0 END AS ROOM,
+           CASE WHEN SERVICE = 'RESTAURANT' THEN AMOUNT ELSE 0 END AS FOOD,
+           CASE WHEN SERVICE = 'GAMING' THEN AMOUNT ELSE 0 END AS GAMES,
+           CASE WHEN SERVICE = 'FASHION' THEN AMOUNT ELSE 0 END AS SHOP
+    FROM LEDGER WHERE {where}
+"""
+
+# Per-customer sums of one of the charge queries above
+AGGREGATE = """
+SELECT C.CID,
+       COALESCE(SUM(CH.ROOM), 0) AS ROOM, COALESCE(SUM(CH.FOOD), 0) AS FOOD,
+       COALESCE(SUM(CH.GAMES), 0) AS GAMES, COALESCE(SUM(CH.SHOP), 0) AS SHOP
+FROM C_DETAILS C
+LEFT JOIN ({charges}) CH ON CH.CID = C.CID
+GROUP BY C.CID
+"""
+
+# What each customer owes since their last bill
+BILLS = """
+SELECT C.CID, C.C_NAME,
+       B.ROOMRENT - B.BILLED_ROOMRENT, B.RESTAURANTBILL - B.BILLED_RESTAURANTBILL,
+       B.GAMINGBILL - B.BILLED_GAMINGBILL, B.FASHIONBILL - B.BILLED_FASHIONBILL,
+       (SELECT MAX(L.ENTRY_NO) FROM LEDGER L WHERE L.CID = C.CID)
+FROM C_DETAILS C
+JOIN BALANCE B ON B.CID = C.CID
+WHERE {customers}
+ORDER BY C.CID
+"""
+
+# One page of a customer's bills, oldest first, after bill number %s
+HISTORY = """
+SELECT BILL_NO, BILLED_AT, C_NAME, ROOMRENT, RESTAURANTBILL, GAMINGBILL, FASHIONBILL, TOTALAMOUNT
+FROM TOTAL
+WHERE CID = %s AND BILL_NO > %s{dates}
+ORDER BY BILL_NO
+LIMIT %s
+"""
+
+CHECKED_OUT = "SELECT CID FROM BOOKING_RECORD WHERE CHECK_OUT <= %s"
+# Guests with a stay ended by %s that no final bill dated on or after its
+# check-out covers; month-end bills (MONTH_BILL) do not count
+UNBILLED_STAYS = """
+SELECT R.CID FROM BOOKING_RECORD R
+WHERE R.CHECK_OUT <= %s
+  AND NOT EXISTS (SELECT 1 FROM TOTAL T WHERE T.CID = R.CID AND T.BILLED_AT >= R.CHECK_OUT)
+"""
+
+
+def makeBill(row):
+    cid, name, roomrent, restaurant, gaming, fashion, entry = row
+    roomrent, restaurant, gaming, fashion = int(roomrent), int(restaurant), int(gaming), int(fashion)
+    return Bill(cid, name, roomrent, restaurant, gaming, fashion, roomrent + restaurant + gaming + fashion,
+                int(entry or 0))
+
+
+# MODULE TO OPEN A ZERO BALANCE FOR NEW CUSTOMERS (SAME TRANSACTION AS C_DETAILS)
+def openBalances(cursor, cids):
+    cursor.executemany("INSERT INTO BALANCE (CID) VALUES (%s)", [(cid,) for cid in cids])
+
+
+def insertSql(table):
+    columns = columnNames(table)
+    return f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
+
+
+def balanceUpdate(table, amounts):
+    """(sql, parameter rows) adding {cid: amount} to the service's BALANCE column."""
+    column = BALANCE_COLUMN[table]
+    sql = f"UPDATE BALANCE SET {column} = {column} + %s, TOTALAMOUNT = TOTALAMOUNT + %s WHERE CID = %s"
+    return sql, [(amount, amount, cid) for cid, amount in amounts.items()]
+
+
+def addToBalance(cursor, table, amounts):
+    cursor.executemany(*balanceUpdate(table, amounts))
+
+
+LEDGER_INSERT = (
+    "INSERT INTO LEDGER (POSTED_AT, CID, SERVICE, CHOICE, QUANTITY, ROOMNO, AMOUNT) "
+    "VALUES (%s, %s, %s, %s, %s, %s, %s)"
+)
+
+
+def ledgerEntry(table, row, postedAt):
+    """LEDGER_INSERT values for one row shaped like the service table's columns."""
+    entry = dict(zip(LEDGER_COLUMNS[table], row))
+    return (postedAt, entry["CID"], table, int(entry["CHOICE"]), int(entry["QUANTITY"]),
+            entry.get("ROOMNO"), int(entry["AMOUNT"]))
+
+
+# MODULE TO RECORD CHARGES AND KEEP THE RUNNING BALANCE IN STEP
+def chargeStatements(table, rows):
+    """(sql, parameter rows) pairs that append service-table rows to LEDGER and add them to BALANCE."""
+    postedAt = datetime.now().isoformat(timespec="microseconds")
+    amounts = {}
+    for row in rows:
+        amounts[row[0]] = amounts.get(row[0], 0) + int(row[-1])
+    return [(LEDGER_INSERT, [ledgerEntry(table, row, postedAt) for row in rows]), balanceUpdate(table, amounts)]
+
+
+def recordCharges(cursor, table, rows):
+    """Append service-table rows (CID first, charge last) to LEDGER and add them to BALANCE."""
+    for sql, params in chargeStatements(table, rows):
+        cursor.executemany(sql, params)
+
+
+def recordCharge(cursor, table, values):
+    recordCharges(cursor, table, [values])
+
+
+def computeBill(cursor, cid):
+    """Return the Bill for one customer, or None if the customer does not exist."""
+    cursor.execute(BILLS.format(customers="C.CID = %s"), (cid,))
+    row = cursor.fetchone()
+    return makeBill(row) if row else None
+
+
+def checkedOutBills(cursor, asOf=None, unbilledOnly=True):
+    """Return bills for every guest whose stay ended on or before asOf, in one query.
+
+    With unbilledOnly, a guest is left out when every such stay already has a
+    bill dated on or after its check-out."""
+    guests = "C.CID IN (" + (UNBILLED_STAYS if unbilledOnly else CHECKED_OUT) + ")"
+    cursor.execute(BILLS.format(customers=guests), ((asOf or date.today()).isoformat(),))
+    return [makeBill(row) for row in cursor.fetchall()]
+
+
+BILL_INSERT = (
+    "INSERT INTO TOTAL (CID, C_NAME, ROOMRENT, RESTAURANTBILL, GAMINGBILL, FASHIONBILL, TOTALAMOUNT, ENTRY_NO, "
+    "BILLED_AT) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)"
+)
+
+# Adds a saved bill to what the customer has been billed
+BILLED_UPDATE = (
+    "UPDATE BALANCE SET " + ", ".join(f"{column} = {column} + %s" for column in BILLED_COLUMNS.values())
+    + ", BILLED_ENTRY_NO = %s WHERE CID = %s"
+)
+
+
+# MODULE TO SAVE BILLS AND MARK WHAT THEY COVER (SAME TRANSACTION AS THE BILLS READ)
+def billStatements(bills, billedAt=None):
+    """(sql, parameter rows) pairs that write bills to TOTAL and add them to BALANCE's billed amounts."""
+    billedAt = (billedAt or date.today()).isoformat()
+    return [
+        (BILL_INSERT, [tuple(bill) + (billedAt,) for bill in bills]),
+        (BILLED_UPDATE, [(bill.roomrent, bill.restaurant, bill.gaming, bill.fashion, bill.entry, bill.cid)
+                         for bill in bills]),
+    ]
+
+
+def saveBills(cursor, bills, billedAt=None):
+    if bills:
+        for sql, params in billStatements(bills, billedAt):
+            cursor.executemany(sql, params)
+
+
+# MODULE TO READ A CUSTOMER'S BILL HISTORY ONE PAGE AT A TIME
+def historyPage(cursor, cid, after=0, since=None, until=None, limit=50):
+    """Bills with BILL_NO > after, optionally billed in [since, until], at most limit rows.
+
+    Pass the BILL_NO of the last row as `after` to get the next page; the
+    (CID, BILL_NO) index makes every page an index range scan. Bills saved
+    before bill dates were recorded have no BILLED_AT and are skipped by a
+    date filter."""
+    cursor.execute(*historyQuery(cid, after, since, until, limit))
+    return cursor.fetchall()
+
+
+def historyQuery(cid, after=0, since=None, until=None, limit=50):
+    """(sql, params) of one historyPage."""
+    dates, params = "", [cid, after]
+    if since:
+        dates += " AND BILLED_AT >= %s"
+        params.append(since.isoformat())
+    if until:
+        dates += " AND BILLED_AT <= %s"
+        params.append(until.isoformat())
+    return HISTORY.format(dates=dates), params + [limit]
+
+
+def billHistory(pool, cid, since=None, until=None, pageSize=50):
+    """Yield pages of a customer's bills; each page is its own short query."""
+    after = 0
+    while True:
+        with pool.transaction() as cursor:
+            page = historyPage(cursor, cid, after, since, until, pageSize)
+        if not page:
+            return
+        yield page
+        if len(page) < pageSize:
+            return
+        after = page[-1][0]
+
+
+# Per-customer billed amounts: the ledger up to the entry their latest bill covers
+BILLED_AGGREGATE = AGGREGATE.format(charges=LEDGER_CHARGES.format(
+    where="ENTRY_NO <= (SELECT COALESCE(MAX(T.ENTRY_NO), 0) FROM TOTAL T WHERE T.CID = LEDGER.CID)"))
+
+
+# MODULE TO REBUILD BALANCE FROM THE RAW CHARGE ROWS AND THE SAVED BILLS
+def rebuildBalances(cursor):
+    cursor.execute("DELETE FROM BALANCE")
+    cursor.execute(
+        "INSERT INTO BALANCE (CID, ROOMRENT, RESTAURANTBILL, GAMINGBILL, FASHIONBILL, TOTALAMOUNT) "
+        "SELECT CID, ROOM, FOOD, GAMES, SHOP, ROOM + FOOD + GAMES + SHOP FROM ("
+        + AGGREGATE.format(charges=LEDGER_CHARGES.format(where="1 = 1")) + ") T"
+    )
+    cursor.execute(BILLED_AGGREGATE)
+    billed = [(int(room), int(food), int(games), int(shop), cid) for cid, room, food, games, shop in cursor.fetchall()]
+    cursor.executemany(
+        "UPDATE BALANCE SET " + ", ".join(f"{column} = %s" for column in BILLED_COLUMNS.values()) + " WHERE CID = %s",
+        billed,
+    )
+    cursor.execute(
+        "UPDATE BALANCE SET BILLED_ENTRY_NO = "
+        "(SELECT COALESCE(MAX(T.ENTRY_NO), 0) FROM TOTAL T WHERE T.CID = BALANCE.CID)"
+    )
+
+
+# MODULE TO CHECK BALANCE AGAINST THE RAW CHARGE ROWS AND THE SAVED BILLS
+def checkBalances(cursor):
+    """Return (cid, stored, actual) for every customer whose BALANCE row is wrong or missing.
+
+    stored and actual are (charged per service..., billed per service...)."""
+    cursor.execute(
+        "SELECT CID, ROOMRENT, RESTAURANTBILL, GAMINGBILL, FASHIONBILL, "
+        + ", ".join(BILLED_COLUMNS.values()) + " FROM BALANCE"
+    )
+    stored = {row[0]: tuple(int(value) for value in row[1:]) for row in cursor.fetchall()}
+    cursor.execute(AGGREGATE.format(charges=LEDGER_CHARGES.format(where="1 = 1")))
+    charged = {row[0]: tuple(int(value) for value in row[1:]) for row in cursor.fetchall()}
+    cursor.execute(BILLED_AGGREGATE)
+    billed = {row[0]: tuple(int(value) for value in row[1:]) for row in cursor.fetchall()}
+    problems = []
+    for cid, amounts in charged.items():
+        actual = amounts + billed[cid]
+        expected = stored.pop(cid, None)
+        if expected != actual:
+            problems.append((cid, expected, actual))
+    problems.extend((cid, values, None) for cid, values in stored.items())
+    return problems
+
+
+def printBill(bill):
+    print("\n ** CROWN PLAZA MIAMI ** CUSTOMER BILLING **")
+    print("\n CUSTOMER NAME: ", bill.name)
+    print("\n ROOM RENT: Rs. ", bill.roomrent)
+    print("\n RESTAURANT BILL: Rs. ", bill.restaurant)
+    print("\n FASHION BILL: Rs. ", bill.fashion)
+    print("\n GAMING BILL: Rs. ", bill.gaming)
+    print("\n TOTAL AMOUNT: Rs. ", bill.total)
+
+
+# MODULE TO BILL EVERY CHECKED-OUT GUEST IN ONE PASS
+def billCheckedOut(pool, asOf=None, unbilledOnly=True):
+    with pool.transaction() as cursor:
+        bills = checkedOutBills(cursor, asOf, unbilledOnly)
+        # dated asOf, so stays that end later are billed by a later run
+        saveBills(cursor, bills, asOf)
+    return bills
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate bills for every checked-out HMS guest.")
+    addBackendArguments(parser)
+    parser.add_argument("--as-of", type=date.fromisoformat, help="bill stays that ended on or before this date (default today)")
+    parser.add_argument("--rebill", action="store_true", help="also bill guests whose stays were billed after check-out")
+    parser.add_argument("--check", action="store_true", help="compare BALANCE with the raw charge rows and saved bills and exit")
+    parser.add_argument("--rebuild-balances", action="store_true", help="recompute BALANCE from the raw charge rows and saved bills and exit")
+    args = parser.parse_args(argv)
+
+    pool = ConnectionPool(backendFromArguments(args), size=1)
+    migrate(pool)
+    if args.check or args.rebuild_balances:
+        with pool.transaction() as cursor:
+            if args.rebuild_balances:
+                rebuildBalances(cursor)
+                print("BALANCE REBUILT FROM CHARGE ROWS")
+            problems = checkBalances(cursor)
+        pool.close()
+        for cid, stored, actual in problems:
+            print(f"{cid:<20}BALANCE {stored}  CHARGES AND BILLS {actual}")
+        print(f"\n{len(problems)} CUSTOMERS WITH A WRONG OR MISSING BALANCE")
+        raise SystemExit(1 if problems else 0)
+
+    bills = billCheckedOut(pool, args.as_of, unbilledOnly=not args.rebill)
+    pool.close()
+    for bill in bills:
+        print(f"{bill.cid:<20}{bill.name or '':<30}Rs. {bill.total}")
+    print(f"\n{len(bills)} BILLS GENERATED, TOTAL Rs. {sum(bill.total for bill in bills)}")
+
+
+if __name__ == "__main__":
+    main()
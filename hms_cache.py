@@ -0,0 +1,83 @@
+# IN-PROCESS CACHE OF CUSTOMER RECORDS FOR THE HOTEL MANAGEMENT SYSTEM
+#
+# Every billing function in gauri.py starts with a C_DETAILS lookup, so one
+# checkout used to read the same row five times. CustomerCache keeps the most
+# recently used records, keyed by CID, up to maxSize entries and for at most
+# ttl seconds each. Writers call put() (write-through) or invalidate() after
+# they commit; the TTL bounds staleness from writers in other processes.
+# Missing customers are not cached, so a new CID is visible immediately.
+
+import threading
+import time
+from collections import OrderedDict
+
+CUSTOMER_SQL = "SELECT * FROM C_DETAILS WHERE CID = %s"
+
+
+def fetchCustomer(pool, cid):
+    with pool.transaction() as cursor:
+        cursor.execute(CUSTOMER_SQL, (cid,))
+        return cursor.fetchone()
+
+
+class CustomerCache:
+    def __init__(self, maxSize=1024, ttl=300, clock=time.monotonic):
+        self.maxSize = maxSize
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, cid, load):
+        """Return the cached record for cid, calling load(cid) on a miss."""
+        with self._lock:
+            entry = self._entries.get(cid)
+            if entry is not None:
+                record, expires = entry
+                if self.clock() < expires:
+                    self._entries.move_to_end(cid)
+                    self.hits += 1
+                    return record
+                del self._entries[cid]
+                self.expirations += 1
+            self.misses += 1
+        record = load(cid)
+        if record is not None:
+            self.put(cid, record)
+        return record
+
+    def lookup(self, pool, cid):
+        return self.get(cid, lambda key: fetchCustomer(pool, key))
+
+    def put(self, cid, record):
+        with self._lock:
+            self._entries[cid] = (record, self.clock() + self.ttl)
+            self._entries.move_to_end(cid)
+            while len(self._entries) > self.maxSize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, cid):
+        with self._lock:
+            self._entries.pop(cid, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxSize": self.maxSize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
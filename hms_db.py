@@ -0,0 +1,286 @@
+# DATA ACCESS LAYER FOR THE HOTEL MANAGEMENT SYSTEM (gauri.py)
+#
+# A storage backend knows how to open a connection to one database; the
+# ConnectionPool hands a bounded number of those connections out to callers so
+# that several terminals no longer share (and serialize on) one socket.
+#
+#   backend = SQLiteBackend("HMS.db")            # or MySQLBackend(user, password)
+#   pool = ConnectionPool(backend, size=5)
+#   with pool.transaction() as cursor:
+#       cursor.execute("SELECT * FROM C_DETAILS WHERE CID = %s", (cid,))
+#
+# All SQL in the system is written with MySQL's %s placeholders; the SQLite
+# backend rewrites them to ? so the same statements run on both.
+
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+try:
+    import mysql.connector
+except ImportError:  # the embedded SQLite backend works without the MySQL driver
+    mysql = None
+
+# Errors raised by either driver, for callers that want to report them
+DB_ERRORS = (sqlite3.Error,) + ((mysql.connector.Error,) if mysql else ())
+
+
+class PoolTimeout(Exception):
+    """No pooled connection became free within the pool's timeout."""
+
+
+# BACKEND FOR A MYSQL SERVER
+class MySQLBackend:
+    dialect = "mysql"
+
+    def __init__(self, user, password, host="localhost", database="HMS"):
+        if mysql is None:
+            raise RuntimeError("mysql-connector-python is not installed")
+        self.user = user
+        self.password = password
+        self.host = host
+        self.database = database
+
+    def _connect(self, **extra):
+        return mysql.connector.connect(
+            host=self.host,
+            user=self.user,
+            passwd=self.password,
+            auth_plugin='mysql_native_password',
+            **extra
+        )
+
+    def createDatabase(self):
+        connection = self._connect()
+        try:
+            cursor = connection.cursor()
+            cursor.execute("CREATE DATABASE IF NOT EXISTS " + self.database)
+            connection.commit()
+            cursor.close()
+        finally:
+            connection.close()
+
+    def connect(self):
+        return self._connect(database=self.database)
+
+    def __repr__(self):
+        return f"MySQLBackend({self.user}@{self.host}/{self.database})"
+
+
+# BACKEND FOR AN EMBEDDED SQLITE FILE (NO SERVER NEEDED)
+class SQLiteBackend:
+    dialect = "sqlite"
+
+    def __init__(self, path="HMS.db", timeout=30):
+        self.path = path
+        self.timeout = timeout
+        self._anchor = None
+        if path == ":memory:":
+            # every pooled connection must see the same in-memory database, and
+            # it only lives while at least one connection to it stays open
+            self._uri = f"file:hms-{uuid.uuid4().hex}?mode=memory&cache=shared"
+            self._anchor = self._open()
+        else:
+            self._uri = None
+
+    def createDatabase(self):
+        # sqlite creates the file on first connect
+        pass
+
+    def _open(self):
+        if self._uri:
+            connection = sqlite3.connect(self._uri, uri=True, timeout=self.timeout, check_same_thread=False)
+        else:
+            connection = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA foreign_keys=ON")
+        return connection
+
+    def connect(self):
+        return SQLiteConnection(self._open())
+
+    def __repr__(self):
+        return f"SQLiteBackend({self.path})"
+
+
+class SQLiteConnection:
+    """sqlite3 connection with the small mysql.connector surface gauri.py uses."""
+
+    def __init__(self, connection):
+        self._connection = connection
+
+    def cursor(self):
+        return SQLiteCursor(self._connection.cursor())
+
+    def commit(self):
+        self._connection.commit()
+
+    def rollback(self):
+        self._connection.rollback()
+
+    def close(self):
+        self._connection.close()
+
+    def is_connected(self):
+        try:
+            self._connection.execute("SELECT 1")
+            return True
+        except sqlite3.Error:
+            return False
+
+
+class SQLiteCursor:
+    """sqlite3 cursor that accepts MySQL-style %s placeholders."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, sql, params=()):
+        self._cursor.execute(sql.replace("%s", "?"), params)
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        self._cursor.executemany(sql.replace("%s", "?"), seq_of_params)
+        return self
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchmany(self, size=100):
+        return self._cursor.fetchmany(size)
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def close(self):
+        self._cursor.close()
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+
+# BOUNDED POOL OF CONNECTIONS SHARED BY ALL CALLERS
+# statement that starts a read transaction seeing one point in time
+SNAPSHOT_BEGIN = {"sqlite": "BEGIN", "mysql": "START TRANSACTION WITH CONSISTENT SNAPSHOT"}
+
+
+class ConnectionPool:
+    def __init__(self, backend, size=5, timeout=30, queryLog=None):
+        """queryLog: an hms_querylog.QueryLog that times every statement and the wait for a connection."""
+        self.backend = backend
+        self.size = size
+        self.timeout = timeout
+        self.queryLog = queryLog
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._closed = False
+
+    def acquire(self):
+        if self._closed:
+            raise RuntimeError("connection pool is closed")
+        started = time.perf_counter()
+        free = self._slots.acquire(timeout=self.timeout)
+        if self.queryLog:
+            self.queryLog.recordWait(time.perf_counter() - started, ok=free)
+        if not free:
+            raise PoolTimeout(f"no free connection after {self.timeout}s (pool size {self.size})")
+        try:
+            while True:
+                try:
+                    connection = self._idle.get_nowait()
+                except queue.Empty:
+                    connection = self.backend.connect()
+                    return self.queryLog.wrap(connection) if self.queryLog else connection
+                if connection.is_connected():
+                    return connection
+                connection.close()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, connection, discard=False):
+        if discard or self._closed:
+            try:
+                connection.close()
+            except DB_ERRORS:
+                pass
+        else:
+            self._idle.put(connection)
+        self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection; uncommitted work is rolled back on error."""
+        connection = self.acquire()
+        broken = False
+        try:
+            yield connection
+        except BaseException:
+            try:
+                connection.rollback()
+            except DB_ERRORS:
+                broken = True
+            raise
+        finally:
+            self.release(connection, discard=broken)
+
+    @contextmanager
+    def transaction(self):
+        """Borrow a connection and yield a cursor; commit when the block ends."""
+        with self.connection() as connection:
+            cursor = connection.cursor()
+            try:
+                yield cursor
+                connection.commit()
+            finally:
+                cursor.close()
+
+    @contextmanager
+    def snapshot(self):
+        """Borrow a connection and yield a cursor whose reads all see the same committed state."""
+        with self.connection() as connection:
+            cursor = connection.cursor()
+            try:
+                cursor.execute(SNAPSHOT_BEGIN[self.backend.dialect])
+                yield cursor
+                connection.rollback()
+            finally:
+                cursor.close()
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+# COMMAND LINE OPTIONS SHARED BY THE HMS TOOLS
+def addBackendArguments(parser):
+    parser.add_argument("--sqlite", metavar="FILE", help="use an embedded SQLite database file")
+    parser.add_argument("--mysql-user", help="MySQL user (default backend when --sqlite is not given)")
+    parser.add_argument("--mysql-password", default="", help="MySQL password")
+    parser.add_argument("--mysql-host", default="localhost", help="MySQL host")
+    parser.add_argument("--database", default="HMS", help="MySQL database name")
+
+
+def backendFromArguments(args):
+    if args.sqlite:
+        return SQLiteBackend(args.sqlite)
+    if not args.mysql_user:
+        raise SystemExit("give --sqlite FILE or --mysql-user USER")
+    backend = MySQLBackend(args.mysql_user, args.mysql_password, args.mysql_host, args.database)
+    backend.createDatabase()
+    return backend
@@ -0,0 +1,432 @@
+# NIGHTLY COLUMNAR EXPORT AND DAILY ROLLUPS FOR THE HOTEL MANAGEMENT SYSTEM
+#
+# Management reports used to be ad-hoc GROUP BYs over the live tables, which
+# the front desk then waited behind. exportSnapshot() reads BOOKING_RECORD,
+# ROOMS, TOTAL and the ledger once, a page at a time, and streams them into
+# compressed columnar files under DIR/YYYY-MM-DD/: Parquet when pyarrow is
+# installed (one file, a row group per page), otherwise one NumPy .npz (when
+# numpy is installed) or gzipped JSON chunk per page, TABLE.00000.npz,
+# TABLE.00001.npz, ... so no table is ever held in memory whole. The four
+# service tables are views over LEDGER, so one ordered scan of LEDGER writes
+# ROOM_RENT, RESTAURANT, GAMING and FASHION files with their usual columns
+# plus ENTRY_NO and POSTED_AT.
+#
+# ROOMS, BOOKING_RECORD, TOTAL and the last ledger entry are read in one
+# snapshot read, so bookings, bills and charges are cut at the same moment;
+# the ledger is then paged in short reads up to that entry.
+#
+# While the rows stream past, two rollups are computed and written alongside:
+#
+#   REVENUE_DAILY    DAY, SERVICE, CHARGES, QUANTITY, AMOUNT
+#   OCCUPANCY_DAILY  DAY, CATEGORY, ROOM_CATEGORY, ROOMS, OCCUPIED, OCCUPANCY
+#
+# so the reports below read a few kilobytes of rollups instead of the database.
+# A snapshot is written to a temporary directory and renamed into place, and
+# its manifest.json records the files, row counts and the last ledger entry
+# included, and lists each table's files in order.
+#
+#   python hms_export.py --sqlite HMS.db --dir exports             # nightly, e.g. from cron
+#   python hms_export.py --report exports                          # latest snapshot
+#   python hms_export.py --report exports --from 2026-03-01 --to 2026-03-31
+#
+# Charges moved over from the old service tables have no posting time; they
+# are exported but left out of REVENUE_DAILY (the manifest counts them).
+
+import argparse
+import gzip
+import json
+import os
+import re
+import shutil
+import time
+from datetime import date, datetime, timedelta
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+from hms_db import ConnectionPool, addBackendArguments, backendFromArguments
+from hms_rooms import ROOM_CATEGORIES
+from hms_schema import LEDGER_COLUMNS, columnNames, migrate
+
+EXPORT_PAGE = 5000
+FORMATS = {"parquet": ".parquet", "npz": ".npz", "json": ".json.gz"}
+SNAPSHOT_NAME = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+# table -> (query, [(column, kind)]); kinds are int, float, str and date
+TABLE_EXPORTS = {
+    "ROOMS": (
+        "SELECT ROOMNO, ROOM_CHOICE FROM ROOMS ORDER BY ROOMNO",
+        [("ROOMNO", "int"), ("ROOM_CHOICE", "int")],
+    ),
+    "BOOKING_RECORD": (
+        "SELECT CID, CHECK_IN, CHECK_OUT, ROOMNO FROM BOOKING_RECORD",
+        [("CID", "str"), ("CHECK_IN", "date"), ("CHECK_OUT", "date"), ("ROOMNO", "int")],
+    ),
+    "TOTAL": (
+        "SELECT BILL_NO, BILLED_AT, CID, C_NAME, ROOMRENT, RESTAURANTBILL, GAMINGBILL, FASHIONBILL, TOTALAMOUNT "
+        "FROM TOTAL ORDER BY BILL_NO",
+        [("BILL_NO", "int"), ("BILLED_AT", "date"), ("CID", "str"), ("C_NAME", "str"), ("ROOMRENT", "int"),
+         ("RESTAURANTBILL", "int"), ("GAMINGBILL", "int"), ("FASHIONBILL", "int"), ("TOTALAMOUNT", "int")],
+    ),
+}
+
+LEDGER_SCAN = (
+    "SELECT ENTRY_NO, POSTED_AT, CID, SERVICE, CHOICE, QUANTITY, ROOMNO, AMOUNT "
+    "FROM LEDGER WHERE ENTRY_NO > %s AND ENTRY_NO <= %s ORDER BY ENTRY_NO LIMIT %s"
+)
+
+ROLLUP_COLUMNS = {
+    "REVENUE_DAILY": [("DAY", "date"), ("SERVICE", "str"), ("CHARGES", "int"), ("QUANTITY", "int"), ("AMOUNT", "int")],
+    "OCCUPANCY_DAILY": [("DAY", "date"), ("CATEGORY", "int"), ("ROOM_CATEGORY", "str"), ("ROOMS", "int"),
+                        ("OCCUPIED", "int"), ("OCCUPANCY", "float")],
+}
+
+
+def serviceColumns(service):
+    """Export columns of a service table: ENTRY_NO, POSTED_AT, then the view's own columns."""
+    kinds = {"CID": "str"}
+    return [("ENTRY_NO", "int"), ("POSTED_AT", "str")] + [
+        (column, kinds.get(ledgerColumn, "int"))
+        for column, ledgerColumn in zip(columnNames(service), LEDGER_COLUMNS[service])
+    ]
+
+
+def defaultFormat():
+    return "parquet" if pyarrow else "npz" if numpy else "json"
+
+
+def cell(value, kind):
+    if value is None:
+        return None
+    if kind == "date":
+        return str(value)[:10]
+    if kind == "str":
+        return str(value)
+    return float(value) if kind == "float" else int(value)
+
+
+# WRITERS THAT TAKE ROWS A PAGE AT A TIME AND WRITE THEM OUT STRAIGHT AWAY
+class ColumnWriter:
+    """Writes every page to its own chunk file, DIR/TABLE.00000.npz or .json.gz, as it arrives."""
+
+    def __init__(self, directory, table, suffix, columns):
+        self.directory = directory
+        self.table = table
+        self.suffix = suffix
+        self.columns = columns
+        self.rows = 0
+        self.files = []
+
+    def write(self, rows):
+        if not rows:
+            return
+        name = f"{self.table}.{len(self.files):05d}{self.suffix}"
+        path = os.path.join(self.directory, name)
+        columns, nulls = {}, {}
+        for position, (column, kind) in enumerate(self.columns):
+            values = [cell(row[position], kind) for row in rows]
+            missing = [number for number, value in enumerate(values) if value is None]
+            if missing:
+                blank = 0 if kind in ("int", "float") else ""
+                values = [blank if value is None else value for value in values]
+                nulls[column] = missing
+            columns[column] = values
+        if self.suffix == ".npz":
+            types = {"int": numpy.int64, "float": numpy.float64}
+            arrays = {column: numpy.array(values, dtype=types.get(kind, str))
+                      for (column, kind), values in zip(self.columns, columns.values())}
+            arrays.update((column + ".null", numpy.array(missing, dtype=numpy.int64))
+                          for column, missing in nulls.items())
+            numpy.savez_compressed(path, **arrays)
+        else:
+            document = {"columns": columns, "nulls": nulls, "kinds": dict(self.columns)}
+            with gzip.open(path, "wt", encoding="utf-8") as file:
+                json.dump(document, file, separators=(",", ":"))
+        self.files.append(name)
+        self.rows += len(rows)
+
+    def close(self):
+        pass
+
+
+class ParquetWriter:
+    """Writes every page as a row group as soon as it arrives."""
+
+    TYPES = {"int": "int64", "float": "float64", "str": "string", "date": "string"}
+
+    def __init__(self, path, columns):
+        self.path = path
+        self.columns = columns
+        self.rows = 0
+        self.files = [os.path.basename(path)]
+        self._schema = pyarrow.schema([(name, self.TYPES[kind]) for name, kind in columns])
+        self._writer = pyarrow.parquet.ParquetWriter(path, self._schema, compression="zstd")
+
+    def write(self, rows):
+        batch = {name: [cell(row[position], kind) for row in rows]
+                 for position, (name, kind) in enumerate(self.columns)}
+        self._writer.write_table(pyarrow.table(batch, schema=self._schema))
+        self.rows += len(rows)
+
+    def close(self):
+        self._writer.close()
+
+
+def openWriter(directory, table, columns, fileFormat):
+    if fileFormat == "parquet":
+        return ParquetWriter(os.path.join(directory, table + FORMATS[fileFormat]), columns)
+    return ColumnWriter(directory, table, FORMATS[fileFormat], columns)
+
+
+def readTable(path):
+    """{column: list of values} from one file or chunk written by exportSnapshot, NULLs as None."""
+    if path.endswith(".parquet"):
+        if pyarrow is None:
+            raise RuntimeError("pyarrow is needed to read " + path)
+        return pyarrow.parquet.read_table(path).to_pydict()
+    if path.endswith(".npz"):
+        if numpy is None:
+            raise RuntimeError("numpy is needed to read " + path)
+        with numpy.load(path) as archive:
+            columns = {name: archive[name].tolist() for name in archive.files if not name.endswith(".null")}
+            nulls = {name[:-5]: archive[name].tolist() for name in archive.files if name.endswith(".null")}
+    else:
+        with gzip.open(path, "rt", encoding="utf-8") as file:
+            document = json.load(file)
+        columns, nulls = document["columns"], document["nulls"]
+    for name, numbers in nulls.items():
+        for number in numbers:
+            columns[name][number] = None
+    return columns
+
+
+def loadTable(snapshot, table):
+    """{column: list of values} of one exported table, its files read in order."""
+    with open(os.path.join(snapshot, "manifest.json")) as file:
+        entry = json.load(file)["tables"][table]
+    columns = {name: [] for name in entry["columns"]}
+    for name in entry["files"]:
+        for column, values in readTable(os.path.join(snapshot, name)).items():
+            columns[column].extend(values)
+    return columns
+
+
+# MODULE TO STREAM THE TABLES OUT AND ROLL THEM UP ON THE WAY
+def exportLedger(pool, directory, fileFormat, revenue, lastEntry):
+    """Split LEDGER up to lastEntry into the four service files; add dated charges to revenue[(day, service)]."""
+    writers = {service: openWriter(directory, service, serviceColumns(service), fileFormat)
+               for service in LEDGER_COLUMNS}
+    undated, after = 0, 0
+    try:
+        while after < lastEntry:
+            # one short read per page, so the export never holds the ledger for long
+            with pool.transaction() as cursor:
+                cursor.execute(LEDGER_SCAN, (after, lastEntry, EXPORT_PAGE))
+                rows = cursor.fetchall()
+            if not rows:
+                break
+            pages = {service: [] for service in writers}
+            for entryNo, postedAt, cid, service, choice, quantity, roomNo, amount in rows:
+                values = {"CID": cid, "CHOICE": choice, "QUANTITY": quantity, "ROOMNO": roomNo, "AMOUNT": amount}
+                pages[service].append([entryNo, postedAt] + [values[column] for column in LEDGER_COLUMNS[service]])
+                if postedAt:
+                    totals = revenue.setdefault((str(postedAt)[:10], service), [0, 0, 0])
+                    totals[0] += 1
+                    totals[1] += int(quantity or 0)
+                    totals[2] += int(amount)
+                else:
+                    undated += 1
+            for service, page in pages.items():
+                if page:
+                    writers[service].write(page)
+            after = rows[-1][0]
+    finally:
+        for writer in writers.values():
+            writer.close()
+    return writers, undated
+
+
+def exportTable(cursor, directory, table, fileFormat, onPage=None):
+    query, columns = TABLE_EXPORTS[table]
+    writer = openWriter(directory, table, columns, fileFormat)
+    try:
+        cursor.execute(query)
+        while True:
+            rows = cursor.fetchmany(EXPORT_PAGE)
+            if not rows:
+                break
+            writer.write(rows)
+            if onPage:
+                onPage(rows)
+    finally:
+        writer.close()
+    return writer
+
+
+def occupancyRows(rooms, occupied):
+    """OCCUPANCY_DAILY rows for every day and category from the first to the last occupied day."""
+    if not occupied:
+        return []
+    days = sorted({day for day, category in occupied})
+    first, last = date.fromisoformat(days[0]), date.fromisoformat(days[-1])
+    sizes = {}
+    for category in rooms.values():
+        sizes[category] = sizes.get(category, 0) + 1
+    rows = []
+    for offset in range((last - first).days + 1):
+        day = (first + timedelta(days=offset)).isoformat()
+        for category, total in sorted(sizes.items()):
+            used = occupied.get((day, category), 0)
+            rows.append((day, category, ROOM_CATEGORIES.get(category, str(category)), total, used,
+                         round(used / total, 4) if total else 0.0))
+    return rows
+
+
+def exportSnapshot(pool, directory, day=None, fileFormat=None):
+    """Write DIR/<day>/ (today by default) and return its manifest."""
+    fileFormat = fileFormat or defaultFormat()
+    day = (day or date.today()).isoformat()
+    target = os.path.join(directory, day)
+    scratch = target + ".partial"
+    shutil.rmtree(scratch, ignore_errors=True)
+    os.makedirs(scratch)
+    started = time.perf_counter()
+    written = {}
+
+    rooms = {}
+    occupied, unassigned = {}, 0
+
+    def countNights(rows):
+        nonlocal unassigned
+        for cid, checkIn, checkOut, roomNo in rows:
+            category = rooms.get(roomNo)
+            if category is None or not checkIn or not checkOut:
+                unassigned += 1
+                continue
+            night, end = date.fromisoformat(str(checkIn)[:10]), date.fromisoformat(str(checkOut)[:10])
+            while night < end:
+                key = (night.isoformat(), category)
+                occupied[key] = occupied.get(key, 0) + 1
+                night += timedelta(days=1)
+
+    with pool.snapshot() as cursor:
+        cursor.execute("SELECT COALESCE(MAX(ENTRY_NO), 0) FROM LEDGER")
+        lastEntry = cursor.fetchone()[0]
+        written["ROOMS"] = exportTable(cursor, scratch, "ROOMS", fileFormat,
+                                       lambda rows: rooms.update((room, category) for room, category in rows))
+        written["BOOKING_RECORD"] = exportTable(cursor, scratch, "BOOKING_RECORD", fileFormat, countNights)
+        written["TOTAL"] = exportTable(cursor, scratch, "TOTAL", fileFormat)
+    revenue = {}
+    services, undated = exportLedger(pool, scratch, fileFormat, revenue, lastEntry)
+    written.update(services)
+
+    for table, rows in (
+        ("REVENUE_DAILY", [(posted, service, *totals) for (posted, service), totals in sorted(revenue.items())]),
+        ("OCCUPANCY_DAILY", occupancyRows(rooms, occupied)),
+    ):
+        writer = openWriter(scratch, table, ROLLUP_COLUMNS[table], fileFormat)
+        for start in range(0, len(rows), EXPORT_PAGE):
+            writer.write(rows[start:start + EXPORT_PAGE])
+        writer.close()
+        written[table] = writer
+
+    manifest = {
+        "snapshot": day,
+        "exported_at": datetime.now().isoformat(timespec="seconds"),
+        "format": fileFormat,
+        "seconds": round(time.perf_counter() - started, 3),
+        "last_entry_no": lastEntry,
+        "undated_charges": undated,
+        "unassigned_bookings": unassigned,
+        "tables": {table: {"files": writer.files, "rows": writer.rows,
+                           "columns": [name for name, kind in writer.columns]}
+                   for table, writer in written.items()},
+    }
+    with open(os.path.join(scratch, "manifest.json"), "w") as file:
+        json.dump(manifest, file, indent=2)
+    if os.path.exists(target):
+        shutil.rmtree(target)
+    os.rename(scratch, target)
+    return manifest
+
+
+# MODULE TO REPORT FROM THE EXPORTED ROLLUPS (NO DATABASE NEEDED)
+def latestSnapshot(directory):
+    snapshots = sorted(name for name in os.listdir(directory)
+                       if SNAPSHOT_NAME.match(name) and os.path.exists(os.path.join(directory, name, "manifest.json")))
+    if not snapshots:
+        raise FileNotFoundError(f"no export snapshot under {directory}")
+    return os.path.join(directory, snapshots[-1])
+
+
+def loadRollup(snapshot, table, since=None, until=None):
+    columns = loadTable(snapshot, table)
+    rows = zip(*columns.values())
+    return [row for row in rows if (not since or row[0] >= since) and (not until or row[0] <= until)]
+
+
+def printReport(snapshot, since=None, until=None):
+    services = list(LEDGER_COLUMNS)
+    revenue = {}
+    for day, service, charges, quantity, amount in loadRollup(snapshot, "REVENUE_DAILY", since, until):
+        revenue.setdefault(day, dict.fromkeys(services, 0))[service] = amount
+    print(f"\n##### DAILY REVENUE BY SERVICE ({os.path.basename(snapshot)}) #####")
+    print(f"{'DAY':<12}" + "".join(f"{service:>12}" for service in services) + f"{'TOTAL':>12}")
+    for day, amounts in sorted(revenue.items()):
+        print(f"{day:<12}" + "".join(f"{amounts[service]:>12}" for service in services) + f"{sum(amounts.values()):>12}")
+
+    occupancy = {}
+    categories = {}
+    for day, category, name, rooms, used, rate in loadRollup(snapshot, "OCCUPANCY_DAILY", since, until):
+        occupancy.setdefault(day, {})[category] = rate
+        categories[category] = name
+    print("\n##### DAILY OCCUPANCY BY ROOM CATEGORY #####")
+    print(f"{'DAY':<12}" + "".join(f"{categories[category]:>14}" for category in sorted(categories)))
+    for day, rates in sorted(occupancy.items()):
+        print(f"{day:<12}" + "".join(f"{rates.get(category, 0.0) * 100:>13.1f}%" for category in sorted(categories)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export HMS tables to columnar files, or report from an export.")
+    addBackendArguments(parser)
+    parser.add_argument("--dir", default="exports", help="export directory (default exports)")
+    parser.add_argument("--format", choices=list(FORMATS), help=f"file format (default {defaultFormat()})")
+    parser.add_argument("--day", type=date.fromisoformat, help="snapshot name (default today)")
+    parser.add_argument("--report", metavar="DIR", help="print the rollups of the latest snapshot under DIR")
+    parser.add_argument("--snapshot", help="report from this snapshot (YYYY-MM-DD) instead of the latest")
+    parser.add_argument("--from", dest="since", help="first day reported (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="until", help="last day reported (YYYY-MM-DD)")
+    args = parser.parse_args(argv)
+
+    if args.report:
+        snapshot = os.path.join(args.report, args.snapshot) if args.snapshot else latestSnapshot(args.report)
+        started = time.perf_counter()
+        printReport(snapshot, args.since, args.until)
+        print(f"\nREPORTED IN {(time.perf_counter() - started) * 1000:.1f} ms FROM {snapshot}")
+        return
+    if args.format == "parquet" and pyarrow is None or args.format == "npz" and numpy is None:
+        parser.error(f"--format {args.format} needs {'pyarrow' if args.format == 'parquet' else 'numpy'}")
+
+    pool = ConnectionPool(backendFromArguments(args), size=1)
+    migrate(pool)
+    os.makedirs(args.dir, exist_ok=True)
+    manifest = exportSnapshot(pool, args.dir, args.day, args.format)
+    pool.close()
+    for table, entry in manifest["tables"].items():
+        files = entry["files"]
+        shown = files[0] if len(files) == 1 else f"{files[0]} .. {files[-1]}" if files else "-"
+        print(f"{table:<18}{entry['rows']:>10} ROWS  {len(files):>5} FILES  {shown}")
+    print(f"\nSNAPSHOT {manifest['snapshot']} ({manifest['format']}) WRITTEN TO {args.dir} "
+          f"IN {manifest['seconds']:.2f} s, UP TO LEDGER ENTRY {manifest['last_entry_no']}")
+
+
+if __name__ == "__main__":
+    main()
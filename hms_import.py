@@ -0,0 +1,265 @@
+# BULK IMPORT OF CUSTOMERS, BOOKINGS AND SERVICE CHARGES FOR THE HMS DATABASE
+#
+#   python hms_import.py --sqlite HMS.db --customers group.csv --charges charges.jsonl
+#
+# Files are CSV (with a header row) or JSON Lines and are streamed, never loaded
+# whole. Field names are the HMS column names (case does not matter):
+#
+#   customers  CID, C_NAME, C_ADDRESS, C_AGE, C_COUNTRY, P_NO, C_EMAIL
+#   bookings   CID, CHECK_IN, CHECK_OUT, ROOMNO (optional)  (dates as YYYY-MM-DD)
+#   charges    SERVICE plus the columns of that service's table, e.g.
+#              SERVICE=RESTAURANT, CID, CUISINE, QUANTITY, BILL
+#
+# Valid rows are written with executemany and committed once per --chunk rows;
+# invalid rows are skipped and listed in the report at the end. A booking that
+# names a room goes through the same availability check as the booking menu,
+# so one that clashes with a stored stay or an earlier row is rejected too.
+
+import argparse
+import csv
+import json
+import time
+from datetime import date
+
+from hms_billing import insertSql, openBalances, recordCharges
+from hms_db import ConnectionPool, addBackendArguments, backendFromArguments
+from hms_rooms import AvailabilityEngine
+from hms_schema import columnNames, migrate
+
+SERVICES = ["ROOM_RENT", "RESTAURANT", "GAMING", "FASHION"]
+INT_COLUMNS = {
+    "ROOM_CHOICE", "NO_OF_DAYS", "ROOMNO", "ROOMRENT", "CUISINE", "QUANTITY", "BILL",
+    "GAMES", "HOURS", "GAMING_BILL", "DRESS", "AMOUNT",
+}
+DATE_COLUMNS = {"CHECK_IN", "CHECK_OUT"}
+OPTIONAL_COLUMNS = {("BOOKING_RECORD", "ROOMNO")}
+MAX_LENGTH = 30
+MAX_CID_LENGTH = 20
+LOOKUP_BATCH = 500
+
+
+class RowError(ValueError):
+    pass
+
+
+def readRows(path):
+    """Yield (line number, row dict with upper-case keys) from a CSV or JSONL file."""
+    with open(path, newline="", encoding="utf-8") as file:
+        if path.lower().endswith((".jsonl", ".ndjson", ".json")):
+            for number, line in enumerate(file, 1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError as err:
+                    yield number, RowError(f"bad JSON: {err}")
+                    continue
+                if not isinstance(row, dict):
+                    yield number, RowError("not a JSON object")
+                    continue
+                yield number, {str(key).upper(): value for key, value in row.items()}
+        else:
+            for number, row in enumerate(csv.DictReader(file), 2):
+                yield number, {str(key).upper(): value for key, value in row.items() if key is not None}
+
+
+def cleanRow(table, row):
+    """Return the row as a tuple in column order for table, or raise RowError."""
+    values = []
+    for column in columnNames(table):
+        value = row.get(column)
+        value = "" if value is None else str(value).strip()
+        if column == "CID":
+            if not value:
+                raise RowError("missing CID")
+            if len(value) > MAX_CID_LENGTH:
+                raise RowError(f"CID longer than {MAX_CID_LENGTH} characters")
+        elif not value and (table, column) in OPTIONAL_COLUMNS:
+            value = None
+        elif column in INT_COLUMNS:
+            try:
+                value = int(value)
+            except ValueError:
+                raise RowError(f"{column} is not a whole number: {value!r}")
+            if value < 0:
+                raise RowError(f"{column} is negative")
+        elif column in DATE_COLUMNS:
+            try:
+                value = date.fromisoformat(value).isoformat()
+            except ValueError:
+                raise RowError(f"{column} is not a YYYY-MM-DD date: {value!r}")
+        elif len(value) > MAX_LENGTH:
+            raise RowError(f"{column} longer than {MAX_LENGTH} characters")
+        values.append(value)
+
+    if table == "BOOKING_RECORD" and values[2] <= values[1]:
+        raise RowError("CHECK_OUT is not after CHECK_IN")
+    return tuple(values)
+
+
+class Importer:
+    def __init__(self, pool, chunk=1000, maxErrors=20):
+        self.pool = pool
+        self.chunk = chunk
+        self.maxErrors = maxErrors
+        self.pending = {}
+        self.inserted = {}
+        self.rejected = 0
+        self.errors = []
+        self.read = 0
+        self.commits = 0
+        self.rooms = None
+
+    def reject(self, source, reason):
+        self.rejected += 1
+        if len(self.errors) < self.maxErrors:
+            self.errors.append(f"{source}: {reason}")
+
+    def add(self, table, source, row):
+        try:
+            values = cleanRow(table, row)
+        except RowError as err:
+            self.reject(source, err)
+            return
+        rows = self.pending.setdefault(table, [])
+        rows.append((source, values))
+        if len(rows) >= self.chunk:
+            self.flush(table)
+
+    def importFile(self, path, kind):
+        for number, row in readRows(path):
+            self.read += 1
+            source = f"{path}:{number}"
+            if isinstance(row, RowError):
+                self.reject(source, row)
+            elif kind == "charges":
+                service = str(row.get("SERVICE", "")).strip().upper()
+                if service not in SERVICES:
+                    self.reject(source, f"SERVICE must be one of {', '.join(SERVICES)}")
+                else:
+                    self.add(service, source, row)
+            else:
+                self.add(kind, source, row)
+        self.flushAll()
+
+    def existingCustomers(self, cursor, cids):
+        found = set()
+        cids = list(cids)
+        for start in range(0, len(cids), LOOKUP_BATCH):
+            batch = cids[start:start + LOOKUP_BATCH]
+            marks = ", ".join(["%s"] * len(batch))
+            cursor.execute(f"SELECT CID FROM C_DETAILS WHERE CID IN ({marks})", batch)
+            found.update(row[0] for row in cursor.fetchall())
+        return found
+
+    def flush(self, table):
+        rows = self.pending.pop(table, [])
+        if not rows:
+            return
+        if table == "BOOKING_RECORD" and self.rooms is None:
+            # loaded before the chunk's transaction: the pool may hold one connection
+            self.rooms = AvailabilityEngine.load(self.pool)
+        held = []
+        try:
+            with self.pool.transaction() as cursor:
+                known = self.existingCustomers(cursor, {values[0] for _, values in rows})
+                batch = []
+                if table == "C_DETAILS":
+                    for source, values in rows:
+                        if values[0] in known:
+                            self.reject(source, f"customer {values[0]} already exists")
+                        else:
+                            known.add(values[0])
+                            batch.append(values)
+                else:
+                    for source, values in rows:
+                        if values[0] not in known:
+                            self.reject(source, f"unknown customer {values[0]}")
+                        elif table != "BOOKING_RECORD" or self.reserveRoom(source, values):
+                            batch.append(values)
+                            held.append(values)
+                if batch and table in SERVICES:
+                    recordCharges(cursor, table, batch)
+                elif batch:
+                    cursor.executemany(insertSql(table), batch)
+                    if table == "C_DETAILS":
+                        openBalances(cursor, [values[0] for values in batch])
+        except BaseException:
+            # stays of a chunk that was not written must not hold their rooms
+            if table == "BOOKING_RECORD":
+                for values in held:
+                    self.releaseRoom(values)
+            raise
+        self.commits += 1
+        self.inserted[table] = self.inserted.get(table, 0) + len(batch)
+
+    # MODULE TO CHECK IMPORTED STAYS AGAINST THE ROOMS ALREADY BOOKED
+    def reserveRoom(self, source, values):
+        """Hold the booking's room in the availability engine; reject the row and return False on a clash."""
+        cid, checkin, checkout, roomno = values
+        if roomno is None:
+            return True
+        if self.rooms.configured and roomno not in self.rooms.category:
+            self.reject(source, f"there is no room {roomno} in this hotel")
+            return False
+        clashes = self.rooms.reserve(roomno, date.fromisoformat(checkin), date.fromisoformat(checkout), cid)
+        if clashes:
+            start, end, guest = clashes[0]
+            self.reject(source, f"room {roomno} is already booked from {start} to {end} by {guest}")
+            return False
+        return True
+
+    def releaseRoom(self, values):
+        cid, checkin, checkout, roomno = values
+        if roomno is not None:
+            self.rooms.release(roomno, date.fromisoformat(checkin), date.fromisoformat(checkout), cid)
+
+    def flushAll(self):
+        for table in list(self.pending):
+            self.flush(table)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import customers, bookings and charges into the HMS database.")
+    addBackendArguments(parser)
+    parser.add_argument("--customers", action="append", default=[], metavar="FILE")
+    parser.add_argument("--bookings", action="append", default=[], metavar="FILE")
+    parser.add_argument("--charges", action="append", default=[], metavar="FILE")
+    parser.add_argument("--chunk", type=int, default=1000, help="rows per executemany/commit (default 1000)")
+    args = parser.parse_args(argv)
+    if not (args.customers or args.bookings or args.charges):
+        parser.error("nothing to import")
+
+    pool = ConnectionPool(backendFromArguments(args), size=1)
+    migrate(pool)
+    importer = Importer(pool, chunk=args.chunk)
+
+    started = time.perf_counter()
+    # customers first so that bookings and charges can refer to them
+    for path in args.customers:
+        importer.importFile(path, "C_DETAILS")
+    for path in args.bookings:
+        importer.importFile(path, "BOOKING_RECORD")
+    for path in args.charges:
+        importer.importFile(path, "charges")
+    elapsed = time.perf_counter() - started
+    pool.close()
+
+    total = sum(importer.inserted.values())
+    print("\n##### IMPORT REPORT #####")
+    for table, count in importer.inserted.items():
+        print(f"{table:<16}{count:>10} rows")
+    print(f"ROWS READ       {importer.read:>10}")
+    print(f"ROWS INSERTED   {total:>10}")
+    print(f"ROWS REJECTED   {importer.rejected:>10}")
+    print(f"COMMITS         {importer.commits:>10}")
+    print(f"ELAPSED         {elapsed:>10.2f} s")
+    print(f"THROUGHPUT      {total / elapsed if elapsed else 0:>10.0f} rows/s")
+    for error in importer.errors:
+        print("  REJECTED", error)
+    if importer.rejected > len(importer.errors):
+        print(f"  ... and {importer.rejected - len(importer.errors)} more")
+
+
+if __name__ == "__main__":
+    main()
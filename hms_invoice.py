@@ -0,0 +1,258 @@
+# BATCH INVOICE RENDERING FOR THE HOTEL MANAGEMENT SYSTEM
+#
+# gauri.py's totalAmount prints one bill at a time to the screen. renderInvoices()
+# takes any number of CIDs and writes one invoice file per guest: plain text,
+# or HTML with a print stylesheet that browsers and HTML-to-PDF tools turn into
+# an A4 page. The customers are read in chunks of INVOICE_CHUNK; each chunk
+# costs two queries whatever its size, one for the balances (the same query
+# computeBill uses, for the whole chunk) and one for the ledger lines, matched
+# up by CID. Templates are compiled once into literal/field
+# parts, worker threads render and write the invoices of a chunk while the
+# next chunk is read, and every invoice is on disk (and listed in index.csv)
+# as soon as it is finished.
+#
+#   python hms_invoice.py --sqlite HMS.db C001 C002 C003 --out invoices
+#   python hms_invoice.py --sqlite HMS.db --checked-out --format html --out invoices
+#   python hms_invoice.py --sqlite HMS.db --all --workers 8 --out invoices
+
+import argparse
+import csv
+import hashlib
+import html
+import os
+import re
+import string
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+from hms_billing import BILLS, CHECKED_OUT, makeBill
+from hms_db import ConnectionPool, addBackendArguments, backendFromArguments
+from hms_schema import migrate
+from hms_tariff import TariffCatalog
+
+INVOICE_CHUNK = 500
+HOTEL_NAME = "CROWN PLAZA MIAMI"
+# characters a CID may keep in an invoice file name
+UNSAFE_FILE_CHARACTERS = re.compile(r"[^A-Za-z0-9_-]")
+
+# The charges since each customer's last bill, which are what BILLS adds up
+INVOICE_LINES = """
+SELECT L.CID, L.POSTED_AT, L.SERVICE, L.CHOICE, L.QUANTITY, L.AMOUNT
+FROM LEDGER L
+JOIN BALANCE B ON B.CID = L.CID
+WHERE L.CID IN ({cids}) AND L.ENTRY_NO > B.BILLED_ENTRY_NO
+ORDER BY L.CID, L.ENTRY_NO
+"""
+
+TEXT_INVOICE = """\
+ ** {hotel} ** CUSTOMER INVOICE **
+
+ INVOICE DATE: {date}
+ CUSTOMER ID: {cid}
+ CUSTOMER NAME: {name}
+
+{lines}
+ ROOM RENT: Rs. {roomrent}
+ RESTAURANT BILL: Rs. {restaurant}
+ FASHION BILL: Rs. {fashion}
+ GAMING BILL: Rs. {gaming}
+
+ TOTAL AMOUNT: Rs. {total}
+"""
+TEXT_LINE = " {posted:<12}{service:<12}{item:<36}{quantity:>5} x {price:>7} = Rs. {amount:>9}\n"
+
+HTML_INVOICE = """\
+<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Invoice {cid}</title>
+<style>
+@page {{ size: A4; margin: 18mm; }}
+body {{ font-family: sans-serif; font-size: 11pt; }}
+table {{ border-collapse: collapse; width: 100%; }}
+td, th {{ border-bottom: 1px solid #ccc; padding: 3px 6px; text-align: left; }}
+td.n, th.n {{ text-align: right; }}
+</style></head>
+<body>
+<h1>{hotel}</h1>
+<p>Invoice date: {date}<br>Customer: {name} ({cid})</p>
+<table>
+<tr><th>Date</th><th>Service</th><th>Item</th><th class="n">Qty</th><th class="n">Price</th><th class="n">Amount</th></tr>
+{lines}</table>
+<table>
+<tr><td>Room rent</td><td class="n">Rs. {roomrent}</td></tr>
+<tr><td>Restaurant</td><td class="n">Rs. {restaurant}</td></tr>
+<tr><td>Fashion</td><td class="n">Rs. {fashion}</td></tr>
+<tr><td>Gaming</td><td class="n">Rs. {gaming}</td></tr>
+<tr><th>Total</th><th class="n">Rs. {total}</th></tr>
+</table>
+</body></html>
+"""
+HTML_LINE = ("<tr><td>{posted}</td><td>{service}</td><td>{item}</td>"
+             "<td class=\"n\">{quantity}</td><td class=\"n\">{price}</td><td class=\"n\">{amount}</td></tr>\n")
+
+# format -> (invoice template, line template, file suffix, escape for field values)
+FORMATS = {
+    "text": (TEXT_INVOICE, TEXT_LINE, ".txt", str),
+    "html": (HTML_INVOICE, HTML_LINE, ".html", lambda value: html.escape(str(value))),
+}
+
+
+class CompiledTemplate:
+    """A str.format template parsed once; render() only joins literals and formatted fields."""
+
+    def __init__(self, text, escape=str):
+        self.escape = escape
+        self.parts = []
+        for literal, field, spec, conversion in string.Formatter().parse(text):
+            self.parts.append((literal, field, "{:" + spec + "}" if spec else None))
+
+    def render(self, values, raw=()):
+        """raw: fields inserted as they are (already rendered markup)."""
+        out = []
+        for literal, field, spec in self.parts:
+            out.append(literal)
+            if field is None:
+                continue
+            value = values[field]
+            if field not in raw:
+                value = self.escape(value)
+            out.append(spec.format(value) if spec else value)
+        return "".join(out)
+
+
+def fetchInvoiceData(cursor, cids, catalog):
+    """[(Bill, [line values])] for the given CIDs, in CID order, from two queries."""
+    marks = ", ".join(["%s"] * len(cids))
+    cursor.execute(BILLS.format(customers=f"C.CID IN ({marks})"), list(cids))
+    bills = [makeBill(row) for row in cursor.fetchall()]
+    cursor.execute(INVOICE_LINES.format(cids=marks), list(cids))
+    lines = {}
+    for cid, postedAt, service, choice, quantity, amount in cursor.fetchall():
+        item = catalog.item(service, choice)
+        quantity, amount = int(quantity or 0), int(amount)
+        lines.setdefault(cid, []).append({
+            "posted": str(postedAt or "-")[:10],
+            "service": service,
+            "item": item[0] if item else f"Choice {choice}",
+            "quantity": quantity,
+            "price": amount // quantity if quantity else amount,
+            "amount": amount,
+        })
+    return [(bill, lines.get(bill.cid, [])) for bill in bills]
+
+
+def invoiceFileStem(cid):
+    """The CID as a file name part; a CID with other characters gets a hash so two never share a file."""
+    safe = UNSAFE_FILE_CHARACTERS.sub("_", str(cid))
+    if safe == str(cid):
+        return safe
+    return f"{safe[:40]}-{hashlib.sha1(str(cid).encode('utf-8')).hexdigest()[:10]}"
+
+
+class InvoiceWriter:
+    """Renders one invoice per call and appends it to index.csv when its file is written."""
+
+    def __init__(self, directory, fileFormat="text", invoiceDate=None):
+        invoice, line, self.suffix, escape = FORMATS[fileFormat]
+        self.invoice = CompiledTemplate(invoice, escape)
+        self.line = CompiledTemplate(line, escape)
+        self.directory = directory
+        self.invoiceDate = (invoiceDate or date.today()).isoformat()
+        self.written = 0
+        self.amount = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._index = open(os.path.join(directory, "index.csv"), "w", newline="")
+        self._csv = csv.writer(self._index)
+        self._csv.writerow(["CID", "NAME", "TOTAL", "FILE"])
+
+    def write(self, bill, lines):
+        values = dict(bill._asdict(), hotel=HOTEL_NAME, date=self.invoiceDate,
+                      lines="".join(self.line.render(line) for line in lines))
+        document = self.invoice.render(values, raw=("lines",))
+        name = f"INVOICE-{invoiceFileStem(bill.cid)}{self.suffix}"
+        with open(os.path.join(self.directory, name), "w", encoding="utf-8") as file:
+            file.write(document)
+        with self._lock:
+            self._csv.writerow([bill.cid, bill.name, bill.total, name])
+            self._index.flush()
+            self.written += 1
+            self.amount += bill.total
+        return name
+
+    def close(self):
+        self._index.close()
+
+
+# MODULE TO READ, RENDER AND WRITE MANY INVOICES AT ONCE
+def renderInvoices(pool, cids, directory, fileFormat="text", workers=4, invoiceDate=None, progress=None):
+    """Write an invoice per CID that exists; return (invoices written, total amount)."""
+    catalog = TariffCatalog.load(pool)
+    writer = InvoiceWriter(directory, fileFormat, invoiceDate)
+    cids = sorted(set(cids))
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = []
+            for first in range(0, len(cids), INVOICE_CHUNK):
+                with pool.transaction() as cursor:
+                    invoices = fetchInvoiceData(cursor, cids[first:first + INVOICE_CHUNK], catalog)
+                # the previous chunk is still being written while this one was read
+                for future in pending:
+                    future.result()
+                pending = [executor.submit(writer.write, bill, lines) for bill, lines in invoices]
+                if progress:
+                    progress(min(first + INVOICE_CHUNK, len(cids)), len(cids))
+            for future in pending:
+                future.result()
+    finally:
+        writer.close()
+    return writer.written, writer.amount
+
+
+def selectCustomers(pool, checkedOut=False, asOf=None):
+    """Every customer, or only guests whose stay ended on or before asOf."""
+    with pool.transaction() as cursor:
+        if checkedOut:
+            cursor.execute(CHECKED_OUT, ((asOf or date.today()).isoformat(),))
+        else:
+            cursor.execute("SELECT CID FROM C_DETAILS")
+        return [row[0] for row in cursor.fetchall()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render HMS invoices for many guests at once.")
+    addBackendArguments(parser)
+    parser.add_argument("cids", nargs="*", help="customer IDs to invoice")
+    parser.add_argument("--checked-out", action="store_true", help="invoice every guest whose stay has ended")
+    parser.add_argument("--all", action="store_true", help="invoice every customer")
+    parser.add_argument("--as-of", type=date.fromisoformat, help="with --checked-out: stays ended by this date")
+    parser.add_argument("--format", choices=list(FORMATS), default="text")
+    parser.add_argument("--out", default="invoices", help="directory for the invoice files (default invoices)")
+    parser.add_argument("--workers", type=int, default=4, help="rendering threads (default 4)")
+    args = parser.parse_args(argv)
+    if not (args.cids or args.checked_out or args.all):
+        parser.error("give customer IDs, --checked-out or --all")
+
+    pool = ConnectionPool(backendFromArguments(args), size=1)
+    migrate(pool)
+    cids = list(args.cids)
+    if args.checked_out or args.all:
+        cids += selectCustomers(pool, args.checked_out and not args.all, args.as_of)
+    started = time.perf_counter()
+
+    def progress(done, total):
+        print(f"\r{done}/{total} CUSTOMERS READ", end="", flush=True)
+
+    try:
+        written, amount = renderInvoices(pool, cids, args.out, args.format, args.workers, progress=progress)
+    finally:
+        pool.close()
+    elapsed = time.perf_counter() - started
+    print(f"\n{written} INVOICES (Rs. {amount}) WRITTEN TO {args.out} IN {elapsed:.2f} s")
+    if written < len(set(cids)):
+        print(f"{len(set(cids)) - written} CUSTOMER IDS NOT FOUND")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+# CHARGE LEDGER SNAPSHOTS, POINT-IN-TIME AUDITS AND REPLAY
+#
+# LEDGER holds every charge ever posted, numbered by ENTRY_NO and never updated
+# or deleted. SNAPSHOT holds, for some customers, their per-service balance
+# including every entry up to an ENTRY_NO. A customer's balance at any point
+# is their latest snapshot at or before that point plus the short tail of
+# ledger entries after it, so audits never re-add a long-staying guest's
+# whole history.
+#
+#   python hms_ledger.py --sqlite HMS.db --snapshot                 # nightly
+#   python hms_ledger.py --sqlite HMS.db --audit C042 --at 2026-03-01T12:00
+#   python hms_ledger.py --sqlite HMS.db --audit-all --at 2026-03-01
+#   python hms_ledger.py --sqlite HMS.db --verify                   # BALANCE vs ledger
+#   python hms_ledger.py --sqlite HMS.db --replay copy.db --entry 50000
+#
+# Entry numbers give the authoritative order; posting times are only used to
+# find the last entry posted at or before a given time. Charges moved over from
+# the old service tables have no posting time and count as posted before any
+# time.
+
+import argparse
+from datetime import datetime, timedelta
+
+from hms_billing import BALANCE_COLUMN, addToBalance, openBalances
+from hms_db import ConnectionPool, SQLiteBackend, addBackendArguments, backendFromArguments
+from hms_schema import migrate
+
+SERVICES = list(BALANCE_COLUMN)
+SNAPSHOT_TAIL = 50
+# entries newer than this may belong to transactions that have not committed yet
+SETTLE_SECONDS = 60
+REPLAY_PAGE = 5000
+
+LATEST_SNAPSHOTS = """
+SELECT S.CID, S.ENTRY_NO, S.ROOMRENT, S.RESTAURANTBILL, S.GAMINGBILL, S.FASHIONBILL
+FROM SNAPSHOT S
+JOIN (SELECT CID, MAX(ENTRY_NO) AS LAST FROM SNAPSHOT WHERE ENTRY_NO <= %s GROUP BY CID) M
+  ON M.CID = S.CID AND M.LAST = S.ENTRY_NO
+"""
+
+TAIL = """
+SELECT L.CID, L.SERVICE, SUM(L.AMOUNT), COUNT(*)
+FROM LEDGER L
+LEFT JOIN (SELECT CID, MAX(ENTRY_NO) AS LAST FROM SNAPSHOT WHERE ENTRY_NO <= %s GROUP BY CID) M
+  ON M.CID = L.CID
+WHERE L.ENTRY_NO <= %s AND L.ENTRY_NO > COALESCE(M.LAST, 0)
+GROUP BY L.CID, L.SERVICE
+"""
+
+
+def timestamp(moment=None):
+    return (moment or datetime.now()).isoformat(timespec="microseconds")
+
+
+def lastEntry(cursor, at=None):
+    """Highest ENTRY_NO posted at or before `at` (a datetime or ISO text), or overall."""
+    if at is None:
+        cursor.execute("SELECT MAX(ENTRY_NO) FROM LEDGER")
+        return cursor.fetchone()[0] or 0
+    at = at.isoformat(timespec="microseconds") if isinstance(at, datetime) else str(at)
+    cursor.execute("SELECT MAX(ENTRY_NO) FROM LEDGER WHERE POSTED_AT <= %s", (at,))
+    posted = cursor.fetchone()[0] or 0
+    cursor.execute("SELECT MAX(ENTRY_NO) FROM LEDGER WHERE POSTED_AT IS NULL")
+    return max(posted, cursor.fetchone()[0] or 0)
+
+
+# MODULE TO READ BALANCES AT ANY LEDGER POSITION
+def balancesAt(cursor, entryNo, cid=None):
+    """{cid: [roomrent, restaurant, gaming, fashion]} including entries up to entryNo.
+
+    Returns (balances, tail) where tail is how many ledger entries were added on
+    top of snapshots."""
+    if cid:
+        return customerBalanceAt(cursor, cid, entryNo)
+    balances = {}
+    cursor.execute(LATEST_SNAPSHOTS, (entryNo,))
+    for row in cursor.fetchall():
+        balances[row[0]] = [int(value) for value in row[2:]]
+    cursor.execute(TAIL, (entryNo, entryNo))
+    tail = 0
+    for customerId, service, amount, count in cursor.fetchall():
+        balances.setdefault(customerId, [0] * len(SERVICES))[SERVICES.index(service)] += int(amount)
+        tail += int(count)
+    return balances, tail
+
+
+def customerBalanceAt(cursor, cid, entryNo):
+    # two index range reads: the latest snapshot, then only the entries after it
+    cursor.execute(
+        "SELECT ENTRY_NO, ROOMRENT, RESTAURANTBILL, GAMINGBILL, FASHIONBILL FROM SNAPSHOT "
+        "WHERE CID = %s AND ENTRY_NO <= %s ORDER BY ENTRY_NO DESC LIMIT 1",
+        (cid, entryNo),
+    )
+    row = cursor.fetchone()
+    since, balance = (row[0], [int(value) for value in row[1:]]) if row else (0, [0] * len(SERVICES))
+    cursor.execute(
+        "SELECT SERVICE, SUM(AMOUNT), COUNT(*) FROM LEDGER "
+        "WHERE CID = %s AND ENTRY_NO > %s AND ENTRY_NO <= %s GROUP BY SERVICE",
+        (cid, since, entryNo),
+    )
+    tail = 0
+    for service, amount, count in cursor.fetchall():
+        balance[SERVICES.index(service)] += int(amount)
+        tail += int(count)
+    return ({cid: balance} if row or tail else {}), tail
+
+
+# MODULE TO SNAPSHOT CUSTOMERS WITH A LONG TAIL OF NEW ENTRIES
+def takeSnapshots(cursor, minTail=SNAPSHOT_TAIL, settleSeconds=SETTLE_SECONDS):
+    """Snapshot every customer with at least minTail entries since their last snapshot.
+
+    Only entries posted more than settleSeconds ago are covered, so a charge
+    still being committed is never skipped. Returns (customers, entryNo)."""
+    upTo = lastEntry(cursor, datetime.now() - timedelta(seconds=settleSeconds))
+    if not upTo:
+        return 0, 0
+    cursor.execute(
+        "SELECT L.CID FROM LEDGER L "
+        "LEFT JOIN (SELECT CID, MAX(ENTRY_NO) AS LAST FROM SNAPSHOT GROUP BY CID) M ON M.CID = L.CID "
+        "WHERE L.ENTRY_NO <= %s AND L.ENTRY_NO > COALESCE(M.LAST, 0) "
+        "GROUP BY L.CID HAVING COUNT(*) >= %s",
+        (upTo, minTail),
+    )
+    due = {row[0] for row in cursor.fetchall()}
+    if not due:
+        return 0, upTo
+    balances, tail = balancesAt(cursor, upTo)
+    takenAt = timestamp()
+    cursor.executemany(
+        "INSERT INTO SNAPSHOT (CID, ENTRY_NO, TAKEN_AT, ROOMRENT, RESTAURANTBILL, GAMINGBILL, FASHIONBILL, TOTALAMOUNT) "
+        "VALUES (%s, %s, %s, %s, %s, %s, %s, %s)",
+        [(cid, upTo, takenAt, *balances[cid], sum(balances[cid])) for cid in sorted(due)],
+    )
+    return len(due), upTo
+
+
+# MODULE TO COMPARE THE LIVE BALANCE TABLE WITH THE LEDGER
+def verifyBalances(cursor):
+    """Return (cid, stored, ledger) for every customer whose BALANCE disagrees with the ledger."""
+    balances, tail = balancesAt(cursor, lastEntry(cursor))
+    cursor.execute("SELECT CID, ROOMRENT, RESTAURANTBILL, GAMINGBILL, FASHIONBILL FROM BALANCE")
+    problems = []
+    for row in cursor.fetchall():
+        stored = [int(value) for value in row[1:]]
+        actual = balances.pop(row[0], [0] * len(SERVICES))
+        if stored != actual:
+            problems.append((row[0], stored, actual))
+    problems.extend((cid, None, actual) for cid, actual in balances.items())
+    return problems
+
+
+# MODULE TO REPLAY THE LEDGER INTO A FRESH DATABASE
+def replay(source, target, upTo=None, page=REPLAY_PAGE):
+    """Copy customers and ledger entries (up to entry upTo) from pool source into pool target.
+
+    target must be a freshly migrated, empty database. Entries keep their
+    numbers and posting times, and BALANCE is rebuilt as they are applied.
+    Returns (customers, entries)."""
+    customers = entries = 0
+    after = ""
+    while True:
+        with source.transaction() as cursor:
+            cursor.execute("SELECT * FROM C_DETAILS WHERE CID > %s ORDER BY CID LIMIT %s", (after, page))
+            rows = cursor.fetchall()
+        if not rows:
+            break
+        with target.transaction() as cursor:
+            cursor.executemany(f"INSERT INTO C_DETAILS VALUES ({', '.join(['%s'] * len(rows[0]))})", rows)
+            openBalances(cursor, [row[0] for row in rows])
+        customers += len(rows)
+        after = rows[-1][0]
+
+    if upTo is None:
+        with source.transaction() as cursor:
+            upTo = lastEntry(cursor)
+    after = 0
+    while True:
+        with source.transaction() as cursor:
+            cursor.execute(
+                "SELECT ENTRY_NO, POSTED_AT, CID, SERVICE, CHOICE, QUANTITY, ROOMNO, AMOUNT FROM LEDGER "
+                "WHERE ENTRY_NO > %s AND ENTRY_NO <= %s ORDER BY ENTRY_NO LIMIT %s",
+                (after, upTo, page),
+            )
+            rows = cursor.fetchall()
+        if not rows:
+            break
+        with target.transaction() as cursor:
+            cursor.executemany(
+                "INSERT INTO LEDGER (ENTRY_NO, POSTED_AT, CID, SERVICE, CHOICE, QUANTITY, ROOMNO, AMOUNT) "
+                "VALUES (%s, %s, %s, %s, %s, %s, %s, %s)",
+                rows,
+            )
+            amounts = {}
+            for row in rows:
+                serviceAmounts = amounts.setdefault(row[3], {})
+                serviceAmounts[row[2]] = serviceAmounts.get(row[2], 0) + int(row[7])
+            for service, serviceAmounts in amounts.items():
+                addToBalance(cursor, service, serviceAmounts)
+        entries += len(rows)
+        after = rows[-1][0]
+    return customers, entries
+
+
+def printBalances(balances):
+    print(f"{'CID':<20}{'ROOM RENT':>12}{'RESTAURANT':>12}{'GAMING':>10}{'FASHION':>10}{'TOTAL':>12}")
+    for cid in sorted(balances):
+        row = balances[cid]
+        print(f"{cid:<20}{row[0]:>12}{row[1]:>12}{row[2]:>10}{row[3]:>10}{sum(row):>12}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Snapshot, audit and replay the HMS charge ledger.")
+    addBackendArguments(parser)
+    parser.add_argument("--snapshot", action="store_true", help="snapshot customers with a long ledger tail")
+    parser.add_argument("--min-tail", type=int, default=SNAPSHOT_TAIL,
+                        help=f"entries since the last snapshot that make a customer due (default {SNAPSHOT_TAIL})")
+    parser.add_argument("--audit", metavar="CID", help="one customer's balance at --at / --entry")
+    parser.add_argument("--audit-all", action="store_true", help="every customer's balance at --at / --entry")
+    parser.add_argument("--at", help="point in time, YYYY-MM-DD[THH:MM[:SS]] (default now)")
+    parser.add_argument("--entry", type=int, help="ledger position instead of --at")
+    parser.add_argument("--verify", action="store_true", help="compare BALANCE with the ledger")
+    parser.add_argument("--replay", metavar="FILE", help="replay into a new SQLite database file")
+    args = parser.parse_args(argv)
+
+    pool = ConnectionPool(backendFromArguments(args), size=1)
+    migrate(pool)
+    with pool.transaction() as cursor:
+        if args.entry is not None:
+            entryNo = args.entry
+        elif args.at:
+            # a bare date means the end of that day
+            entryNo = lastEntry(cursor, args.at if "T" in args.at else args.at + "T23:59:59.999999")
+        else:
+            entryNo = lastEntry(cursor)
+
+        if args.snapshot:
+            count, upTo = takeSnapshots(cursor, args.min_tail)
+            print(f"{count} CUSTOMERS SNAPSHOTTED AT LEDGER ENTRY {upTo}")
+        if args.audit or args.audit_all:
+            balances, tail = balancesAt(cursor, entryNo, args.audit)
+            printBalances(balances)
+            print(f"\nBALANCES AT LEDGER ENTRY {entryNo} ({tail} ENTRIES READ PAST SNAPSHOTS)")
+        if args.verify:
+            problems = verifyBalances(cursor)
+            for cid, stored, actual in problems:
+                print(f"{cid:<20}BALANCE {stored}  LEDGER {actual}")
+            print(f"\n{len(problems)} CUSTOMERS WHOSE BALANCE DISAGREES WITH THE LEDGER")
+    if args.replay:
+        target = ConnectionPool(SQLiteBackend(args.replay), size=1)
+        migrate(target, verbose=False)
+        customers, entries = replay(pool, target, args.entry if args.entry is not None else entryNo)
+        target.close()
+        print(f"{customers} CUSTOMERS AND {entries} LEDGER ENTRIES REPLAYED INTO {args.replay}")
+    pool.close()
+
+
+if __name__ == "__main__":
+    main()
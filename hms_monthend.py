@@ -0,0 +1,241 @@
+# PARALLEL MONTH-END BILLING FOR THE HOTEL MANAGEMENT SYSTEM
+#
+# Every guest with charges posted in a month gets one MONTH_BILL row for that
+# month, dated the last day of the month. Month-end bills are statements, kept
+# apart from the final bills in TOTAL, so a guest billed at month end is still
+# billed (and repriced) at checkout. The CID space is cut into shards of about
+# --shard-size customers; the shard plan is stored in BILLING_RUN the first time
+# a month is billed, and each shard is billed by a worker process that holds
+# one pooled connection of its own. A worker sums the shard's ledger entries
+# for the month in one grouped query, inserts the shard's bills with one
+# executemany and marks the shard DONE in the same transaction, so a shard is
+# either fully billed or not at all.
+#
+#   python hms_monthend.py --sqlite HMS.db --month 2026-03 --workers 4
+#   python hms_monthend.py --sqlite HMS.db --month 2026-03 --status
+#
+# Running the same month again (after a crash, Ctrl-C or a failed shard)
+# bills only the shards not yet DONE. Charges moved over from the old service
+# tables have no posting time and belong to no month. An in-memory SQLite
+# database cannot be opened by other processes; it is billed on worker threads
+# sharing one pool instead.
+
+import argparse
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
+
+from hms_billing import Bill
+from hms_db import ConnectionPool, SQLiteBackend, addBackendArguments, backendFromArguments
+from hms_schema import migrate
+
+SHARD_SIZE = 5000
+
+# Per-customer sums of one shard's charges posted in [start, end)
+SHARD_TOTALS = """
+SELECT L.CID, C.C_NAME,
+       SUM(CASE WHEN L.SERVICE = 'ROOM_RENT' THEN L.AMOUNT ELSE 0 END),
+       SUM(CASE WHEN L.SERVICE = 'RESTAURANT' THEN L.AMOUNT ELSE 0 END),
+       SUM(CASE WHEN L.SERVICE = 'GAMING' THEN L.AMOUNT ELSE 0 END),
+       SUM(CASE WHEN L.SERVICE = 'FASHION' THEN L.AMOUNT ELSE 0 END)
+FROM LEDGER L
+JOIN C_DETAILS C ON C.CID = L.CID
+WHERE L.CID >= %s{upper} AND L.POSTED_AT >= %s AND L.POSTED_AT < %s
+GROUP BY L.CID, C.C_NAME
+ORDER BY L.CID
+"""
+
+MONTH_BILL_INSERT = (
+    "INSERT INTO MONTH_BILL (PERIOD, CID, C_NAME, ROOMRENT, RESTAURANTBILL, GAMINGBILL, FASHIONBILL, "
+    "TOTALAMOUNT, BILLED_AT) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)"
+)
+
+workerPool = None
+
+
+def monthBounds(period):
+    """(first day, first day of the next month, last day) of a YYYY-MM period."""
+    first = date.fromisoformat(period + "-01")
+    following = (first + timedelta(days=32)).replace(day=1)
+    return first, following, following - timedelta(days=1)
+
+
+def previousMonth(today=None):
+    return ((today or date.today()).replace(day=1) - timedelta(days=1)).strftime("%Y-%m")
+
+
+def processesAvailable(backend):
+    """A process pool needs a database other processes can open."""
+    if isinstance(backend, SQLiteBackend) and backend.path == ":memory:":
+        return False, "an in-memory database cannot be shared with other processes"
+    return True, None
+
+
+# MODULE TO CUT THE CID SPACE INTO SHARDS ONCE PER MONTH
+def planShards(pool, period, shardSize=SHARD_SIZE):
+    """Return [(shard, lo, hi, status)] for period, storing a new plan if there is none."""
+    with pool.transaction() as cursor:
+        cursor.execute("SELECT SHARD, LO_CID, HI_CID, STATUS FROM BILLING_RUN WHERE PERIOD = %s ORDER BY SHARD",
+                       (period,))
+        shards = cursor.fetchall()
+        if shards:
+            return shards
+        # every shardSize-th CID starts a shard; the first starts below every CID
+        cursor.execute("SELECT CID FROM C_DETAILS ORDER BY CID")
+        starts, seen = [""], 0
+        while True:
+            rows = cursor.fetchmany(10000)
+            if not rows:
+                break
+            for (cid,) in rows:
+                if seen and seen % shardSize == 0:
+                    starts.append(cid)
+                seen += 1
+        shards = [(number, lo, starts[number + 1] if number + 1 < len(starts) else None, "PENDING")
+                  for number, lo in enumerate(starts)]
+        cursor.executemany(
+            "INSERT INTO BILLING_RUN (PERIOD, SHARD, LO_CID, HI_CID, STATUS) VALUES (%s, %s, %s, %s, %s)",
+            [(period, number, lo, hi, status) for number, lo, hi, status in shards],
+        )
+    return shards
+
+
+# MODULE TO BILL ONE SHARD (RUNS IN A WORKER)
+def billShard(pool, period, shard, lo, hi):
+    """Bill shard's guests for period unless it is already DONE; return (shard, bills, amount, seconds)."""
+    started = time.perf_counter()
+    first, following, last = monthBounds(period)
+    with pool.transaction() as cursor:
+        cursor.execute("SELECT STATUS FROM BILLING_RUN WHERE PERIOD = %s AND SHARD = %s", (period, shard))
+        if cursor.fetchone()[0] == "DONE":
+            return shard, None, None, 0.0
+        params = [lo] + ([hi] if hi is not None else []) + [first.isoformat(), following.isoformat()]
+        cursor.execute(SHARD_TOTALS.format(upper=" AND L.CID < %s" if hi is not None else ""), params)
+        bills = []
+        for cid, name, roomrent, restaurant, gaming, fashion in cursor.fetchall():
+            roomrent, restaurant, gaming, fashion = int(roomrent), int(restaurant), int(gaming), int(fashion)
+            bills.append(Bill(cid, name, roomrent, restaurant, gaming, fashion,
+                              roomrent + restaurant + gaming + fashion))
+        cursor.executemany(MONTH_BILL_INSERT, [(period,) + bill[:7] + (last.isoformat(),) for bill in bills])
+        amount = sum(bill.total for bill in bills)
+        cursor.execute(
+            "UPDATE BILLING_RUN SET STATUS = 'DONE', BILLS = %s, AMOUNT = %s, FINISHED_AT = %s "
+            "WHERE PERIOD = %s AND SHARD = %s",
+            (len(bills), amount, datetime.now().isoformat(timespec="seconds"), period, shard),
+        )
+    return shard, len(bills), amount, time.perf_counter() - started
+
+
+def startWorker(backend):
+    """Process pool initializer: one single-connection pool per worker process."""
+    global workerPool
+    workerPool = ConnectionPool(backend, size=1)
+
+
+def billShardInWorker(period, shard, lo, hi):
+    return billShard(workerPool, period, shard, lo, hi)
+
+
+# MODULE TO RUN THE PENDING SHARDS AND REPORT EACH ONE AS IT FINISHES
+def runMonthEnd(backend, pool, period, workers=4, shardSize=SHARD_SIZE, report=print):
+    """Bill every pending shard of period; return (bills, amount, failed shards)."""
+    shards = planShards(pool, period, shardSize)
+    pending = [(shard, lo, hi) for shard, lo, hi, status in shards if status != "DONE"]
+    report(f"{period}: {len(shards)} SHARDS, {len(shards) - len(pending)} ALREADY DONE, {len(pending)} TO BILL")
+    if not pending:
+        return 0, 0, []
+
+    useProcesses, reason = processesAvailable(backend)
+    if useProcesses:
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                       initializer=startWorker, initargs=(backend,))
+
+        def submit(shard, lo, hi):
+            return executor.submit(billShardInWorker, period, shard, lo, hi)
+    else:
+        report(f"NOTE: billing on {workers} threads instead of processes ({reason})")
+        executor = ThreadPoolExecutor(max_workers=workers)
+        threadPool = ConnectionPool(backend, size=workers)
+
+        def submit(shard, lo, hi):
+            return executor.submit(billShard, threadPool, period, shard, lo, hi)
+
+    bills = amount = done = 0
+    failed = []
+    try:
+        futures = {submit(shard, lo, hi): (shard, lo, hi) for shard, lo, hi in pending}
+        for future in as_completed(futures):
+            shard, lo, hi = futures[future]
+            done += 1
+            span = f"[{lo or '-'} .. {hi or '-'})"
+            try:
+                shard, count, total, seconds = future.result()
+            except Exception as err:
+                failed.append(shard)
+                report(f"SHARD {shard:>4} {span:<32} FAILED: {err} ({done}/{len(pending)})")
+                continue
+            if count is None:
+                report(f"SHARD {shard:>4} {span:<32} ALREADY DONE ({done}/{len(pending)})")
+                continue
+            bills += count
+            amount += total
+            report(f"SHARD {shard:>4} {span:<32} {count:>7} BILLS  Rs. {total:>12}  "
+                   f"{seconds:>6.2f} s  ({done}/{len(pending)})")
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+        if not useProcesses:
+            threadPool.close()
+    return bills, amount, failed
+
+
+def printStatus(pool, period):
+    with pool.transaction() as cursor:
+        cursor.execute("SELECT SHARD, LO_CID, HI_CID, STATUS, BILLS, AMOUNT, FINISHED_AT FROM BILLING_RUN "
+                       "WHERE PERIOD = %s ORDER BY SHARD", (period,))
+        shards = cursor.fetchall()
+    if not shards:
+        print(f"{period} HAS NOT BEEN BILLED")
+        return
+    for shard, lo, hi, status, bills, amount, finishedAt in shards:
+        print(f"SHARD {shard:>4} [{lo or '-'} .. {hi or '-'})".ljust(44)
+              + f"{status:<9}{bills:>7} BILLS  Rs. {amount:>12}  {finishedAt or ''}")
+    done = sum(1 for shard in shards if shard[3] == "DONE")
+    print(f"\n{done}/{len(shards)} SHARDS DONE, {sum(shard[4] for shard in shards)} BILLS, "
+          f"Rs. {sum(shard[5] for shard in shards)}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bill every HMS guest for a month, shard by shard in parallel.")
+    addBackendArguments(parser)
+    parser.add_argument("--month", default=previousMonth(), help="YYYY-MM to bill (default last month)")
+    parser.add_argument("--workers", type=int, default=4, help="worker processes (default 4)")
+    parser.add_argument("--shard-size", type=int, default=SHARD_SIZE,
+                        help=f"customers per shard when a month is first planned (default {SHARD_SIZE})")
+    parser.add_argument("--status", action="store_true", help="show the month's shards and exit")
+    args = parser.parse_args(argv)
+    try:
+        monthBounds(args.month)
+    except ValueError:
+        parser.error("--month must look like 2026-03")
+
+    backend = backendFromArguments(args)
+    pool = ConnectionPool(backend, size=1)
+    migrate(pool)
+    if args.status:
+        printStatus(pool, args.month)
+        pool.close()
+        return
+    started = time.perf_counter()
+    try:
+        bills, amount, failed = runMonthEnd(backend, pool, args.month, args.workers, args.shard_size)
+    finally:
+        pool.close()
+    print(f"\n{bills} BILLS, Rs. {amount} IN {time.perf_counter() - started:.2f} s")
+    if failed:
+        print(f"{len(failed)} SHARDS FAILED ({', '.join(map(str, sorted(failed)))}); run again to retry them")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
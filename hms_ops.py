@@ -0,0 +1,261 @@
+# HOTEL OPERATIONS WITHOUT A KEYBOARD
+#
+# Hotel wraps the pooled backend, the customer cache, the room availability
+# engine and the tariff catalogue behind plain method calls, so the same
+# check-in, charge and billing logic serves the gauri.py menu, the HTTP service
+# and the benchmark tools.
+# Methods raise a HotelError subclass (with a user-facing message) instead of
+# printing, and are safe to call from many threads at once. Given a
+# hms_batch.ChargeBatcher, charges are group-committed with other callers'.
+
+import threading
+from datetime import date, timedelta
+
+from hms_billing import billCheckedOut, billHistory, computeBill, historyPage, openBalances, recordCharge, saveBills
+from hms_cache import CustomerCache
+from hms_db import DB_ERRORS
+from hms_rooms import ROOM_CATEGORIES, AvailabilityEngine
+from hms_search import CustomerIndex
+from hms_tariff import SERVICES, TariffCatalog
+
+HISTORY_PAGE = 50
+MAX_HISTORY_PAGE = 500
+
+CUSTOMER_FIELDS = ("cid", "name", "address", "age", "country", "phone", "email")
+
+
+class HotelError(Exception):
+    status = 400
+
+
+class NotFound(HotelError):
+    status = 404
+
+
+class Conflict(HotelError):
+    status = 409
+
+
+def toDate(value, field):
+    if isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(str(value))
+    except ValueError:
+        raise HotelError(f"{field} must be a YYYY-MM-DD date")
+
+
+def toCount(value, field):
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise HotelError(f"{field} must be a whole number")
+    if value <= 0:
+        raise HotelError(f"{field} must be at least 1")
+    return value
+
+
+CUSTOMER_INSERT = "INSERT INTO C_DETAILS VALUES (%s, %s, %s, %s, %s, %s, %s)"
+BOOKING_INSERT = "INSERT INTO BOOKING_RECORD (CID, CHECK_IN, CHECK_OUT, ROOMNO) VALUES (%s, %s, %s, %s)"
+
+
+class HotelRules:
+    """Checks that need no database, shared by Hotel and hms_async.AsyncHotel.
+
+    Subclasses set self.rooms (an AvailabilityEngine) and self.tariff (a TariffCatalog),
+    and self.shard to (ShardRouter, property name) when the hotel is one property of a group."""
+
+    shard = None
+
+    def customerValues(self, cid, name, address="", age="", country="", phone="", email=""):
+        cid = str(cid or "").strip()
+        if not cid:
+            raise HotelError("CID is required")
+        if self.shard is not None:
+            # a new guest's CID must route back to this property
+            router, home = self.shard
+            try:
+                owner = router.propertyFor(cid)
+            except NotFound as err:
+                raise HotelError(str(err))
+            if owner != home:
+                raise HotelError(f"customer ID {cid} belongs to property {owner}, not {home}")
+        return (cid, name, address, str(age), country, phone, email)
+
+    # ROOMS
+    def checkRoom(self, roomno, category=None):
+        if not self.rooms.configured:
+            return
+        if roomno not in self.rooms.category:
+            raise NotFound(f"there is no room {roomno} in this hotel")
+        if category is not None and self.rooms.category[roomno] != category:
+            raise HotelError(f"room {roomno} is not a {ROOM_CATEGORIES.get(category)} room")
+
+    def freeRooms(self, category, checkin, checkout):
+        return self.rooms.freeRooms(int(category), toDate(checkin, "check_in"), toDate(checkout, "check_out"))
+
+    def reserveRoom(self, cid, checkin, checkout, roomno):
+        """Hold the room in the availability engine; return (checkin, checkout, roomno) as stored."""
+        checkin, checkout = toDate(checkin, "check_in"), toDate(checkout, "check_out")
+        if checkout <= checkin:
+            raise HotelError("check-out must be after check-in")
+        roomno = toCount(roomno, "room number")
+        self.checkRoom(roomno)
+        clashes = self.rooms.reserve(roomno, checkin, checkout, cid)
+        if clashes:
+            start, end, guest = clashes[0]
+            raise Conflict(f"room {roomno} is already booked from {start} to {end}")
+        return checkin, checkout, roomno
+
+    # CHARGES
+    def priceCharge(self, service, cid, choice, quantity, roomno=None):
+        """(service, service-table values, item, amount) for a charge; quantity is days for ROOM_RENT."""
+        service = str(service).upper()
+        if service not in SERVICES:
+            raise HotelError(f"service must be one of {', '.join(SERVICES)}")
+        try:
+            item, price = self.tariff.item(service, int(choice))
+        except (TypeError, ValueError):
+            raise HotelError(f"no choice {choice} on the {service} menu")
+        quantity = toCount(quantity, "quantity")
+        amount = quantity * price
+
+        if service == "ROOM_RENT":
+            roomno = toCount(roomno, "room number")
+            self.checkRoom(roomno, int(choice))
+            return service, (cid, int(choice), quantity, roomno, amount), item, amount
+        return service, (cid, int(choice), quantity, amount), item, amount
+
+    def holdChargedRoom(self, service, values):
+        """For a room rent, the (checkin, checkout, roomno) stay it books, or None.
+
+        A guest who already holds the room (BOOKING_RECORD) is charged for that
+        booking. Otherwise the rent books the room from today for the charged
+        days, checked and held in one step like a booking, so two charges for
+        the same free room cannot both go through."""
+        if service != "ROOM_RENT":
+            return None
+        cid, choice, days, roomno, amount = values
+        if self.rooms.staysOf(roomno, cid):
+            return None
+        today = date.today()
+        return self.reserveRoom(cid, today, today + timedelta(days=days), roomno)
+
+    # BILLS
+    def historyArguments(self, since, until, after, limit):
+        since, until = self.dateRange(since, until)
+        try:
+            after = max(int(after or 0), 0)
+        except (TypeError, ValueError):
+            raise HotelError("after must be a bill number")
+        return since, until, after, min(toCount(limit, "limit"), MAX_HISTORY_PAGE)
+
+    def dateRange(self, since, until):
+        since = toDate(since, "from date") if since else None
+        until = toDate(until, "to date") if until else None
+        if since and until and until < since:
+            raise HotelError("the to date must not be before the from date")
+        return since, until
+
+
+class Hotel(HotelRules):
+    def __init__(self, pool, customers=None, rooms=None, tariff=None, batcher=None, search=None, shard=None):
+        self.pool = pool
+        self.shard = shard
+        self.batcher = batcher
+        self.search = search
+        self._searchLock = threading.Lock()
+        self.customers = customers or CustomerCache()
+        self.rooms = rooms or AvailabilityEngine.load(pool)
+        self.tariff = tariff or TariffCatalog.load(pool)
+
+    # CUSTOMERS
+    def addCustomer(self, cid, name, address="", age="", country="", phone="", email=""):
+        values = self.customerValues(cid, name, address, age, country, phone, email)
+        cid = values[0]
+        try:
+            with self.pool.transaction() as cursor:
+                cursor.execute(CUSTOMER_INSERT, values)
+                openBalances(cursor, [cid])
+        except DB_ERRORS as err:
+            if self.customers.lookup(self.pool, cid):
+                raise Conflict(f"customer {cid} already exists")
+            raise HotelError(str(err))
+        self.customers.put(cid, values)
+        with self._searchLock:
+            if self.search is not None:
+                self.search.add(cid, name, phone, email)
+        return values
+
+    def customer(self, cid):
+        record = self.customers.lookup(self.pool, cid)
+        if not record:
+            raise NotFound(f"customer {cid} not found")
+        return record
+
+    def findCustomers(self, text, limit=10):
+        """Ranked (score, cid, name, phone, email) for a name, phone or email fragment."""
+        with self._searchLock:
+            if self.search is None:
+                # built on first use, so the menu and tools that never search don't pay for it
+                self.search = CustomerIndex.load(self.pool)
+        return self.search.search(text, limit)
+
+    # ROOMS
+    def book(self, cid, checkin, checkout, roomno):
+        self.customer(cid)
+        checkin, checkout, roomno = self.reserveRoom(cid, checkin, checkout, roomno)
+        try:
+            with self.pool.transaction() as cursor:
+                cursor.execute(BOOKING_INSERT, (cid, checkin.isoformat(), checkout.isoformat(), roomno))
+        except BaseException:
+            self.rooms.release(roomno, checkin, checkout, cid)
+            raise
+        return (cid, checkin, checkout, roomno)
+
+    # CHARGES
+    def charge(self, service, cid, choice, quantity, roomno=None):
+        """Record one charge and return (item, amount). quantity is days for ROOM_RENT."""
+        if str(service).upper() in SERVICES:
+            self.customer(cid)
+        service, values, item, amount = self.priceCharge(service, cid, choice, quantity, roomno)
+        stay = self.holdChargedRoom(service, values)
+        if self.batcher and stay is None:
+            self.batcher.post(service, values)
+            return item, amount
+        try:
+            with self.pool.transaction() as cursor:
+                if stay:
+                    checkin, checkout, roomno = stay
+                    cursor.execute(BOOKING_INSERT, (cid, checkin.isoformat(), checkout.isoformat(), roomno))
+                recordCharge(cursor, service, values)
+        except BaseException:
+            if stay:
+                self.rooms.release(stay[2], stay[0], stay[1], cid)
+            raise
+        return item, amount
+
+    # BILLS
+    def bill(self, cid, save=False):
+        self.customer(cid)
+        with self.pool.transaction() as cursor:
+            bill = computeBill(cursor, cid)
+            if save:
+                saveBills(cursor, [bill])
+        return bill
+
+    def history(self, cid, since=None, until=None, after=0, limit=HISTORY_PAGE):
+        """One page of earlier bills; pass the last row's BILL_NO as after for the next."""
+        self.customer(cid)
+        since, until, after, limit = self.historyArguments(since, until, after, limit)
+        with self.pool.transaction() as cursor:
+            return historyPage(cursor, cid, after, since, until, limit)
+
+    def historyPages(self, cid, since=None, until=None, pageSize=HISTORY_PAGE):
+        """Yield pages of earlier bills without holding a connection between pages."""
+        self.customer(cid)
+        since, until = self.dateRange(since, until)
+        return billHistory(self.pool, cid, since, until, pageSize)
+
+    def billCheckedOut(self, asOf=None):
+        return billCheckedOut(self.pool, toDate(asOf, "as_of") if asOf else None)
@@ -0,0 +1,310 @@
+# QUERY TIMING AND SLOW-QUERY LOG FOR THE HOTEL MANAGEMENT SYSTEM
+#
+# A ConnectionPool given a QueryLog hands out connections whose cursors time
+# every execute()/executemany() together with the fetches that read its rows.
+# Statements are grouped by their shape (literals and placeholders folded to ?),
+# and for each shape the log keeps a latency histogram, call, error and row
+# counts. The time callers spend waiting for a pooled connection and the time
+# spent in COMMIT are kept the same way. Any statement slower than slowMs is
+# appended to the slow-query log file as one JSON line.
+#
+#   queryLog = QueryLog(slowMs=100, path="hms-slow-queries.log")
+#   pool = ConnectionPool(backend, size=5, queryLog=queryLog)
+#   ...
+#   print(queryLog.report(top=10))              # the statements costing the most time
+#
+#   python hms_querylog.py hms-slow-queries.log --top 10    # top offenders of a slow-query log
+
+import argparse
+import json
+import math
+import re
+import threading
+import time
+from bisect import bisect_left
+from datetime import datetime
+from functools import lru_cache
+
+# upper bounds of the histogram buckets, in milliseconds; the last bucket is open
+BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+POOL_WAIT = "(waiting for a pooled connection)"
+COMMIT = "COMMIT"
+MAX_PARAMS = 200
+
+
+@lru_cache(maxsize=2048)
+def statementKey(sql):
+    """The shape of a statement: whitespace collapsed, literals and placeholders as ?."""
+    key = " ".join(sql.split())
+    key = re.sub(r"'(?:[^']|'')*'", "?", key)
+    key = re.sub(r"(?<![\w.])\d+(?:\.\d+)?\b", "?", key)
+    key = key.replace("%s", "?")
+    # IN lists and multi-row VALUES of any length are the same statement
+    return re.sub(r"\(\?(?:\s*,\s*\?)+\)", "(?, ...)", key)
+
+
+class Histogram:
+    """Call, error and row counts and a fixed-bucket latency histogram for one statement."""
+
+    __slots__ = ("count", "errors", "rows", "seconds", "slowest", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.rows = 0
+        self.seconds = 0.0
+        self.slowest = 0.0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+
+    def add(self, seconds, rows, ok):
+        self.count += 1
+        self.rows += rows
+        self.seconds += seconds
+        self.slowest = max(self.slowest, seconds)
+        self.buckets[bisect_left(BUCKETS_MS, seconds * 1000)] += 1
+        if not ok:
+            self.errors += 1
+
+    def percentile(self, fraction):
+        """Upper bound (ms) of the bucket holding the nearest-rank percentile."""
+        rank = max(1, math.ceil(fraction * self.count))
+        seen = 0
+        for bound, hits in zip(BUCKETS_MS, self.buckets):
+            seen += hits
+            if seen >= rank:
+                return min(bound, self.slowest * 1000)
+        return self.slowest * 1000
+
+
+class QueryLog:
+    def __init__(self, slowMs=100, path=None):
+        """slowMs: statements at least this slow go to the slow-query log file at path (none if None)."""
+        self.slowMs = slowMs
+        self.path = path
+        self.slowQueries = 0
+        self._statements = {}
+        self._lock = threading.Lock()
+        self._fileLock = threading.Lock()
+
+    def wrap(self, connection):
+        return InstrumentedConnection(connection, self)
+
+    # MODULE TO RECORD ONE STATEMENT, COMMIT OR POOL WAIT
+    def record(self, key, seconds, rows=0, ok=True, sql=None, params=None):
+        with self._lock:
+            histogram = self._statements.get(key)
+            if histogram is None:
+                histogram = self._statements[key] = Histogram()
+            histogram.add(seconds, rows, ok)
+        if sql is not None and seconds * 1000 >= self.slowMs:
+            self.logSlowQuery(key, sql, params, seconds, rows, ok)
+
+    def recordWait(self, seconds, ok=True):
+        self.record(POOL_WAIT, seconds, ok=ok)
+
+    def logSlowQuery(self, key, sql, params, seconds, rows, ok):
+        with self._fileLock:
+            self.slowQueries += 1
+            if not self.path:
+                return
+            entry = {
+                "at": datetime.now().isoformat(timespec="milliseconds"),
+                "ms": round(seconds * 1000, 3),
+                "rows": rows,
+                "ok": ok,
+                "statement": key,
+                "sql": " ".join(sql.split()),
+                "params": repr(params)[:MAX_PARAMS] if params else None,
+            }
+            with open(self.path, "a", encoding="utf-8") as file:
+                file.write(json.dumps(entry) + "\n")
+
+    # MODULE TO SUMMARIZE WHERE THE DATABASE TIME GOES
+    def summary(self, top=None):
+        """[{statement, count, errors, rows, total_ms, mean_ms, p50_ms, p99_ms, max_ms}], most total time first."""
+        with self._lock:
+            rows = [
+                {
+                    "statement": key,
+                    "count": histogram.count,
+                    "errors": histogram.errors,
+                    "rows": histogram.rows,
+                    "total_ms": round(histogram.seconds * 1000, 3),
+                    "mean_ms": round(histogram.seconds * 1000 / histogram.count, 3),
+                    "p50_ms": round(histogram.percentile(0.50), 3),
+                    "p99_ms": round(histogram.percentile(0.99), 3),
+                    "max_ms": round(histogram.slowest * 1000, 3),
+                }
+                for key, histogram in self._statements.items()
+            ]
+        rows.sort(key=lambda row: -row["total_ms"])
+        return rows[:top] if top else rows
+
+    def report(self, top=10):
+        rows = self.summary()
+        lines = [f"{'CALLS':>8}{'ERRORS':>8}{'ROWS':>10}{'TOTAL ms':>12}{'MEAN ms':>10}"
+                 f"{'P50 ms':>10}{'P99 ms':>10}{'MAX ms':>10}  STATEMENT"]
+        for row in rows[:top]:
+            lines.append(f"{row['count']:>8}{row['errors']:>8}{row['rows']:>10}{row['total_ms']:>12.1f}"
+                         f"{row['mean_ms']:>10.2f}{row['p50_ms']:>10.2f}{row['p99_ms']:>10.2f}{row['max_ms']:>10.2f}"
+                         f"  {shorten(row['statement'])}")
+        lines.append(f"{len(rows)} STATEMENTS, {sum(row['count'] for row in rows)} CALLS, "
+                     f"{self.slowQueries} AT OR ABOVE {self.slowMs} ms"
+                     + (f" (LOGGED TO {self.path})" if self.path else ""))
+        return "\n".join(lines)
+
+
+def shorten(text, width=100):
+    return text if len(text) <= width else text[:width - 3] + "..."
+
+
+# CONNECTION AND CURSOR THAT REPORT TO A QueryLog
+class InstrumentedConnection:
+    def __init__(self, connection, queryLog):
+        self.connection = connection
+        self.queryLog = queryLog
+
+    def cursor(self):
+        return InstrumentedCursor(self.connection.cursor(), self.queryLog)
+
+    def commit(self):
+        started = time.perf_counter()
+        ok = False
+        try:
+            self.connection.commit()
+            ok = True
+        finally:
+            self.queryLog.record(COMMIT, time.perf_counter() - started, ok=ok, sql=COMMIT)
+
+    def rollback(self):
+        self.connection.rollback()
+
+    def close(self):
+        self.connection.close()
+
+    def is_connected(self):
+        return self.connection.is_connected()
+
+    def __getattr__(self, name):
+        return getattr(self.connection, name)
+
+
+class InstrumentedCursor:
+    """A statement's time is its execute() plus every fetch until the next execute() or close()."""
+
+    def __init__(self, cursor, queryLog):
+        self.cursor = cursor
+        self.queryLog = queryLog
+        self._pending = None    # [key, sql, params, seconds, rows fetched or None]
+
+    def _run(self, method, sql, params):
+        self._finish()
+        started = time.perf_counter()
+        try:
+            method(sql, params)
+        except BaseException:
+            self.queryLog.record(statementKey(sql), time.perf_counter() - started, ok=False, sql=sql, params=params)
+            raise
+        self._pending = [statementKey(sql), sql, params, time.perf_counter() - started, None]
+        return self
+
+    def execute(self, sql, params=()):
+        return self._run(self.cursor.execute, sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        seq_of_params = list(seq_of_params)
+        return self._run(self.cursor.executemany, sql, seq_of_params)
+
+    def _fetched(self, started, rows):
+        pending = self._pending
+        if pending is not None:
+            pending[3] += time.perf_counter() - started
+            pending[4] = (pending[4] or 0) + rows
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = self.cursor.fetchone()
+        self._fetched(started, 0 if row is None else 1)
+        return row
+
+    def fetchmany(self, size=100):
+        started = time.perf_counter()
+        rows = self.cursor.fetchmany(size)
+        self._fetched(started, len(rows))
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = self.cursor.fetchall()
+        self._fetched(started, len(rows))
+        return rows
+
+    def __iter__(self):
+        while True:
+            row = self.fetchone()
+            if row is None:
+                return
+            yield row
+
+    def _finish(self):
+        pending, self._pending = self._pending, None
+        if pending is None:
+            return
+        key, sql, params, seconds, fetched = pending
+        if fetched is None:
+            # nothing was read: an INSERT/UPDATE/DELETE, counted by what it changed
+            try:
+                fetched = max(self.cursor.rowcount, 0)
+            except Exception:
+                fetched = 0
+        self.queryLog.record(key, seconds, fetched, sql=sql, params=params)
+
+    def close(self):
+        self._finish()
+        self.cursor.close()
+
+    @property
+    def rowcount(self):
+        return self.cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self.cursor.lastrowid
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+
+# MODULE TO FIND THE TOP OFFENDERS IN A SLOW-QUERY LOG FILE
+def summarizeLog(path):
+    """[(statement, {count, total_ms, max_ms, rows})] from a slow-query log, most total time first."""
+    totals = {}
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            row = totals.setdefault(entry["statement"], {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "rows": 0})
+            row["count"] += 1
+            row["total_ms"] += entry["ms"]
+            row["max_ms"] = max(row["max_ms"], entry["ms"])
+            row["rows"] += entry.get("rows") or 0
+    return sorted(totals.items(), key=lambda item: -item[1]["total_ms"])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Print the statements costing the most time in an HMS slow-query log.")
+    parser.add_argument("log", help="slow-query log written by a QueryLog")
+    parser.add_argument("--top", type=int, default=10, help="how many statements to show (default 10)")
+    args = parser.parse_args(argv)
+
+    offenders = summarizeLog(args.log)
+    print(f"{'CALLS':>8}{'TOTAL ms':>12}{'MEAN ms':>10}{'MAX ms':>10}{'ROWS':>10}  STATEMENT")
+    for statement, row in offenders[:args.top]:
+        print(f"{row['count']:>8}{row['total_ms']:>12.1f}{row['total_ms'] / row['count']:>10.2f}"
+              f"{row['max_ms']:>10.2f}{row['rows']:>10}  {shorten(statement)}")
+    print(f"\n{len(offenders)} SLOW STATEMENTS, {sum(row['count'] for _, row in offenders)} SLOW CALLS IN {args.log}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+# ROOM AVAILABILITY ENGINE FOR THE HOTEL MANAGEMENT SYSTEM
+#
+# The engine is loaded once from ROOMS and BOOKING_RECORD and then kept in step
+# by whoever books a room (gauri.bookingRecord). It holds, for every room, the
+# sorted list of its stays plus two bitmap views over a rolling horizon of days:
+#
+#   roomDays[room]  bit d set  -> room is occupied on day origin + d
+#   dayRooms[d]     bit s set  -> the room in slot s is occupied on that day
+#
+# "Is room N free for [a, b)" is a bisect over the room's stays; "which rooms of
+# category X are free for [a, b)" ORs the day bitmaps of the stay and masks the
+# category's rooms, so it costs one big-int operation per night whatever the
+# number of rooms. Stays are half-open: a guest leaving on day X frees the room
+# for a guest arriving on day X.
+#
+#   python hms_rooms.py --sqlite HMS.db --add 101-140 --category 1
+#   python hms_rooms.py --sqlite HMS.db --free --category 2 --from 2026-03-01 --to 2026-03-04
+
+import argparse
+import threading
+from bisect import bisect_left
+from datetime import date, timedelta
+
+from hms_db import ConnectionPool, addBackendArguments, backendFromArguments
+from hms_schema import migrate
+
+ROOM_CATEGORIES = {1: "Ultra Royal", 2: "Royal", 3: "Elite", 4: "Budget"}
+HORIZON_DAYS = 730
+ROOMS_SQL = "SELECT ROOMNO, ROOM_CHOICE FROM ROOMS"
+STAYS_SQL = "SELECT ROOMNO, CHECK_IN, CHECK_OUT, CID FROM BOOKING_RECORD WHERE ROOMNO IS NOT NULL"
+
+
+def toDate(value):
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+class AvailabilityEngine:
+    def __init__(self, origin=None, horizon=HORIZON_DAYS):
+        self.origin = (origin or date.today()).toordinal()
+        self.horizon = horizon
+        self.category = {}        # room -> category
+        self.slot = {}            # room -> bit position in the day bitmaps
+        self.slotRoom = []        # bit position -> room
+        self.categoryMask = {}    # category -> bitmap of its rooms' slots
+        self.roomDays = {}        # room -> bitmap of occupied days
+        self.dayRooms = [0] * horizon
+        self.starts = {}          # room -> sorted stay start days
+        self.stays = {}           # room -> [(start, end, cid)] sorted like starts
+        self.maxEnd = {}          # room -> running max of stay ends, for overlap tests
+        self._lock = threading.RLock()
+
+    # MODULE TO LOAD ROOMS AND STAYS FROM THE DATABASE
+    @classmethod
+    def load(cls, pool, origin=None, horizon=HORIZON_DAYS):
+        with pool.transaction() as cursor:
+            cursor.execute(ROOMS_SQL)
+            rooms = cursor.fetchall()
+            cursor.execute(STAYS_SQL)
+            stays = cursor.fetchall()
+        return cls.fromRows(rooms, stays, origin, horizon)
+
+    @classmethod
+    def fromRows(cls, rooms, stays, origin=None, horizon=HORIZON_DAYS):
+        """Engine from ROOMS_SQL and STAYS_SQL rows, for callers that read them some other way."""
+        engine = cls(origin, horizon)
+        for room, category in rooms:
+            engine.addRoom(room, category)
+        for room, checkin, checkout, cid in stays:
+            if checkin and checkout:
+                engine._add(room, toDate(checkin).toordinal(), toDate(checkout).toordinal(), cid)
+        return engine
+
+    @property
+    def configured(self):
+        """True once the property's rooms have been entered in ROOMS."""
+        return bool(self.category)
+
+    def _ensureSlot(self, room):
+        """Give room a bitmap slot and stay lists without entering it in ROOMS' categories."""
+        if room not in self.slot:
+            self.slot[room] = len(self.slotRoom)
+            self.slotRoom.append(room)
+            self.roomDays[room] = 0
+            self.starts[room] = []
+            self.stays[room] = []
+            self.maxEnd[room] = []
+
+    def addRoom(self, room, category):
+        with self._lock:
+            self._ensureSlot(room)
+            old = self.category.get(room)
+            if old is not None:
+                self.categoryMask[old] &= ~(1 << self.slot[room])
+            self.category[room] = category
+            self.categoryMask[category] = self.categoryMask.get(category, 0) | (1 << self.slot[room])
+
+    def rooms(self, category=None):
+        return sorted(room for room, kind in self.category.items() if category is None or kind == category)
+
+    def _add(self, room, start, end, cid):
+        # a stay in a room missing from ROOMS is tracked, but the room stays unconfigured
+        self._ensureSlot(room)
+        stays = self.stays[room]
+        position = bisect_left(self.starts[room], start)
+        self.starts[room].insert(position, start)
+        stays.insert(position, (start, end, cid))
+        self._refreshMaxEnd(room, position)
+        self._paint(room, start, end)
+
+    def _refreshMaxEnd(self, room, position):
+        stays, maxEnd = self.stays[room], self.maxEnd[room]
+        del maxEnd[position:]
+        running = maxEnd[-1] if maxEnd else 0
+        for start, end, cid in stays[position:]:
+            running = max(running, end)
+            maxEnd.append(running)
+
+    def _paint(self, room, start, end):
+        # recompute the bitmaps for [start, end) from the room's remaining stays
+        first = max(start - self.origin, 0)
+        last = min(end - self.origin, self.horizon)
+        if first >= last:
+            return
+        bit = 1 << self.slot[room]
+        days = self.roomDays[room] & ~(((1 << (last - first)) - 1) << first)
+        for stayStart, stayEnd, cid in self._overlapping(room, start, end):
+            lo = max(stayStart - self.origin, first)
+            hi = min(stayEnd - self.origin, last)
+            days |= ((1 << (hi - lo)) - 1) << lo
+        self.roomDays[room] = days
+        for day in range(first, last):
+            if days >> day & 1:
+                self.dayRooms[day] |= bit
+            else:
+                self.dayRooms[day] &= ~bit
+
+    def _overlapping(self, room, start, end):
+        stays, maxEnd = self.stays.get(room, ()), self.maxEnd.get(room, ())
+        position = bisect_left(self.starts.get(room, ()), end)
+        found = []
+        while position > 0 and maxEnd[position - 1] > start:
+            position -= 1
+            if stays[position][1] > start:
+                found.append(stays[position])
+        return found
+
+    # MODULE TO ANSWER "WHO HOLDS ROOM N DURING [a, b)"
+    def conflicts(self, room, checkin, checkout):
+        """Return [(check_in, check_out, cid)] of stays overlapping [checkin, checkout)."""
+        with self._lock:
+            found = self._overlapping(room, checkin.toordinal(), checkout.toordinal())
+        return [(date.fromordinal(start), date.fromordinal(end), cid) for start, end, cid in reversed(found)]
+
+    def staysOf(self, room, cid):
+        """Return [(check_in, check_out)] of cid's stays in room."""
+        with self._lock:
+            return [(date.fromordinal(start), date.fromordinal(end))
+                    for start, end, guest in self.stays.get(room, ()) if guest == cid]
+
+    def isFree(self, room, checkin, checkout):
+        with self._lock:
+            return not self._overlapping(room, checkin.toordinal(), checkout.toordinal())
+
+    def freeRooms(self, category, checkin, checkout):
+        """Rooms of category with no stay overlapping [checkin, checkout), in room order."""
+        with self._lock:
+            first = checkin.toordinal() - self.origin
+            last = checkout.toordinal() - self.origin
+            candidates = self.categoryMask.get(category, 0)
+            if first < 0 or last > self.horizon:
+                # outside the bitmap horizon: fall back to the per-room stay lists
+                return [room for room in self.rooms(category) if self.isFree(room, checkin, checkout)]
+            occupied = 0
+            for day in range(first, last):
+                occupied |= self.dayRooms[day]
+            free = candidates & ~occupied
+            rooms = []
+            while free:
+                low = free & -free
+                rooms.append(self.slotRoom[low.bit_length() - 1])
+                free ^= low
+        return sorted(rooms)
+
+    # MODULE TO HOLD A ROOM FOR A GUEST (CHECK AND MARK IN ONE STEP)
+    def reserve(self, room, checkin, checkout, cid):
+        """Mark the stay and return [] or, if the room is taken, the clashing stays."""
+        with self._lock:
+            clashes = self.conflicts(room, checkin, checkout)
+            if not clashes:
+                self._add(room, checkin.toordinal(), checkout.toordinal(), cid)
+            return clashes
+
+    def release(self, room, checkin, checkout, cid):
+        with self._lock:
+            stay = (checkin.toordinal(), checkout.toordinal(), cid)
+            if stay not in self.stays.get(room, ()):
+                return
+            position = self.stays[room].index(stay)
+            del self.stays[room][position]
+            del self.starts[room][position]
+            self._refreshMaxEnd(room, position)
+            self._paint(room, stay[0], stay[1])
+
+
+def parseRooms(text):
+    """'101-105,110' -> [101, 102, 103, 104, 105, 110]"""
+    rooms = []
+    for part in text.split(","):
+        if "-" in part:
+            first, last = part.split("-")
+            rooms.extend(range(int(first), int(last) + 1))
+        elif part.strip():
+            rooms.append(int(part))
+    return rooms
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage HMS rooms and query availability.")
+    addBackendArguments(parser)
+    parser.add_argument("--add", metavar="ROOMS", help="add or re-categorise rooms, e.g. 101-140,150")
+    parser.add_argument("--category", type=int, choices=sorted(ROOM_CATEGORIES), help="room category (1-4)")
+    parser.add_argument("--free", action="store_true", help="list free rooms of --category for --from/--to")
+    parser.add_argument("--from", dest="checkin", type=date.fromisoformat, default=date.today())
+    parser.add_argument("--to", dest="checkout", type=date.fromisoformat)
+    args = parser.parse_args(argv)
+
+    pool = ConnectionPool(backendFromArguments(args), size=1)
+    migrate(pool)
+    if args.add:
+        if not args.category:
+            parser.error("--add needs --category")
+        rooms = parseRooms(args.add)
+        with pool.transaction() as cursor:
+            cursor.execute("SELECT ROOMNO FROM ROOMS")
+            known = {row[0] for row in cursor.fetchall()}
+            cursor.executemany("UPDATE ROOMS SET ROOM_CHOICE = %s WHERE ROOMNO = %s",
+                               [(args.category, room) for room in rooms if room in known])
+            cursor.executemany("INSERT INTO ROOMS (ROOMNO, ROOM_CHOICE) VALUES (%s, %s)",
+                               [(room, args.category) for room in rooms if room not in known])
+        print(len(rooms), ROOM_CATEGORIES[args.category].upper(), "ROOMS SAVED")
+    if args.free:
+        checkout = args.checkout or args.checkin + timedelta(days=1)
+        engine = AvailabilityEngine.load(pool)
+        for category in ([args.category] if args.category else sorted(ROOM_CATEGORIES)):
+            rooms = engine.freeRooms(category, args.checkin, checkout)
+            print(f"{ROOM_CATEGORIES[category]:<12}{len(rooms):>5} FREE: {' '.join(map(str, rooms))}")
+    pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,417 @@
+# VERSIONED SCHEMA MIGRATIONS FOR THE HOTEL MANAGEMENT SYSTEM
+#
+# migrate(pool) runs once at startup. It records every applied step in
+# SCHEMA_VERSION and only runs the steps a database has not seen yet, so the
+# per-call CREATE TABLE statements gauri.py used to issue are no longer needed.
+# To change the schema, append a new (version, description, function) entry to
+# MIGRATIONS; never edit a step that has already shipped.
+
+from datetime import datetime
+
+# Columns of every HMS table as first created (migration 1); later migrations
+# append to ADDED_COLUMNS instead of editing this
+TABLES = {
+    "C_DETAILS": [
+        "CID VARCHAR(20) NOT NULL",
+        "C_NAME VARCHAR(30)",
+        "C_ADDRESS VARCHAR(30)",
+        "C_AGE VARCHAR(30)",
+        "C_COUNTRY VARCHAR(30)",
+        "P_NO VARCHAR(30)",
+        "C_EMAIL VARCHAR(30)",
+    ],
+    "BOOKING_RECORD": [
+        "CID VARCHAR(20)",
+        "CHECK_IN DATE",
+        "CHECK_OUT DATE",
+    ],
+    "ROOM_RENT": [
+        "CID VARCHAR(20)",
+        "ROOM_CHOICE INT",
+        "NO_OF_DAYS INT",
+        "ROOMNO INT",
+        "ROOMRENT INT",
+    ],
+    "RESTAURANT": [
+        "CID VARCHAR(20)",
+        "CUISINE VARCHAR(30)",
+        "QUANTITY INT",
+        "BILL INT",
+    ],
+    "GAMING": [
+        "CID VARCHAR(20)",
+        "GAMES VARCHAR(30)",
+        "HOURS INT",
+        "GAMING_BILL INT",
+    ],
+    "FASHION": [
+        "CID VARCHAR(20)",
+        "DRESS VARCHAR(30)",
+        "AMOUNT INT",
+        "BILL INT",
+    ],
+    "TOTAL": [
+        "CID VARCHAR(20)",
+        "C_NAME VARCHAR(30)",
+        "ROOMRENT INT",
+        "RESTAURANTBILL INT",
+        "GAMINGBILL INT",
+        "FASHIONBILL INT",
+        "TOTALAMOUNT INT",
+    ],
+}
+
+# Columns added by later migrations, in the order they were added
+ADDED_COLUMNS = {
+    "BOOKING_RECORD": ["ROOMNO INT"],
+    "TOTAL": ["BILLED_AT DATE", "BILL_NO INT", "ENTRY_NO BIGINT"],
+}
+
+# The four service tables became views over LEDGER in version 7; their columns,
+# in TABLES order, are these LEDGER columns
+LEDGER_COLUMNS = {
+    "ROOM_RENT": ["CID", "CHOICE", "QUANTITY", "ROOMNO", "AMOUNT"],
+    "RESTAURANT": ["CID", "CHOICE", "QUANTITY", "AMOUNT"],
+    "GAMING": ["CID", "CHOICE", "QUANTITY", "AMOUNT"],
+    "FASHION": ["CID", "CHOICE", "QUANTITY", "AMOUNT"],
+}
+
+# Tables that hang off a customer and are looked up by CID
+CUSTOMER_TABLES = ["BOOKING_RECORD", "ROOM_RENT", "RESTAURANT", "GAMING", "FASHION", "TOTAL"]
+
+# How many offending CIDs a MigrationError lists per problem
+REPORT_LIMIT = 10
+
+
+class MigrationError(Exception):
+    """A step cannot run until the data it reports is fixed by hand."""
+
+
+def columnNames(table):
+    columns = TABLES[table] + ADDED_COLUMNS.get(table, [])
+    return [column.split()[0] for column in columns]
+
+
+def createTable(cursor, table, columns, constraints=()):
+    body = ",\n    ".join(list(columns) + list(constraints))
+    cursor.execute(f"CREATE TABLE IF NOT EXISTS {table} (\n    {body}\n)")
+
+
+def customerKey():
+    return "FOREIGN KEY (CID) REFERENCES C_DETAILS (CID)"
+
+
+# VERSION 1: THE TABLES AS THE ORIGINAL gauri.py CREATED THEM (NO KEYS)
+def migrateBaseline(cursor, dialect):
+    for table, columns in TABLES.items():
+        createTable(cursor, table, columns)
+
+
+# VERSION 2: CID PRIMARY/FOREIGN KEYS AND AN INDEX ON EVERY CID LOOKUP
+def migrateKeys(cursor, dialect):
+    checkKeys(cursor)
+    if dialect == "mysql":
+        cursor.execute("ALTER TABLE C_DETAILS ADD PRIMARY KEY (CID)")
+        for table in CUSTOMER_TABLES:
+            cursor.execute(f"CREATE INDEX IDX_{table}_CID ON {table} (CID)")
+            cursor.execute(f"ALTER TABLE {table} ADD CONSTRAINT FK_{table}_CID {customerKey()}")
+        return
+
+    # sqlite cannot add keys to an existing table, so each one is rebuilt
+    rebuildTable(cursor, "C_DETAILS", TABLES["C_DETAILS"], ["PRIMARY KEY (CID)"])
+    for table in CUSTOMER_TABLES:
+        rebuildTable(cursor, table, TABLES[table], [customerKey()])
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS IDX_{table}_CID ON {table} (CID)")
+
+
+def checkKeys(cursor):
+    """Raise MigrationError listing CIDs that would break the keys of version 2."""
+    problems = []
+    cursor.execute("SELECT CID, COUNT(*) FROM C_DETAILS GROUP BY CID HAVING COUNT(*) > 1 ORDER BY CID")
+    duplicates = cursor.fetchall()
+    if duplicates:
+        problems.append(describeCids("C_DETAILS has more than one row for", [cid for cid, count in duplicates]))
+    cursor.execute("SELECT COUNT(*) FROM C_DETAILS WHERE CID IS NULL")
+    if cursor.fetchone()[0]:
+        problems.append("C_DETAILS has rows without a CID")
+    for table in CUSTOMER_TABLES:
+        cursor.execute(
+            f"SELECT DISTINCT T.CID FROM {table} T "
+            "WHERE T.CID IS NOT NULL AND NOT EXISTS (SELECT 1 FROM C_DETAILS C WHERE C.CID = T.CID) "
+            "ORDER BY T.CID"
+        )
+        orphans = [row[0] for row in cursor.fetchall()]
+        if orphans:
+            problems.append(describeCids(f"{table} has rows for unknown customer", orphans))
+    if problems:
+        raise MigrationError(
+            "cannot add the CID keys of version 2:\n  " + "\n  ".join(problems)
+            + "\nmerge or renumber the duplicate customers and delete or reassign the orphan rows, then restart"
+        )
+
+
+def describeCids(problem, cids):
+    shown = ", ".join(str(cid) for cid in cids[:REPORT_LIMIT])
+    more = f" and {len(cids) - REPORT_LIMIT} more" if len(cids) > REPORT_LIMIT else ""
+    return f"{problem} {shown}{more}"
+
+
+def rebuildTable(cursor, table, columns, constraints):
+    createTable(cursor, table + "_NEW", columns, constraints)
+    cursor.execute(f"INSERT INTO {table}_NEW SELECT * FROM {table}")
+    cursor.execute(f"DROP TABLE {table}")
+    cursor.execute(f"ALTER TABLE {table}_NEW RENAME TO {table}")
+
+
+# VERSION 3: PER-CUSTOMER RUNNING BALANCE, FILLED FROM THE EXISTING CHARGES
+def migrateBalances(cursor, dialect):
+    createTable(cursor, "BALANCE", [
+        "CID VARCHAR(20) NOT NULL",
+        "ROOMRENT INT NOT NULL DEFAULT 0",
+        "RESTAURANTBILL INT NOT NULL DEFAULT 0",
+        "GAMINGBILL INT NOT NULL DEFAULT 0",
+        "FASHIONBILL INT NOT NULL DEFAULT 0",
+        "TOTALAMOUNT INT NOT NULL DEFAULT 0",
+    ], ["PRIMARY KEY (CID)", customerKey()])
+    # the four service tables as they were at version 3, not the live billing code
+    cursor.execute(
+        "INSERT INTO BALANCE (CID, ROOMRENT, RESTAURANTBILL, GAMINGBILL, FASHIONBILL, TOTALAMOUNT) "
+        "SELECT CID, ROOM, FOOD, GAMES, SHOP, ROOM + FOOD + GAMES + SHOP FROM ("
+        " SELECT C.CID, COALESCE(SUM(CH.ROOM), 0) AS ROOM, COALESCE(SUM(CH.FOOD), 0) AS FOOD,"
+        " COALESCE(SUM(CH.GAMES), 0) AS GAMES, COALESCE(SUM(CH.SHOP), 0) AS SHOP"
+        " FROM C_DETAILS C LEFT JOIN ("
+        "  SELECT CID, ROOMRENT AS ROOM, 0 AS FOOD, 0 AS GAMES, 0 AS SHOP FROM ROOM_RENT"
+        "  UNION ALL SELECT CID, 0, BILL, 0, 0 FROM RESTAURANT"
+        "  UNION ALL SELECT CID, 0, 0, GAMING_BILL, 0 FROM GAMING"
+        "  UNION ALL SELECT CID, 0, 0, 0, BILL FROM FASHION"
+        " ) CH ON CH.CID = C.CID GROUP BY C.CID) T"
+    )
+
+
+# VERSION 4: ROOM CATALOGUE AND THE ROOM EACH BOOKING HOLDS
+def migrateRooms(cursor, dialect):
+    createTable(cursor, "ROOMS", [
+        "ROOMNO INT NOT NULL",
+        "ROOM_CHOICE INT",
+    ], ["PRIMARY KEY (ROOMNO)"])
+    cursor.execute("ALTER TABLE BOOKING_RECORD ADD COLUMN ROOMNO INT")
+    cursor.execute("CREATE INDEX IDX_BOOKING_RECORD_ROOMNO ON BOOKING_RECORD (ROOMNO, CHECK_IN)")
+    # rooms already charged for are known rooms, and an old booking holds the
+    # room its guest was charged for
+    cursor.execute(
+        "INSERT INTO ROOMS (ROOMNO, ROOM_CHOICE) "
+        "SELECT ROOMNO, MAX(ROOM_CHOICE) FROM ROOM_RENT WHERE ROOMNO IS NOT NULL GROUP BY ROOMNO"
+    )
+    cursor.execute(
+        "UPDATE BOOKING_RECORD SET ROOMNO = "
+        "(SELECT MAX(R.ROOMNO) FROM ROOM_RENT R WHERE R.CID = BOOKING_RECORD.CID)"
+    )
+
+
+# VERSION 5: PRICES AS DATA, SEEDED WITH THE TARIFF gauri.py USED TO HARD-CODE
+TARIFF_V5 = [
+    ("ROOM_RENT", 1, "Ultra Royal", 10000),
+    ("ROOM_RENT", 2, "Royal", 5000),
+    ("ROOM_RENT", 3, "Elite", 3500),
+    ("ROOM_RENT", 4, "Budget", 2500),
+    ("RESTAURANT", 1, "Vegetarian Combo", 300),
+    ("RESTAURANT", 2, "Non-Vegetarian Combo", 500),
+    ("RESTAURANT", 3, "Vegetarian & Non-Vegetarian Combo", 750),
+    ("GAMING", 1, "Table Tennis", 150),
+    ("GAMING", 2, "Bowling", 100),
+    ("GAMING", 3, "Snooker", 250),
+    ("GAMING", 4, "VR World Gaming", 400),
+    ("GAMING", 5, "Video Games", 300),
+    ("GAMING", 6, "Swimming Pool Games", 350),
+    ("FASHION", 1, "Shirts", 1500),
+    ("FASHION", 2, "T-Shirts", 300),
+    ("FASHION", 3, "Pants", 2000),
+    ("FASHION", 4, "Jeans", 4000),
+]
+
+
+def migrateTariff(cursor, dialect):
+    createTable(cursor, "TARIFF", [
+        "SERVICE VARCHAR(20) NOT NULL",
+        "CHOICE INT NOT NULL",
+        "ITEM VARCHAR(40)",
+        "PRICE INT NOT NULL",
+    ], ["PRIMARY KEY (SERVICE, CHOICE)"])
+    cursor.executemany("INSERT INTO TARIFF (SERVICE, CHOICE, ITEM, PRICE) VALUES (%s, %s, %s, %s)", TARIFF_V5)
+
+
+# VERSION 6: BILL DATE AND A MONOTONIC BILL NUMBER FOR PAGING THROUGH HISTORY
+def migrateBillNumbers(cursor, dialect):
+    if dialect == "mysql":
+        cursor.execute("ALTER TABLE TOTAL ADD COLUMN BILLED_AT DATE, "
+                       "ADD COLUMN BILL_NO INT NOT NULL AUTO_INCREMENT UNIQUE")
+    else:
+        # sqlite numbers rows itself through an INTEGER PRIMARY KEY, which can
+        # only be declared when the table is created
+        baseline = ", ".join(columnNames("TOTAL")[:len(TABLES["TOTAL"])])
+        createTable(cursor, "TOTAL_NEW", TABLES["TOTAL"] + ["BILLED_AT DATE", "BILL_NO INTEGER PRIMARY KEY"],
+                    [customerKey()])
+        cursor.execute(f"INSERT INTO TOTAL_NEW ({baseline}) SELECT {baseline} FROM TOTAL ORDER BY ROWID")
+        cursor.execute("DROP TABLE TOTAL")
+        cursor.execute("ALTER TABLE TOTAL_NEW RENAME TO TOTAL")
+    # bills already in TOTAL keep their order but have no date
+    cursor.execute("CREATE INDEX IDX_TOTAL_CID_BILL_NO ON TOTAL (CID, BILL_NO)")
+
+
+# VERSION 7: ONE APPEND-ONLY LEDGER OF CHARGES, WITH BALANCE SNAPSHOTS
+def migrateLedger(cursor, dialect):
+    if dialect == "mysql":
+        entryNo, integer = "ENTRY_NO BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY", "SIGNED"
+    else:
+        # AUTOINCREMENT: entry numbers are never reused, even after a delete
+        entryNo, integer = "ENTRY_NO INTEGER PRIMARY KEY AUTOINCREMENT", "INTEGER"
+    createTable(cursor, "LEDGER", [
+        entryNo,
+        "POSTED_AT VARCHAR(26)",
+        "CID VARCHAR(20) NOT NULL",
+        "SERVICE VARCHAR(20) NOT NULL",
+        "CHOICE INT",
+        "QUANTITY INT",
+        "ROOMNO INT",
+        "AMOUNT INT NOT NULL",
+    ], [customerKey()])
+    createTable(cursor, "SNAPSHOT", [
+        "CID VARCHAR(20) NOT NULL",
+        "ENTRY_NO BIGINT NOT NULL",
+        "TAKEN_AT VARCHAR(26)",
+        "ROOMRENT INT NOT NULL",
+        "RESTAURANTBILL INT NOT NULL",
+        "GAMINGBILL INT NOT NULL",
+        "FASHIONBILL INT NOT NULL",
+        "TOTALAMOUNT INT NOT NULL",
+    ], ["PRIMARY KEY (CID, ENTRY_NO)", customerKey()])
+    cursor.execute("CREATE INDEX IDX_LEDGER_CID ON LEDGER (CID, ENTRY_NO)")
+    cursor.execute("CREATE INDEX IDX_LEDGER_POSTED_AT ON LEDGER (POSTED_AT)")
+
+    # earlier charges move over without a posting time, service by service
+    for table, ledgerColumns in LEDGER_COLUMNS.items():
+        columns = columnNames(table)
+        selected = [f"CAST({column} AS {integer})" if ledgerColumn == "CHOICE" else column
+                    for column, ledgerColumn in zip(columns, ledgerColumns)]
+        cursor.execute(
+            f"INSERT INTO LEDGER (SERVICE, {', '.join(ledgerColumns)}) "
+            f"SELECT '{table}', {', '.join(selected)} FROM {table}"
+        )
+        cursor.execute(f"DROP TABLE {table}")
+        aliases = [f"{ledgerColumn} AS {column}" for column, ledgerColumn in zip(columns, ledgerColumns)]
+        cursor.execute(f"CREATE VIEW {table} AS SELECT {', '.join(aliases)} FROM LEDGER WHERE SERVICE = '{table}'")
+
+
+# VERSION 8: SHARD PLAN AND PROGRESS OF MONTH-END BILLING RUNS, AND THEIR BILLS
+def migrateBillingRuns(cursor, dialect):
+    createTable(cursor, "BILLING_RUN", [
+        "PERIOD VARCHAR(7) NOT NULL",
+        "SHARD INT NOT NULL",
+        "LO_CID VARCHAR(20) NOT NULL",
+        "HI_CID VARCHAR(20)",
+        "STATUS VARCHAR(10) NOT NULL",
+        "BILLS INT NOT NULL DEFAULT 0",
+        "AMOUNT BIGINT NOT NULL DEFAULT 0",
+        "FINISHED_AT VARCHAR(26)",
+    ], ["PRIMARY KEY (PERIOD, SHARD)"])
+    # month-end bills have their own table, so TOTAL only holds final bills
+    createTable(cursor, "MONTH_BILL", [
+        "PERIOD VARCHAR(7) NOT NULL",
+        "CID VARCHAR(20) NOT NULL",
+        "C_NAME VARCHAR(30)",
+        "ROOMRENT INT NOT NULL",
+        "RESTAURANTBILL INT NOT NULL",
+        "GAMINGBILL INT NOT NULL",
+        "FASHIONBILL INT NOT NULL",
+        "TOTALAMOUNT INT NOT NULL",
+        "BILLED_AT DATE",
+    ], [customerKey()])
+    cursor.execute("CREATE INDEX IDX_MONTH_BILL_PERIOD_CID ON MONTH_BILL (PERIOD, CID)")
+    cursor.execute("CREATE INDEX IDX_MONTH_BILL_CID ON MONTH_BILL (CID)")
+
+
+# VERSION 9: WHAT HAS BEEN BILLED, SO A BILL ONLY COVERS CHARGES SINCE THE LAST ONE
+BILLED_COLUMNS = {
+    "ROOM_RENT": "BILLED_ROOMRENT",
+    "RESTAURANT": "BILLED_RESTAURANTBILL",
+    "GAMING": "BILLED_GAMINGBILL",
+    "FASHION": "BILLED_FASHIONBILL",
+}
+
+
+def migrateBilledAmounts(cursor, dialect):
+    # the last ledger entry a bill covers, and per customer the entry and
+    # amounts covered by their latest bill
+    cursor.execute("ALTER TABLE TOTAL ADD COLUMN ENTRY_NO BIGINT")
+    cursor.execute("ALTER TABLE BALANCE ADD COLUMN BILLED_ENTRY_NO BIGINT NOT NULL DEFAULT 0")
+    for column in BILLED_COLUMNS.values():
+        cursor.execute(f"ALTER TABLE BALANCE ADD COLUMN {column} INT NOT NULL DEFAULT 0")
+
+    # bills so far were lifetime totals: the latest one covers the customer's
+    # ledger up to the entry where the running sum reaches its amount
+    cursor.execute(
+        "SELECT T.CID, T.BILL_NO, T.TOTALAMOUNT FROM TOTAL T "
+        "JOIN (SELECT CID, MAX(BILL_NO) AS LAST FROM TOTAL WHERE CID IS NOT NULL GROUP BY CID) M "
+        "ON M.CID = T.CID AND M.LAST = T.BILL_NO"
+    )
+    for cid, billNo, billed in cursor.fetchall():
+        cursor.execute("SELECT ENTRY_NO, AMOUNT FROM LEDGER WHERE CID = %s ORDER BY ENTRY_NO", (cid,))
+        covered, running = 0, 0
+        for entryNo, amount in cursor.fetchall():
+            running += int(amount)
+            if running > int(billed or 0):
+                break
+            covered = entryNo
+        cursor.execute("UPDATE TOTAL SET ENTRY_NO = %s WHERE BILL_NO = %s", (covered, billNo))
+        cursor.execute("UPDATE BALANCE SET BILLED_ENTRY_NO = %s WHERE CID = %s", (covered, cid))
+    for service, column in BILLED_COLUMNS.items():
+        cursor.execute(
+            f"UPDATE BALANCE SET {column} = COALESCE((SELECT SUM(L.AMOUNT) FROM LEDGER L "
+            f"WHERE L.CID = BALANCE.CID AND L.SERVICE = '{service}' AND L.ENTRY_NO <= BALANCE.BILLED_ENTRY_NO), 0)"
+        )
+
+
+MIGRATIONS = [
+    (1, "baseline HMS tables", migrateBaseline),
+    (2, "CID primary/foreign keys and indexes", migrateKeys),
+    (3, "per-customer running balance", migrateBalances),
+    (4, "room catalogue and booked room numbers", migrateRooms),
+    (5, "tariff table", migrateTariff),
+    (6, "bill dates and numbers", migrateBillNumbers),
+    (7, "append-only charge ledger and balance snapshots", migrateLedger),
+    (8, "month-end billing runs and bills", migrateBillingRuns),
+    (9, "amounts and ledger entries already billed", migrateBilledAmounts),
+]
+
+
+def schemaVersion(cursor):
+    cursor.execute("SELECT MAX(VERSION) FROM SCHEMA_VERSION")
+    row = cursor.fetchone()
+    return row[0] or 0
+
+
+# MODULE TO BRING A DATABASE UP TO THE LATEST SCHEMA VERSION
+def migrate(pool, verbose=True):
+    dialect = pool.backend.dialect
+    with pool.transaction() as cursor:
+        createTable(cursor, "SCHEMA_VERSION", [
+            "VERSION INT NOT NULL PRIMARY KEY",
+            "DESCRIPTION VARCHAR(100)",
+            "APPLIED_AT VARCHAR(30)",
+        ])
+        current = schemaVersion(cursor)
+
+    for version, description, step in MIGRATIONS:
+        if version <= current:
+            continue
+        # mysql commits DDL implicitly, so a failed step there may be partly applied
+        with pool.transaction() as cursor:
+            step(cursor, dialect)
+            cursor.execute(
+                "INSERT INTO SCHEMA_VERSION VALUES (%s, %s, %s)",
+                (version, description, datetime.now().isoformat(timespec="seconds")),
+            )
+        current = version
+        if verbose:
+            print(f"SCHEMA UPGRADED TO VERSION {version}: {description}")
+    return current
@@ -0,0 +1,228 @@
+# FUZZY CUSTOMER SEARCH BY NAME, PHONE AND EMAIL
+#
+# CustomerIndex keeps every customer's C_NAME, P_NO and C_EMAIL in memory with
+# an inverted index from character trigrams to the document numbers that
+# contain them. A query is split into trigrams the same way; only customers
+# sharing at least half of them (three quarters for digits) can match, and all
+# of those contain one of the rarest few, so candidates are collected from the
+# shortest posting lists and only counted against the rest. Candidates are
+# ranked by the share of the query's trigrams they contain, with a bonus for a
+# name/email/phone that starts with the query (or one of whose words does) and
+# more for an exact match, so typos, partial names and the last digits of a
+# phone number all find the guest. For a query so common that even its rarest
+# trigram is in more than MAX_CANDIDATES customers, only the most recently
+# added of them are ranked. A query of two characters has no trigram and is
+# matched by prefix against the most recently added customers instead.
+#
+# The index is loaded once from C_DETAILS and kept in step by whoever adds
+# customers (hms_ops.Hotel.addCustomer); customers imported by another process
+# appear after refresh().
+#
+#   python hms_search.py --sqlite HMS.db "gauri sharma"
+#   python hms_search.py --sqlite HMS.db 98765 --limit 5
+
+import argparse
+import math
+import threading
+import time
+import unicodedata
+from array import array
+from bisect import bisect_left
+from collections import Counter
+
+from hms_db import ConnectionPool, addBackendArguments, backendFromArguments
+from hms_schema import migrate
+
+MIN_OVERLAP = 0.5
+DIGIT_OVERLAP = 0.75
+MAX_CANDIDATES = 5000
+LOAD_PAGE = 10000
+EMPTY = array("I")
+
+
+def normalize(text):
+    """Lower case, accents dropped, runs of anything but letters, digits, @ . _ - as one space."""
+    text = unicodedata.normalize("NFKD", str(text or "")).encode("ascii", "ignore").decode().lower()
+    kept = "".join(char if char.isalnum() or char in "@._-" else " " for char in text)
+    return " ".join(kept.split())
+
+
+def digits(text):
+    return "".join(char for char in str(text or "") if char.isdigit())
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class CustomerIndex:
+    def __init__(self):
+        self.cids = []           # document number -> CID
+        self.fields = []         # document number -> (name, phone, email) as given
+        self.keys = []           # document number -> normalized (name, phone digits, email)
+        self.documents = {}      # CID -> current document number
+        self.postings = {}       # trigram -> array of document numbers, ascending
+        self.deleted = set()     # document numbers superseded by an update or removed
+        self._lock = threading.RLock()
+
+    @classmethod
+    def load(cls, pool):
+        index = cls()
+        index.refresh(pool)
+        return index
+
+    def refresh(self, pool):
+        """Index every customer in C_DETAILS that is not indexed yet; return how many."""
+        added, after = 0, ""
+        while True:
+            with pool.transaction() as cursor:
+                cursor.execute(
+                    "SELECT CID, C_NAME, P_NO, C_EMAIL FROM C_DETAILS WHERE CID > %s ORDER BY CID LIMIT %s",
+                    (after, LOAD_PAGE),
+                )
+                rows = cursor.fetchall()
+            if not rows:
+                return added
+            with self._lock:
+                for cid, name, phone, email in rows:
+                    if cid not in self.documents:
+                        self.add(cid, name, phone, email)
+                        added += 1
+            after = rows[-1][0]
+
+    def __len__(self):
+        return len(self.documents)
+
+    # MODULE TO KEEP THE INDEX IN STEP WITH C_DETAILS
+    def add(self, cid, name, phone, email):
+        """Index a new customer, or re-index one whose details changed."""
+        keys = (normalize(name), digits(phone), normalize(email))
+        grams = set()
+        for key in keys:
+            if key:
+                grams |= trigrams(f" {key} ")
+        with self._lock:
+            old = self.documents.get(cid)
+            if old is not None:
+                self.deleted.add(old)
+            document = len(self.cids)
+            self.cids.append(cid)
+            self.fields.append((name, phone, email))
+            self.keys.append(keys)
+            self.documents[cid] = document
+            for gram in grams:
+                posting = self.postings.get(gram)
+                if posting is None:
+                    posting = self.postings[gram] = array("I")
+                posting.append(document)
+
+    def remove(self, cid):
+        with self._lock:
+            document = self.documents.pop(cid, None)
+            if document is not None:
+                self.deleted.add(document)
+
+    # MODULE TO FIND THE BEST MATCHING CUSTOMERS FOR A FREE-TEXT QUERY
+    def search(self, text, limit=10):
+        """Return up to limit (score, cid, name, phone, email), best first."""
+        query = normalize(text)
+        number = digits(text)
+        if number and len(number) >= len(query.replace(" ", "")) - 1:
+            # mostly digits: a phone number, or part of one
+            query = number
+        if len(query) < 2:
+            return []
+        # a leading space rewards matches at the start of a word, as with prefixes
+        grams = trigrams(query if query.isdigit() else f" {query}")
+        if not grams:
+            # too short for a trigram ("98"): match prefixes among the latest customers
+            return self.prefixSearch(query, limit)
+        # digits are a small alphabet, so a phone query must share more of them
+        need = max(1, math.ceil(len(grams) * (DIGIT_OVERLAP if query.isdigit() else MIN_OVERLAP)))
+        with self._lock:
+            postings = sorted((self.postings.get(gram, EMPTY) for gram in grams), key=len)
+            # a document with `need` of the query's trigrams has one of the rarest
+            # len(grams) - need + 1 of them
+            rare = len(grams) - need + 1
+            floor = 0
+            if len(postings[0]) > MAX_CANDIDATES:
+                # a very common query: rank only the most recently added customers
+                # that could match, so the work stays bounded
+                floor = postings[0][-MAX_CANDIDATES]
+            counts = Counter()
+            for posting in postings[:rare]:
+                counts.update(posting[bisect_left(posting, floor):])
+            for posting in postings[rare:]:
+                start = bisect_left(posting, floor)
+                if len(posting) - start > 4 * len(counts):
+                    size = len(posting)
+                    found = []
+                    for document in counts:
+                        position = bisect_left(posting, document, start)
+                        if position < size and posting[position] == document:
+                            found.append(document)
+                    counts.update(found)
+                else:
+                    counts.update(counts.keys() & set(posting[start:]))
+            shortlist = counts.most_common(limit * 4 + min(len(self.deleted), 1000))
+            results = []
+            for document, hits in shortlist:
+                if hits < need or document in self.deleted:
+                    continue
+                score = hits / len(grams) + self.bonus(query, self.keys[document])
+                results.append((round(score, 3), self.cids[document], *self.fields[document]))
+        results.sort(key=lambda result: (-result[0], result[1]))
+        return results[:limit]
+
+    def prefixSearch(self, query, limit):
+        """Customers one of whose keys starts with (or contains) query, newest MAX_CANDIDATES only."""
+        results = []
+        with self._lock:
+            for document in range(len(self.cids) - 1, max(len(self.cids) - MAX_CANDIDATES, 0) - 1, -1):
+                if document in self.deleted:
+                    continue
+                score = self.bonus(query, self.keys[document])
+                if score:
+                    results.append((score, self.cids[document], *self.fields[document]))
+        results.sort(key=lambda result: (-result[0], result[1]))
+        return results[:limit]
+
+    @staticmethod
+    def bonus(query, keys):
+        best = 0.0
+        for key in keys:
+            if not key:
+                continue
+            if key == query:
+                return 1.0
+            if key.startswith(query) or any(word.startswith(query) for word in key.split()):
+                best = 0.5
+            elif query in key:
+                best = max(best, 0.25)
+        return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find HMS customers by name, phone or email.")
+    addBackendArguments(parser)
+    parser.add_argument("query", nargs="+")
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    pool = ConnectionPool(backendFromArguments(args), size=1)
+    migrate(pool)
+    started = time.perf_counter()
+    index = CustomerIndex.load(pool)
+    loaded = time.perf_counter() - started
+    pool.close()
+    started = time.perf_counter()
+    results = index.search(" ".join(args.query), args.limit)
+    elapsed = time.perf_counter() - started
+    for score, cid, name, phone, email in results:
+        print(f"{score:>6.2f}  {cid:<20}{name or '':<30}{phone or '':<15}{email or ''}")
+    print(f"\n{len(results)} MATCHES AMONG {len(index)} CUSTOMERS IN {elapsed * 1000:.1f} ms "
+          f"(INDEX LOADED IN {loaded:.1f} s)")
+
+
+if __name__ == "__main__":
+    main()
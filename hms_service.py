@@ -0,0 +1,304 @@
+# JSON-OVER-HTTP SERVICE FOR THE HOTEL MANAGEMENT SYSTEM
+#
+#   python hms_service.py --sqlite HMS.db --port 8080 --workers 32 --pool-size 8
+#
+# Requests are handled by a fixed pool of worker threads that share one
+# ConnectionPool, so many front-desk terminals and the booking website can
+# check in, charge and bill at the same time. Every endpoint's latency is
+# recorded; GET /stats returns p50/p99 per endpoint and the same table is
+# printed when the service stops.
+#
+#   GET  /customers?q=<name, phone or email fragment>&limit=10
+#                                         ranked fuzzy matches
+#   GET  /customers/<cid>                 customer record
+#   POST /customers                       {"cid", "name", "address", "age", "country", "phone", "email"}
+#   POST /bookings                        {"cid", "check_in", "check_out", "roomno"}
+#   GET  /rooms/free?category=1&from=YYYY-MM-DD&to=YYYY-MM-DD
+#   POST /charges                         {"service", "cid", "choice", "quantity", "roomno" (room rent only)}
+#   GET  /bills/<cid>                     current balance as a bill
+#   POST /bills/<cid>                     generate the bill (adds a TOTAL row)
+#   GET  /bills/<cid>/history?from=&to=&after=&limit=
+#                                         one page of earlier bills; "next" is the
+#                                         "after" value for the following page
+#   POST /bills/checked-out               {"as_of"} bill every checked-out guest
+#   GET  /stats                           latency per endpoint, cache and pool figures and
+#                                         the statements taking the most database time
+
+import argparse
+import json
+import re
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from hms_batch import ChargeBatcher
+from hms_db import DB_ERRORS, ConnectionPool, PoolTimeout, addBackendArguments, backendFromArguments
+from hms_ops import CUSTOMER_FIELDS, HISTORY_PAGE, MAX_HISTORY_PAGE, Hotel, HotelError
+from hms_querylog import QueryLog
+from hms_schema import migrate
+from hms_stats import LatencyStats
+
+MAX_BODY = 64 * 1024
+IDLE_TIMEOUT = 15
+CUSTOMER_SEARCH_FIELDS = ("cid", "name", "phone", "email")
+HISTORY_FIELDS = ("bill_no", "billed_at", "name", "roomrent", "restaurant", "gaming", "fashion", "total")
+
+
+def jsonable(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, (list, tuple)):
+        return [jsonable(item) for item in value]
+    return value
+
+
+def queryValue(query, name, default=None):
+    return query.get(name, [default])[0]
+
+
+def billJson(bill):
+    return {
+        "cid": bill.cid, "name": bill.name, "roomrent": bill.roomrent, "restaurant": bill.restaurant,
+        "gaming": bill.gaming, "fashion": bill.fashion, "total": bill.total,
+    }
+
+
+# REQUEST HANDLERS: (hotel, match, query, body) -> (status, json document)
+def getCustomer(hotel, match, query, body):
+    return 200, dict(zip(CUSTOMER_FIELDS, hotel.customer(match["cid"])))
+
+
+def findCustomers(hotel, match, query, body):
+    text = queryValue(query, "q", "")
+    try:
+        limit = min(max(int(queryValue(query, "limit", 10)), 1), 100)
+    except ValueError:
+        raise HotelError("limit must be a number")
+    matches = [dict(zip(("score",) + CUSTOMER_SEARCH_FIELDS, result)) for result in hotel.findCustomers(text, limit)]
+    return 200, {"query": text, "matches": matches}
+
+
+def postCustomer(hotel, match, query, body):
+    fields = {field: body.get(field, "") for field in CUSTOMER_FIELDS}
+    return 201, dict(zip(CUSTOMER_FIELDS, hotel.addCustomer(**fields)))
+
+
+def postBooking(hotel, match, query, body):
+    cid, checkin, checkout, roomno = hotel.book(body.get("cid"), body.get("check_in"), body.get("check_out"), body.get("roomno"))
+    return 201, {"cid": cid, "check_in": checkin.isoformat(), "check_out": checkout.isoformat(), "roomno": roomno}
+
+
+def getFreeRooms(hotel, match, query, body):
+    try:
+        category = int(query.get("category", ["0"])[0])
+    except ValueError:
+        raise HotelError("category must be a number")
+    checkin = queryValue(query, "from", date.today().isoformat())
+    checkout = queryValue(query, "to")
+    if not checkout:
+        raise HotelError("'to' date is required")
+    return 200, {"category": category, "rooms": hotel.freeRooms(category, checkin, checkout)}
+
+
+def postCharge(hotel, match, query, body):
+    item, amount = hotel.charge(body.get("service"), body.get("cid"), body.get("choice"), body.get("quantity"), body.get("roomno"))
+    return 201, {"item": item, "amount": amount}
+
+
+def getBill(hotel, match, query, body):
+    return 200, billJson(hotel.bill(match["cid"]))
+
+
+def postBill(hotel, match, query, body):
+    return 201, billJson(hotel.bill(match["cid"], save=True))
+
+
+def getHistory(hotel, match, query, body):
+    limit = queryValue(query, "limit", HISTORY_PAGE)
+    rows = hotel.history(match["cid"], queryValue(query, "from"), queryValue(query, "to"),
+                         queryValue(query, "after", 0), limit)
+    bills = [dict(zip(HISTORY_FIELDS, jsonable(row))) for row in rows]
+    more = len(rows) == min(int(limit), MAX_HISTORY_PAGE)
+    return 200, {"cid": match["cid"], "bills": bills, "next": bills[-1]["bill_no"] if bills and more else None}
+
+
+def postCheckedOut(hotel, match, query, body):
+    bills = hotel.billCheckedOut(body.get("as_of"))
+    return 201, {"count": len(bills), "bills": [billJson(bill) for bill in bills]}
+
+
+ROUTES = [
+    ("GET", r"/customers", "GET /customers?q=", findCustomers),
+    ("GET", r"/customers/(?P<cid>[^/]+)", "GET /customers/{cid}", getCustomer),
+    ("POST", r"/customers", "POST /customers", postCustomer),
+    ("POST", r"/bookings", "POST /bookings", postBooking),
+    ("GET", r"/rooms/free", "GET /rooms/free", getFreeRooms),
+    ("POST", r"/charges", "POST /charges", postCharge),
+    ("POST", r"/bills/checked-out", "POST /bills/checked-out", postCheckedOut),
+    ("GET", r"/bills/(?P<cid>[^/]+)/history", "GET /bills/{cid}/history", getHistory),
+    ("GET", r"/bills/(?P<cid>[^/]+)", "GET /bills/{cid}", getBill),
+    ("POST", r"/bills/(?P<cid>[^/]+)", "POST /bills/{cid}", postBill),
+]
+ROUTES = [(method, re.compile(pattern + "$"), name, handler) for method, pattern, name, handler in ROUTES]
+
+
+class HotelRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "HMS/1.0"
+    # idle keep-alive connections give their worker back after this many seconds
+    timeout = IDLE_TIMEOUT
+
+    def do_GET(self):
+        self.dispatch("GET")
+
+    def do_POST(self):
+        self.dispatch("POST")
+
+    def dispatch(self, method):
+        started = time.perf_counter()
+        url = urlsplit(self.path)
+        name = f"{method} (unknown)"
+        status = 500
+        try:
+            body = self.readBody()
+            if method == "GET" and url.path == "/stats":
+                name = "GET /stats"
+                status, document = 200, self.server.statsDocument()
+            else:
+                status, document = 404, {"error": f"no endpoint {method} {url.path}"}
+                for routeMethod, pattern, routeName, handler in ROUTES:
+                    match = pattern.match(url.path)
+                    if match and routeMethod == method:
+                        name = routeName
+                        status, document = handler(self.server.hotel, match.groupdict(), parse_qs(url.query), body)
+                        break
+        except HotelError as err:
+            status, document = err.status, {"error": str(err)}
+        except PoolTimeout as err:
+            status, document = 503, {"error": str(err)}
+        except DB_ERRORS as err:
+            status, document = 500, {"error": f"database error: {err}"}
+        except Exception as err:
+            # a bug must still answer the client and show up in the latency figures
+            traceback.print_exc()
+            status, document = 500, {"error": f"internal error: {type(err).__name__}"}
+        try:
+            self.reply(status, document)
+        finally:
+            self.server.latency.record(name, time.perf_counter() - started, ok=status < 500)
+
+    def readBody(self):
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0 or length > MAX_BODY:
+            # the body is left unread, so it must not be taken for the next request
+            self.close_connection = True
+            raise HotelError("request body too large" if length > 0 else "Content-Length must be a whole number")
+        if not length:
+            return {}
+        try:
+            body = json.loads(self.rfile.read(length))
+        except ValueError:
+            raise HotelError("request body must be JSON")
+        if not isinstance(body, dict):
+            raise HotelError("request body must be a JSON object")
+        return body
+
+    def reply(self, status, document):
+        payload = json.dumps(document).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+# HTTP SERVER THAT HANDS CONNECTIONS TO A FIXED POOL OF WORKER THREADS
+class PooledHTTPServer(HTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, address, hotel, workers=32, verbose=False):
+        super().__init__(address, HotelRequestHandler)
+        self.hotel = hotel
+        self.verbose = verbose
+        self.latency = LatencyStats()
+        self.workers = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="hms-worker")
+
+    def process_request(self, request, client_address):
+        self.workers.submit(self.processInWorker, request, client_address)
+
+    def processInWorker(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def statsDocument(self):
+        return {
+            "endpoints": self.latency.summary(),
+            "customer_cache": self.hotel.customers.stats(),
+            "group_commit": self.hotel.batcher.stats() if self.hotel.batcher else None,
+            "pool_size": self.hotel.pool.size,
+            "queries": self.hotel.pool.queryLog.summary(top=20) if self.hotel.pool.queryLog else None,
+        }
+
+    def server_close(self):
+        super().server_close()
+        self.workers.shutdown(wait=False, cancel_futures=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the hotel management system as JSON over HTTP.")
+    addBackendArguments(parser)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=32, help="request worker threads (default 32)")
+    parser.add_argument("--pool-size", type=int, default=8, help="pooled database connections (default 8)")
+    parser.add_argument("--group-commit-ms", type=float, default=0.0,
+                        help="hold each group of charges open this many ms longer (default 0)")
+    parser.add_argument("--group-commit-rows", type=int, default=500, help="largest group of charges per commit")
+    parser.add_argument("--no-group-commit", action="store_true", help="commit every charge on its own")
+    parser.add_argument("--slow-query-ms", type=float, default=100.0,
+                        help="log statements at least this slow (default 100)")
+    parser.add_argument("--slow-query-log", default="hms-slow-queries.log", help="where slow statements are logged")
+    parser.add_argument("--no-query-log", action="store_true", help="do not time database statements")
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    args = parser.parse_args(argv)
+
+    queryLog = None if args.no_query_log else QueryLog(args.slow_query_ms, args.slow_query_log)
+    pool = ConnectionPool(backendFromArguments(args), size=args.pool_size, queryLog=queryLog)
+    migrate(pool)
+    batcher = None
+    if not args.no_group_commit:
+        batcher = ChargeBatcher(pool, args.group_commit_ms / 1000, args.group_commit_rows)
+    server = PooledHTTPServer((args.host, args.port), Hotel(pool, batcher=batcher),
+                              workers=args.workers, verbose=args.verbose)
+    print(f"HMS SERVICE LISTENING ON http://{args.host}:{args.port} ({args.workers} workers, {args.pool_size} connections)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if batcher:
+            batcher.close()
+        pool.close()
+        print(server.latency.report())
+        if queryLog:
+            print(queryLog.report())
+
+
+if __name__ == "__main__":
+    main()
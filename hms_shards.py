@@ -0,0 +1,229 @@
+# ONE DATABASE PER HOTEL PROPERTY, WITH GROUP-WIDE FAN-OUT REPORTS
+#
+# Each property of the group keeps its guests, bookings and charges in its own
+# database (a MySQL schema or a SQLite file), so a busy property never queues
+# behind another one's traffic. A shard map names the properties, says where
+# each one's data lives and which CID prefixes belong to it:
+#
+#   {
+#     "default": "MIAMI",
+#     "properties": {
+#       "MIAMI":  {"sqlite": "miami.db"},
+#       "GOA":    {"mysql": {"user": "hms", "password": "secret", "host": "db-goa", "database": "HMS_GOA"}}
+#     },
+#     "prefixes": {"MI": "MIAMI", "GO": "GOA"}
+#   }
+#
+#   router = ShardRouter.load("hms_shards.json")
+#   hotel = router.hotel(router.propertyFor(cid))       # that guest's property
+#   router.fanOut(lambda name, pool: ...)               # every property in parallel
+#
+#   python hms_shards.py --shards hms_shards.json                 # group-wide summary
+#   python hms_shards.py --shards hms_shards.json --locate MI0042
+#
+# A CID belongs to the property of its longest matching prefix, or to the
+# default property. Pools are opened (and their schema migrated) on first use.
+
+import argparse
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+from hms_db import DB_ERRORS, ConnectionPool, MySQLBackend, PoolTimeout, SQLiteBackend
+from hms_ops import Hotel, NotFound
+from hms_schema import MigrationError, migrate
+
+SHARDS_FILE = "hms_shards.json"
+POOL_SIZE = 5
+
+
+def backendFromSpec(spec):
+    """SQLiteBackend or MySQLBackend from one property's entry in the shard map."""
+    if "sqlite" in spec:
+        return SQLiteBackend(spec["sqlite"])
+    if "mysql" in spec:
+        mysqlSpec = spec["mysql"]
+        return MySQLBackend(mysqlSpec["user"], mysqlSpec.get("password", ""),
+                            mysqlSpec.get("host", "localhost"), mysqlSpec.get("database", "HMS"))
+    raise ValueError(f"property needs a 'sqlite' or 'mysql' entry, got {sorted(spec)}")
+
+
+class ShardRouter:
+    def __init__(self, properties, prefixes=None, default=None, poolSize=POOL_SIZE):
+        """properties: {name: backend or shard-map entry}; prefixes: {CID prefix: name}.
+
+        Shard-map entries become backends on first use, so a property whose
+        driver is missing only fails when it is used."""
+        self.backends = dict(properties)
+        self.prefixes = dict(prefixes or {})
+        self.default = default
+        self.poolSize = poolSize
+        for prefix, name in self.prefixes.items():
+            if name not in self.backends:
+                raise ValueError(f"prefix {prefix!r} routes to unknown property {name!r}")
+        if default is not None and default not in self.backends:
+            raise ValueError(f"default property {default!r} is not in the shard map")
+        # longest prefixes first, so MIA beats MI
+        self._ordered = sorted(self.prefixes, key=len, reverse=True)
+        self._pools = {}
+        self._hotels = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path=SHARDS_FILE, poolSize=POOL_SIZE):
+        with open(path) as file:
+            config = json.load(file)
+        properties = {name.upper(): spec for name, spec in config["properties"].items()}
+        prefixes = {prefix: name.upper() for prefix, name in config.get("prefixes", {}).items()}
+        default = config.get("default")
+        return cls(properties, prefixes, default.upper() if default else None, poolSize)
+
+    @property
+    def properties(self):
+        return list(self.backends)
+
+    # MODULE TO FIND THE PROPERTY, POOL AND HOTEL OF A GUEST
+    def propertyFor(self, cid):
+        for prefix in self._ordered:
+            if str(cid).startswith(prefix):
+                return self.prefixes[prefix]
+        if self.default is None:
+            raise NotFound(f"customer ID {cid} matches no property's prefix")
+        return self.default
+
+    def backend(self, name):
+        with self._lock:
+            if name not in self.backends:
+                raise NotFound(f"no property called {name}")
+            if isinstance(self.backends[name], dict):
+                self.backends[name] = backendFromSpec(self.backends[name])
+            return self.backends[name]
+
+    def describe(self, name):
+        spec = self.backends[name]
+        if not isinstance(spec, dict):
+            return repr(spec)
+        if "sqlite" in spec:
+            return f"SQLite {spec['sqlite']}"
+        mysqlSpec = spec.get("mysql", {})
+        return f"MySQL {mysqlSpec.get('user')}@{mysqlSpec.get('host', 'localhost')}/{mysqlSpec.get('database', 'HMS')}"
+
+    def pool(self, name):
+        """The property's ConnectionPool, opened and migrated on first use."""
+        backend = self.backend(name)
+        with self._lock:
+            pool = self._pools.get(name)
+        if pool is not None:
+            return pool
+        # opened outside the lock, so a slow property does not hold up the others
+        backend.createDatabase()
+        pool = ConnectionPool(backend, self.poolSize)
+        migrate(pool, verbose=False)
+        with self._lock:
+            opened = self._pools.setdefault(name, pool)
+        if opened is not pool:
+            pool.close()
+        return opened
+
+    def poolFor(self, cid):
+        return self.pool(self.propertyFor(cid))
+
+    def hotel(self, name):
+        with self._lock:
+            hotel = self._hotels.get(name)
+        if hotel is None:
+            hotel = Hotel(self.pool(name), shard=(self, name))
+            with self._lock:
+                hotel = self._hotels.setdefault(name, hotel)
+        return hotel
+
+    def hotelFor(self, cid):
+        return self.hotel(self.propertyFor(cid))
+
+    # MODULE TO RUN ONE FUNCTION ON EVERY PROPERTY AT ONCE
+    def fanOut(self, function, properties=None):
+        """{property: (result, None) or (None, error)} of function(name, pool) on every property."""
+        names = list(properties or self.backends)
+
+        def run(name):
+            try:
+                return function(name, self.pool(name)), None
+            except (RuntimeError, ValueError, KeyError, OSError, NotFound, PoolTimeout, MigrationError) + DB_ERRORS as err:
+                return None, err
+
+        with ThreadPoolExecutor(max_workers=max(1, len(names))) as executor:
+            return dict(zip(names, executor.map(run, names)))
+
+    def close(self):
+        with self._lock:
+            for pool in self._pools.values():
+                pool.close()
+            self._pools.clear()
+            self._hotels.clear()
+
+
+# MODULE FOR THE GROUP-WIDE SUMMARY, ONE ROW PER PROPERTY
+def propertySummary(name, pool, today=None):
+    """{customers, in_house, open_balance, billed, bills} for one property.
+
+    open_balance is what guests owe: their charges less what their bills covered."""
+    today = (today or date.today()).isoformat()
+    with pool.transaction() as cursor:
+        cursor.execute("SELECT COUNT(*) FROM C_DETAILS")
+        customers = cursor.fetchone()[0]
+        cursor.execute("SELECT COUNT(*) FROM BOOKING_RECORD WHERE CHECK_IN <= %s AND CHECK_OUT > %s", (today, today))
+        inHouse = cursor.fetchone()[0]
+        cursor.execute(
+            "SELECT COALESCE(SUM(TOTALAMOUNT - BILLED_ROOMRENT - BILLED_RESTAURANTBILL - BILLED_GAMINGBILL "
+            "- BILLED_FASHIONBILL), 0) FROM BALANCE"
+        )
+        openBalance = cursor.fetchone()[0]
+        cursor.execute("SELECT COUNT(*), COALESCE(SUM(TOTALAMOUNT), 0) FROM TOTAL")
+        bills, billed = cursor.fetchone()
+    return {"customers": int(customers), "in_house": int(inHouse), "open_balance": int(openBalance),
+            "bills": int(bills), "billed": int(billed)}
+
+
+def groupSummary(router, today=None):
+    return router.fanOut(lambda name, pool: propertySummary(name, pool, today))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Route HMS guests to their property's database and report group-wide.")
+    parser.add_argument("--shards", default=SHARDS_FILE, help=f"shard map (default {SHARDS_FILE})")
+    parser.add_argument("--locate", metavar="CID", help="show which property and database hold a customer")
+    args = parser.parse_args(argv)
+    if not os.path.exists(args.shards):
+        parser.error(f"shard map {args.shards} not found")
+
+    router = ShardRouter.load(args.shards, poolSize=1)
+    try:
+        if args.locate:
+            name = router.propertyFor(args.locate)
+            print(f"{args.locate} -> {name} ({router.describe(name)})")
+            try:
+                print(router.hotel(name).customer(args.locate))
+            except NotFound as err:
+                print(f"Sorry, {err}")
+            return
+        results = groupSummary(router)
+        print(f"{'PROPERTY':<16}{'CUSTOMERS':>11}{'IN HOUSE':>10}{'OPEN Rs.':>14}{'BILLS':>8}{'BILLED Rs.':>14}")
+        totals = dict.fromkeys(("customers", "in_house", "open_balance", "bills", "billed"), 0)
+        for name, (row, err) in results.items():
+            if err is not None:
+                print(f"{name:<16}UNAVAILABLE: {err}")
+                continue
+            for key in totals:
+                totals[key] += row[key]
+            print(f"{name:<16}{row['customers']:>11}{row['in_house']:>10}{row['open_balance']:>14}"
+                  f"{row['bills']:>8}{row['billed']:>14}")
+        print(f"{'GROUP':<16}{totals['customers']:>11}{totals['in_house']:>10}{totals['open_balance']:>14}"
+              f"{totals['bills']:>8}{totals['billed']:>14}")
+    finally:
+        router.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# LATENCY BOOKKEEPING SHARED BY THE HMS SERVICE AND TOOLS
+
+import math
+import threading
+from collections import deque
+
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of an already sorted list (fraction in 0..1)."""
+    if not ordered:
+        return 0.0
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+class LatencyStats:
+    """Per-name call counts, error counts and the most recent `window` latencies."""
+
+    def __init__(self, window=10000):
+        self.window = window
+        self._samples = {}
+        self._counts = {}
+        self._errors = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds, ok=True):
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen=self.window)
+                self._counts[name] = 0
+                self._errors[name] = 0
+            samples.append(seconds)
+            self._counts[name] += 1
+            if not ok:
+                self._errors[name] += 1
+
+    def summary(self):
+        """{name: {count, errors, p50_ms, p99_ms, max_ms}} over the recent window."""
+        with self._lock:
+            snapshot = {name: sorted(samples) for name, samples in self._samples.items()}
+            counts = dict(self._counts)
+            errors = dict(self._errors)
+        return {
+            name: {
+                "count": counts[name],
+                "errors": errors[name],
+                "p50_ms": round(percentile(ordered, 0.50) * 1000, 3),
+                "p99_ms": round(percentile(ordered, 0.99) * 1000, 3),
+                "max_ms": round(ordered[-1] * 1000, 3) if ordered else 0.0,
+            }
+            for name, ordered in sorted(snapshot.items())
+        }
+
+    def report(self):
+        lines = [f"{'ENDPOINT':<28}{'COUNT':>9}{'ERRORS':>8}{'P50 ms':>10}{'P99 ms':>10}{'MAX ms':>10}"]
+        for name, row in self.summary().items():
+            lines.append(f"{name:<28}{row['count']:>9}{row['errors']:>8}{row['p50_ms']:>10.2f}{row['p99_ms']:>10.2f}{row['max_ms']:>10.2f}")
+        return "\n".join(lines)
@@ -0,0 +1,220 @@
+# TARIFF CATALOGUE AND VECTORIZED PRICING FOR THE HOTEL MANAGEMENT SYSTEM
+#
+# Prices live in the TARIFF table (SERVICE, CHOICE, ITEM, PRICE), seeded with
+# the prices below when the table is created, so repricing is a row update
+# instead of a code change. TariffCatalog loads the table once into arrays
+# indexed by [service code, menu choice]. priceCharges() prices any number of
+# charges in one pass, and settle() turns a batch of charges into per-guest
+# totals in one pass (numpy when it is installed, plain lists otherwise).
+#
+#   python hms_tariff.py --sqlite HMS.db                            # show the tariff
+#   python hms_tariff.py --sqlite HMS.db --set RESTAURANT 2 550     # reprice an item
+#   python hms_tariff.py --sqlite HMS.db --set GAMING 7 200 --item "Archery"
+#   python hms_tariff.py --sqlite HMS.db --settle                   # unbilled charges at today's prices
+#   python hms_tariff.py --sqlite HMS.db --settle --day 2026-03-14  # only those posted that day
+#
+# --settle is a dry run: it prints what the unbilled charges would come to at
+# the current tariff and how many differ from the amount charged, and writes
+# nothing. Posted charges keep the price they were charged at; the ledger is
+# append-only and its snapshots and bills are built on those amounts.
+#
+# A running gauri.py or hms_service.py reads the catalogue at start-up, so it
+# picks up new prices when it is restarted.
+
+import argparse
+import time
+from datetime import date, timedelta
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from hms_db import ConnectionPool, addBackendArguments, backendFromArguments
+from hms_rooms import ROOM_CATEGORIES
+from hms_schema import migrate
+
+# Default tariff, as the migration that creates TARIFF seeds it (hms_schema
+# keeps its own copy, so editing this does not change old upgrades):
+# service -> {menu choice: (item, price in Rs. per day/unit/hour)}
+MENUS = {
+    "ROOM_RENT": {
+        1: (ROOM_CATEGORIES[1], 10000),
+        2: (ROOM_CATEGORIES[2], 5000),
+        3: (ROOM_CATEGORIES[3], 3500),
+        4: (ROOM_CATEGORIES[4], 2500),
+    },
+    "RESTAURANT": {
+        1: ("Vegetarian Combo", 300),
+        2: ("Non-Vegetarian Combo", 500),
+        3: ("Vegetarian & Non-Vegetarian Combo", 750),
+    },
+    "GAMING": {
+        1: ("Table Tennis", 150),
+        2: ("Bowling", 100),
+        3: ("Snooker", 250),
+        4: ("VR World Gaming", 400),
+        5: ("Video Games", 300),
+        6: ("Swimming Pool Games", 350),
+    },
+    "FASHION": {
+        1: ("Shirts", 1500),
+        2: ("T-Shirts", 300),
+        3: ("Pants", 2000),
+        4: ("Jeans", 4000),
+    },
+}
+
+# Service codes used by the arrays: the position of the service in this list
+SERVICES = list(MENUS)
+
+
+class TariffCatalog:
+    def __init__(self, rows):
+        """rows: (service, choice, item, price) tuples."""
+        self.menus = {service: {} for service in SERVICES}
+        for service, choice, item, price in rows:
+            if service in self.menus:
+                self.menus[service][int(choice)] = (item, int(price))
+        width = 1 + max((choice for menu in self.menus.values() for choice in menu), default=0)
+        # price 0 marks a choice that is not on the menu
+        table = [[0] * width for _ in SERVICES]
+        for code, service in enumerate(SERVICES):
+            for choice, (item, price) in self.menus[service].items():
+                table[code][choice] = price
+        self.width = width
+        self.prices = numpy.array(table, dtype=numpy.int64) if numpy else table
+
+    @classmethod
+    def load(cls, pool):
+        with pool.transaction() as cursor:
+            cursor.execute("SELECT SERVICE, CHOICE, ITEM, PRICE FROM TARIFF")
+            return cls(cursor.fetchall())
+
+    def menu(self, service):
+        """{choice: (item, price)} for one service, in menu order."""
+        return dict(sorted(self.menus[service].items()))
+
+    def item(self, service, choice):
+        """(item, price) or None if choice is not on the service's menu."""
+        return self.menus.get(service, {}).get(choice)
+
+    # MODULE TO PRICE MANY CHARGES AT ONCE
+    def priceCharges(self, services, choices, quantities):
+        """Amounts for parallel sequences of service codes, choices and quantities.
+
+        A choice that is not on its service's menu is priced 0."""
+        if numpy:
+            services = numpy.asarray(services, dtype=numpy.int64)
+            choices = numpy.asarray(choices, dtype=numpy.int64)
+            quantities = numpy.asarray(quantities, dtype=numpy.int64)
+            known = (choices >= 0) & (choices < self.width)
+            prices = numpy.where(known, self.prices[services, numpy.where(known, choices, 0)], 0)
+            return prices * quantities
+        width, table = self.width, self.prices
+        return [table[service][choice] * quantity if 0 <= choice < width else 0
+                for service, choice, quantity in zip(services, choices, quantities)]
+
+    def settle(self, cids, services, choices, quantities):
+        """Price a batch of charges and total them per guest.
+
+        Returns (guests, totals, amounts): guests in sorted CID order, totals as one
+        [roomrent, restaurant, gaming, fashion] row per guest, amounts per charge."""
+        amounts = self.priceCharges(services, choices, quantities)
+        if numpy:
+            guests, guest = numpy.unique(numpy.asarray(cids, dtype=object), return_inverse=True)
+            cells = guest * len(SERVICES) + numpy.asarray(services, dtype=numpy.int64)
+            # add.at keeps the sums in int64; bincount with weights would add them as floats
+            totals = numpy.zeros(len(guests) * len(SERVICES), dtype=numpy.int64)
+            numpy.add.at(totals, cells, amounts)
+            return list(guests), totals.reshape(len(guests), len(SERVICES)), amounts
+        sums = {}
+        for cid, service, amount in zip(cids, services, amounts):
+            sums.setdefault(cid, [0] * len(SERVICES))[service] += amount
+        guests = sorted(sums)
+        return guests, [sums[cid] for cid in guests], amounts
+
+
+def setPrice(pool, service, choice, price, item=None):
+    with pool.transaction() as cursor:
+        cursor.execute("SELECT ITEM FROM TARIFF WHERE SERVICE = %s AND CHOICE = %s", (service, choice))
+        row = cursor.fetchone()
+        if row:
+            cursor.execute("UPDATE TARIFF SET ITEM = %s, PRICE = %s WHERE SERVICE = %s AND CHOICE = %s",
+                           (item or row[0], price, service, choice))
+        elif item:
+            cursor.execute("INSERT INTO TARIFF (SERVICE, CHOICE, ITEM, PRICE) VALUES (%s, %s, %s, %s)",
+                           (service, choice, item, price))
+        else:
+            raise ValueError(f"{service} has no choice {choice}; give --item to add it")
+
+
+# MODULE TO READ UNBILLED CHARGES AS PARALLEL COLUMNS
+def unbilledCharges(cursor, day=None):
+    """(cids, service codes, choices, quantities, stored amounts) of charges no bill has covered yet.
+
+    day: only the charges posted on that date."""
+    codes = {service: code for code, service in enumerate(SERVICES)}
+    query = ("SELECT L.CID, L.SERVICE, L.CHOICE, L.QUANTITY, L.AMOUNT FROM LEDGER L "
+             "JOIN BALANCE B ON B.CID = L.CID WHERE L.ENTRY_NO > B.BILLED_ENTRY_NO")
+    if day:
+        cursor.execute(query + " AND L.POSTED_AT >= %s AND L.POSTED_AT < %s",
+                       (day.isoformat(), (day + timedelta(days=1)).isoformat()))
+    else:
+        cursor.execute(query)
+    cids, services, choices, quantities, stored = [], [], [], [], []
+    for cid, service, choice, quantity, amount in cursor.fetchall():
+        cids.append(cid)
+        services.append(codes[service])
+        choices.append(int(choice or 0))
+        quantities.append(int(quantity or 0))
+        stored.append(int(amount))
+    return cids, services, choices, quantities, stored
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Show or change the HMS tariff and reprice unbilled charges.")
+    addBackendArguments(parser)
+    parser.add_argument("--set", nargs=3, metavar=("SERVICE", "CHOICE", "PRICE"), help="change one price")
+    parser.add_argument("--item", help="item name for --set (required for a new menu choice)")
+    parser.add_argument("--settle", action="store_true",
+                        help="dry run: total the unbilled charges at the current tariff (nothing is written)")
+    parser.add_argument("--day", type=date.fromisoformat, help="with --settle, only charges posted that day")
+    args = parser.parse_args(argv)
+
+    pool = ConnectionPool(backendFromArguments(args), size=1)
+    migrate(pool)
+    if args.set:
+        service, choice, price = args.set[0].upper(), int(args.set[1]), int(args.set[2])
+        if service not in SERVICES:
+            parser.error(f"SERVICE must be one of {', '.join(SERVICES)}")
+        try:
+            setPrice(pool, service, choice, price, args.item)
+        except ValueError as err:
+            parser.error(str(err))
+    catalog = TariffCatalog.load(pool)
+
+    if args.settle:
+        with pool.transaction() as cursor:
+            cids, services, choices, quantities, stored = unbilledCharges(cursor, args.day)
+        started = time.perf_counter()
+        guests, totals, amounts = catalog.settle(cids, services, choices, quantities)
+        elapsed = time.perf_counter() - started
+        changed = sum(1 for amount, old in zip(amounts, stored) if amount != old)
+        print(f"{'CID':<20}{'ROOM RENT':>12}{'RESTAURANT':>12}{'GAMING':>10}{'FASHION':>10}{'TOTAL':>12}")
+        for cid, row in zip(guests, totals):
+            row = [int(value) for value in row]
+            print(f"{cid:<20}{row[0]:>12}{row[1]:>12}{row[2]:>10}{row[3]:>10}{sum(row):>12}")
+        print(f"\n{len(cids)} CHARGES FOR {len(guests)} GUESTS PRICED IN {elapsed * 1000:.1f} ms "
+              f"({'numpy' if numpy else 'pure Python'}); {changed} DIFFER FROM THE AMOUNT CHARGED")
+        print("DRY RUN: NOTHING WAS WRITTEN, CHARGES KEEP THE AMOUNT THEY WERE CHARGED AT")
+    else:
+        for service in SERVICES:
+            print(f"\n##### {service} #####")
+            for choice, (item, price) in catalog.menu(service).items():
+                print(f"{choice}. {item} > {price} Rs.")
+    pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+# Shared fixtures: a fresh, migrated SQLite database per test.
+
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
+
+from hms_db import ConnectionPool, SQLiteBackend  # noqa: E402
+from hms_schema import migrate  # noqa: E402
+
+
+@pytest.fixture
+def backend(tmp_path):
+    return SQLiteBackend(str(tmp_path / "HMS.db"))
+
+
+@pytest.fixture
+def pool(backend):
+    pool = ConnectionPool(backend, size=2)
+    migrate(pool, verbose=False)
+    yield pool
+    pool.close()
+
+
+@pytest.fixture
+def hotel(pool):
+    from hms_ops import Hotel
+    return Hotel(pool)
@@ -0,0 +1,77 @@
+import asyncio
+import threading
+
+import pytest
+
+import hms_async
+from hms_async import AsyncConnectionPool, AsyncHotel, chooseDriver, runSessions
+from hms_db import PoolTimeout, SQLiteBackend
+from hms_ledger import verifyBalances
+
+
+def test_the_threads_driver_is_used_without_an_async_driver(backend, monkeypatch):
+    monkeypatch.setattr(hms_async, "aiosqlite", None)
+    assert chooseDriver(backend) == "threads"
+    assert AsyncConnectionPool(backend).driver == "threads"
+    # an in-memory database cannot be shared with aiosqlite's own connections
+    monkeypatch.setattr(hms_async, "aiosqlite", object())
+    assert chooseDriver(SQLiteBackend(":memory:")) == "threads"
+    assert chooseDriver(backend) == "aiosqlite"
+
+
+def test_threads_driver_serves_the_hotel_on_one_thread_per_connection(backend, pool):
+    async def scenario():
+        apool = AsyncConnectionPool(backend, size=3, driver="threads")
+        try:
+            hotel = await AsyncHotel.open(apool)
+            await hotel.addCustomer("C1", "Asha")
+            await asyncio.gather(*(hotel.charge("RESTAURANT", "C1", 1, 1) for _ in range(20)))
+            bill = await hotel.bill("C1", save=True)
+            history = await hotel.history("C1")
+            threads = [thread for thread in threading.enumerate() if thread.name.startswith("hms-async-db")]
+            return bill, history, len(threads), len(apool._idle)
+        finally:
+            await apool.close()
+
+    bill, history, threads, idle = asyncio.run(scenario())
+    assert (bill.restaurant, bill.total) == (6000, 6000)
+    assert [row[-1] for row in history] == [6000]
+    assert threads <= 3 and idle <= 3
+    with pool.transaction() as cursor:
+        assert verifyBalances(cursor) == []
+
+
+def test_threads_driver_rolls_back_and_times_out(backend, pool):
+    async def scenario():
+        apool = AsyncConnectionPool(backend, size=1, timeout=0.1, driver="threads")
+        try:
+            with pytest.raises(ZeroDivisionError):
+                async with apool.transaction() as cursor:
+                    await cursor.execute("INSERT INTO C_DETAILS (CID, C_NAME) VALUES (%s, %s)", ("C1", "Asha"))
+                    1 / 0
+            async with apool.transaction() as cursor:
+                with pytest.raises(PoolTimeout):
+                    await apool.acquire()
+                await cursor.execute("SELECT COUNT(*) FROM C_DETAILS")
+                return await cursor.fetchone()
+        finally:
+            await apool.close()
+
+    assert asyncio.run(scenario()) == (0,)
+
+
+def test_sessions_run_concurrently_on_the_threads_driver(backend, pool, hotel):
+    for number in range(10):
+        hotel.addCustomer(f"B{number:07d}", f"Guest {number}")
+
+    async def scenario():
+        apool = AsyncConnectionPool(backend, size=2, driver="threads")
+        try:
+            return await runSessions(await AsyncHotel.open(apool), 10, sessions=20, operations=5)
+        finally:
+            await apool.close()
+
+    stats, elapsed = asyncio.run(scenario())
+    assert sum(entry["count"] for entry in stats.summary().values()) == 100
+    with pool.transaction() as cursor:
+        assert verifyBalances(cursor) == []
@@ -0,0 +1,58 @@
+import threading
+
+import pytest
+
+from hms_batch import ChargeBatcher
+from hms_db import DB_ERRORS
+from hms_ops import Hotel
+
+
+def ledgerRows(pool):
+    with pool.transaction() as cursor:
+        cursor.execute("SELECT CID, AMOUNT FROM LEDGER ORDER BY ENTRY_NO")
+        return cursor.fetchall()
+
+
+def restaurant(hotel, cid, quantity=1):
+    return hotel.priceCharge("RESTAURANT", cid, 1, quantity)[1]
+
+
+def test_concurrent_charges_commit_in_groups(pool):
+    batcher = ChargeBatcher(pool, maxDelay=0.05)
+    hotel = Hotel(pool, batcher=batcher)
+    hotel.addCustomer("C1", "Asha")
+    threads = [threading.Thread(target=hotel.charge, args=("RESTAURANT", "C1", 1, 1)) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    batcher.close()
+    stats = batcher.stats()
+    assert stats["rows"] == 20 and stats["batches"] < 20
+    assert hotel.bill("C1").restaurant == 6000
+
+
+def test_a_bad_charge_fails_only_its_own_caller(pool, hotel):
+    hotel.addCustomer("C1", "Asha")
+    batcher = ChargeBatcher(pool, maxDelay=0.2)
+    good = batcher.submit("RESTAURANT", restaurant(hotel, "C1"))
+    bad = batcher.submit("RESTAURANT", ("NOBODY", 1, 1, 300))
+    assert good.result(5) is None
+    with pytest.raises(DB_ERRORS):
+        bad.result(5)
+    batcher.close()
+    assert ledgerRows(pool) == [("C1", 300)]
+
+
+def test_a_cancelled_charge_is_dropped_and_the_writer_carries_on(pool, hotel):
+    hotel.addCustomer("C1", "Asha")
+    batcher = ChargeBatcher(pool, maxDelay=0.2)
+    kept = batcher.submit("RESTAURANT", restaurant(hotel, "C1", 1))
+    dropped = batcher.submit("RESTAURANT", restaurant(hotel, "C1", 2))
+    assert dropped.cancel()
+    assert kept.result(5) is None
+    batcher.post("RESTAURANT", restaurant(hotel, "C1", 3), timeout=5)
+    batcher.close()
+    assert dropped.cancelled()
+    assert ledgerRows(pool) == [("C1", 300), ("C1", 900)]
+    assert batcher.stats()["rows"] == 2
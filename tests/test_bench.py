@@ -0,0 +1,40 @@
+import threading
+
+from hms_bench import replay
+
+
+class RecordingHotel:
+    """Stands in for hms_ops.Hotel and keeps every call the workload makes."""
+
+    def __init__(self):
+        self.calls = set()
+        self.lock = threading.Lock()
+
+    def record(self, *call):
+        with self.lock:
+            self.calls.add(call)
+
+    def addCustomer(self, *args):
+        self.record("addCustomer", *args)
+
+    def charge(self, *args):
+        self.record("charge", *args)
+
+    def customer(self, cid):
+        self.record("customer", cid)
+
+    def bill(self, cid, save=False):
+        self.record("bill", cid, save)
+
+
+def test_the_same_seed_replays_the_same_calls_on_many_threads():
+    runs = []
+    for threads in (8, 8, 1):
+        hotel = RecordingHotel()
+        stats, seconds = replay(hotel, 500, 1000, threads, seed=7)
+        runs.append(hotel.calls)
+    assert runs[0] == runs[1] == runs[2]
+
+    other = RecordingHotel()
+    replay(other, 500, 1000, 8, seed=8)
+    assert other.calls != runs[0]
@@ -0,0 +1,130 @@
+from datetime import date
+
+import pytest
+
+from hms_billing import billCheckedOut, billHistory, checkBalances, computeBill, rebuildBalances, saveBills
+from hms_ledger import verifyBalances
+from hms_ops import HotelError
+
+
+def balanceRow(pool, cid):
+    with pool.transaction() as cursor:
+        cursor.execute("SELECT ROOMRENT, RESTAURANTBILL, BILLED_RESTAURANTBILL, BILLED_GAMINGBILL, BILLED_ENTRY_NO "
+                       "FROM BALANCE WHERE CID = %s", (cid,))
+        return cursor.fetchone()
+
+
+def test_a_saved_bill_only_covers_charges_since_the_last_one(pool, hotel):
+    hotel.addCustomer("C1", "Asha")
+    hotel.charge("RESTAURANT", "C1", 1, 2)
+    first = hotel.bill("C1", save=True)
+    assert (first.restaurant, first.total) == (600, 600)
+    assert hotel.bill("C1").total == 0
+
+    hotel.charge("RESTAURANT", "C1", 1, 1)
+    hotel.charge("GAMING", "C1", 3, 1)
+    second = hotel.bill("C1", save=True)
+    assert (second.restaurant, second.gaming, second.total) == (300, 250, 550)
+    assert second.entry > first.entry
+    assert balanceRow(pool, "C1") == (0, 900, 900, 250, second.entry)
+    assert [row[-1] for row in hotel.history("C1")] == [600, 550]
+
+
+def test_rebuild_restores_charged_and_billed_amounts(pool, hotel):
+    for cid in ("C1", "C2"):
+        hotel.addCustomer(cid, cid)
+    hotel.charge("RESTAURANT", "C1", 1, 2)
+    hotel.bill("C1", save=True)
+    hotel.charge("GAMING", "C1", 3, 1)
+    hotel.charge("FASHION", "C2", 4, 1)
+    expected = balanceRow(pool, "C1")
+
+    with pool.transaction() as cursor:
+        assert checkBalances(cursor) == []
+        cursor.execute("UPDATE BALANCE SET RESTAURANTBILL = 1, BILLED_RESTAURANTBILL = 2, BILLED_ENTRY_NO = 0 "
+                       "WHERE CID = 'C1'")
+        cursor.execute("DELETE FROM BALANCE WHERE CID = 'C2'")
+        problems = checkBalances(cursor)
+        assert [cid for cid, stored, actual in problems] == ["C1", "C2"]
+        assert problems[0][1][1] == 1 and problems[0][1][5] == 2
+        assert problems[0][2] == (0, 600, 250, 0, 0, 600, 0, 0)
+        assert problems[1][1] is None
+
+        rebuildBalances(cursor)
+        assert checkBalances(cursor) == []
+        assert verifyBalances(cursor) == []
+    assert balanceRow(pool, "C1") == expected
+    assert hotel.bill("C1").total == 250
+    assert hotel.bill("C2").total == 4000
+
+
+def test_batch_bills_are_marked_billed(pool, hotel):
+    hotel.addCustomer("C1", "Asha")
+    hotel.charge("RESTAURANT", "C1", 2, 1)
+    with pool.transaction() as cursor:
+        cursor.execute("INSERT INTO BOOKING_RECORD (CID, CHECK_IN, CHECK_OUT) VALUES ('C1', '2026-01-01', '2026-01-03')")
+    assert [bill.total for bill in billCheckedOut(pool, date(2026, 1, 5))] == [500]
+    assert hotel.bill("C1").total == 0
+    with pool.transaction() as cursor:
+        assert checkBalances(cursor) == []
+
+
+def test_a_returning_guest_is_batch_billed_for_the_new_stay(pool, hotel):
+    hotel.addCustomer("C1", "Asha")
+    hotel.addCustomer("C2", "Ravi")
+    with pool.transaction() as cursor:
+        cursor.execute("INSERT INTO BOOKING_RECORD (CID, CHECK_IN, CHECK_OUT) VALUES ('C1', '2026-01-01', '2026-01-05')")
+    hotel.charge("RESTAURANT", "C1", 1, 2)
+    assert [(bill.cid, bill.total) for bill in billCheckedOut(pool, date(2026, 1, 5))] == [("C1", 600)]
+    assert billCheckedOut(pool, date(2026, 1, 20)) == []
+
+    with pool.transaction() as cursor:
+        cursor.execute("INSERT INTO BOOKING_RECORD (CID, CHECK_IN, CHECK_OUT) VALUES ('C1', '2026-02-01', '2026-02-05')")
+        cursor.execute("INSERT INTO BOOKING_RECORD (CID, CHECK_IN, CHECK_OUT) VALUES ('C2', '2026-02-01', '2026-02-03')")
+    hotel.charge("RESTAURANT", "C1", 1, 1)
+    hotel.charge("GAMING", "C2", 3, 1)
+    assert [(bill.cid, bill.total) for bill in billCheckedOut(pool, date(2026, 2, 5))] == [("C1", 300), ("C2", 250)]
+    with pool.transaction() as cursor:
+        cursor.execute("SELECT CID, BILLED_AT, TOTALAMOUNT FROM TOTAL ORDER BY BILL_NO")
+        assert [tuple(str(value) for value in row) for row in cursor.fetchall()] == [
+            ("C1", "2026-01-05", "600"), ("C1", "2026-02-05", "300"), ("C2", "2026-02-05", "250"),
+        ]
+
+
+def billOn(pool, hotel, cid, day, quantity):
+    hotel.charge("RESTAURANT", cid, 1, quantity)
+    with pool.transaction() as cursor:
+        saveBills(cursor, [computeBill(cursor, cid)], date.fromisoformat(day))
+
+
+def test_bill_history_pages_by_bill_number_within_dates(pool, hotel):
+    hotel.addCustomer("C1", "Asha")
+    hotel.addCustomer("C2", "Ravi")
+    for day, quantity in (("2026-01-10", 1), ("2026-02-10", 2), ("2026-03-10", 3), ("2026-04-10", 4)):
+        billOn(pool, hotel, "C1", day, quantity)
+    billOn(pool, hotel, "C2", "2026-02-11", 1)
+    with pool.transaction() as cursor:
+        # a bill saved before bill dates were recorded
+        cursor.execute("UPDATE TOTAL SET BILLED_AT = NULL WHERE TOTALAMOUNT = 300 AND CID = 'C1'")
+
+    first = hotel.history("C1", limit=2)
+    assert [row[-1] for row in first] == [300, 600]
+    assert [row[-1] for row in hotel.history("C1", after=first[-1][0], limit=2)] == [900, 1200]
+    assert hotel.history("C1", after=first[-1][0] + 10) == []
+
+    assert [[row[-1] for row in page] for page in billHistory(pool, "C1", pageSize=3)] == [[300, 600, 900], [1200]]
+    assert [[row[-1] for row in page] for page in hotel.historyPages("C1", pageSize=2)] == [[300, 600], [900, 1200]]
+
+    dated = hotel.history("C1", since="2026-02-10", until="2026-03-10")
+    assert [(str(row[1]), row[-1]) for row in dated] == [("2026-02-10", 600), ("2026-03-10", 900)]
+    assert [row[-1] for row in hotel.history("C1", until="2026-03-31")] == [600, 900]
+
+
+def test_bill_history_rejects_bad_arguments(hotel):
+    hotel.addCustomer("C1", "Asha")
+    with pytest.raises(HotelError, match="after must be a bill number"):
+        hotel.history("C1", after="last")
+    with pytest.raises(HotelError, match="to date must not be before"):
+        hotel.history("C1", since="2026-03-01", until="2026-02-01")
+    with pytest.raises(HotelError):
+        hotel.historyPages("C1", since="March")
@@ -0,0 +1,75 @@
+import hms_cache
+from hms_cache import CustomerCache
+from hms_ops import Hotel
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def loader(records, calls):
+    def load(cid):
+        calls.append(cid)
+        return records.get(cid)
+    return load
+
+
+def test_least_recently_used_record_is_evicted_first():
+    calls = []
+    cache = CustomerCache(maxSize=2)
+    load = loader({"C1": ("C1",), "C2": ("C2",), "C3": ("C3",)}, calls)
+    cache.get("C1", load)
+    cache.get("C2", load)
+    cache.get("C1", load)           # C2 is now the oldest
+    cache.get("C3", load)
+    assert calls == ["C1", "C2", "C3"]
+    cache.get("C1", load)
+    cache.get("C2", load)
+    assert calls == ["C1", "C2", "C3", "C2"]
+    stats = cache.stats()
+    assert (stats["size"], stats["hits"], stats["misses"], stats["evictions"]) == (2, 2, 4, 2)
+
+
+def test_records_expire_after_the_ttl():
+    calls, clock = [], Clock()
+    cache = CustomerCache(ttl=10, clock=clock)
+    load = loader({"C1": ("C1", "Asha")}, calls)
+    cache.get("C1", load)
+    clock.now = 9.9
+    assert cache.get("C1", load) == ("C1", "Asha") and calls == ["C1"]
+    clock.now = 10.0
+    cache.get("C1", load)
+    assert calls == ["C1", "C1"]
+    assert cache.stats()["expirations"] == 1
+
+
+def test_missing_customers_are_not_cached_and_invalidate_drops_a_record():
+    calls, records = [], {}
+    cache = CustomerCache()
+    load = loader(records, calls)
+    assert cache.get("C1", load) is None
+    records["C1"] = ("C1", "Asha")
+    assert cache.get("C1", load) == ("C1", "Asha")
+    records["C1"] = ("C1", "Asha K")
+    cache.invalidate("C1")
+    assert cache.get("C1", load) == ("C1", "Asha K")
+    assert calls == ["C1", "C1", "C1"]
+
+
+def test_hotel_reads_a_customer_from_the_database_once(pool, monkeypatch):
+    fetched = []
+    fetch = hms_cache.fetchCustomer
+    monkeypatch.setattr(hms_cache, "fetchCustomer", lambda pool, cid: fetched.append(cid) or fetch(pool, cid))
+    writer = Hotel(pool)
+    writer.addCustomer("C1", "Asha")
+    for _ in range(5):
+        assert writer.customer("C1")[1] == "Asha"
+    assert fetched == []            # addCustomer wrote the record through
+    reader = Hotel(pool)
+    for _ in range(5):
+        assert reader.customer("C1")[1] == "Asha"
+    assert fetched == ["C1"]
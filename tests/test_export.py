@@ -0,0 +1,82 @@
+import os
+from datetime import date
+
+import hms_export
+from hms_export import exportSnapshot, latestSnapshot, loadRollup, loadTable
+from hms_rooms import AvailabilityEngine
+
+
+def setUp(pool, hotel):
+    with pool.transaction() as cursor:
+        cursor.executemany("INSERT INTO ROOMS (ROOMNO, ROOM_CHOICE) VALUES (%s, %s)", [(101, 1), (102, 1), (201, 2)])
+    hotel.rooms = AvailabilityEngine.load(pool)
+    for cid in ("C1", "C2", "C3"):
+        hotel.addCustomer(cid, f"Guest {cid}")
+    hotel.book("C1", "2026-03-01", "2026-03-03", 101)
+    hotel.book("C2", "2026-03-02", "2026-03-03", 102)
+    hotel.book("C3", "2026-03-02", "2026-03-03", 201)
+    hotel.charge("RESTAURANT", "C1", 1, 2)
+    hotel.charge("RESTAURANT", "C2", 2, 1)
+    hotel.charge("GAMING", "C1", 3, 1)
+    hotel.bill("C1", save=True)
+
+
+def test_tables_are_written_a_page_per_chunk_with_their_rollups(tmp_path, pool, hotel, monkeypatch):
+    monkeypatch.setattr(hms_export, "EXPORT_PAGE", 2)
+    setUp(pool, hotel)
+    manifest = exportSnapshot(pool, str(tmp_path), date(2026, 3, 4), "json")
+    snapshot = latestSnapshot(str(tmp_path))
+    assert os.path.basename(snapshot) == "2026-03-04"
+    assert not os.path.exists(snapshot + ".partial")
+
+    tables = manifest["tables"]
+    assert tables["ROOMS"]["files"] == ["ROOMS.00000.json.gz", "ROOMS.00001.json.gz"]
+    assert tables["BOOKING_RECORD"]["rows"] == 3 and len(tables["BOOKING_RECORD"]["files"]) == 2
+    assert tables["GAMING"]["files"] == ["GAMING.00000.json.gz"]
+    assert tables["FASHION"] == {"files": [], "rows": 0, "columns": tables["FASHION"]["columns"]}
+    assert manifest["last_entry_no"] == 3
+    assert sorted(os.listdir(snapshot)) == sorted(
+        ["manifest.json"] + [name for entry in tables.values() for name in entry["files"]])
+
+    assert loadTable(snapshot, "ROOMS") == {"ROOMNO": [101, 102, 201], "ROOM_CHOICE": [1, 1, 2]}
+    restaurant = loadTable(snapshot, "RESTAURANT")
+    assert restaurant["ENTRY_NO"] == [1, 2] and restaurant["CID"] == ["C1", "C2"]
+    assert loadTable(snapshot, "TOTAL")["TOTALAMOUNT"] == [850]
+    assert loadTable(snapshot, "FASHION")["CID"] == []
+
+    today = date.today().isoformat()
+    assert loadRollup(snapshot, "REVENUE_DAILY") == [
+        (today, "GAMING", 1, 1, 250), (today, "RESTAURANT", 2, 3, 1100),
+    ]
+    occupancy = {(day, category): (rooms, used, rate)
+                 for day, category, name, rooms, used, rate in loadRollup(snapshot, "OCCUPANCY_DAILY")}
+    assert occupancy == {
+        ("2026-03-01", 1): (2, 1, 0.5), ("2026-03-01", 2): (1, 0, 0.0),
+        ("2026-03-02", 1): (2, 2, 1.0), ("2026-03-02", 2): (1, 1, 1.0),
+    }
+    assert loadRollup(snapshot, "OCCUPANCY_DAILY", since="2026-03-02")[0][0] == "2026-03-02"
+
+
+def test_bills_and_charges_posted_during_the_export_are_left_for_the_next_one(tmp_path, pool, hotel, monkeypatch):
+    setUp(pool, hotel)
+    exportTable = hms_export.exportTable
+
+    def exportThenPost(cursor, directory, table, fileFormat, onPage=None):
+        writer = exportTable(cursor, directory, table, fileFormat, onPage)
+        if table == "BOOKING_RECORD":
+            # another terminal bills C2 while the snapshot is still being read
+            hotel.charge("FASHION", "C2", 4, 1)
+            hotel.bill("C2", save=True)
+        return writer
+
+    monkeypatch.setattr(hms_export, "exportTable", exportThenPost)
+    manifest = exportSnapshot(pool, str(tmp_path), date(2026, 3, 4), "json")
+    snapshot = os.path.join(str(tmp_path), "2026-03-04")
+    assert manifest["last_entry_no"] == 3
+    assert loadTable(snapshot, "TOTAL")["CID"] == ["C1"]
+    assert manifest["tables"]["FASHION"]["rows"] == 0 and manifest["tables"]["TOTAL"]["rows"] == 1
+
+    # the next night's export picks both up
+    manifest = exportSnapshot(pool, str(tmp_path), date(2026, 3, 5), "json")
+    assert manifest["last_entry_no"] == 4
+    assert loadTable(latestSnapshot(str(tmp_path)), "TOTAL")["CID"] == ["C1", "C2"]
@@ -0,0 +1,48 @@
+import pytest
+
+from hms_import import Importer, RowError, cleanRow
+from hms_rooms import AvailabilityEngine
+
+
+def writeLines(path, lines):
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
+
+
+def test_imported_bookings_go_through_the_availability_check(tmp_path, pool, hotel):
+    with pool.transaction() as cursor:
+        cursor.executemany("INSERT INTO ROOMS (ROOMNO, ROOM_CHOICE) VALUES (%s, %s)", [(101, 1), (102, 1)])
+    hotel.rooms = AvailabilityEngine.load(pool)
+    for cid in ("C1", "C2", "C3"):
+        hotel.addCustomer(cid, f"Guest {cid}")
+    hotel.book("C1", "2026-03-01", "2026-03-05", 101)
+
+    bookings = writeLines(tmp_path / "bookings.csv", [
+        "CID,CHECK_IN,CHECK_OUT,ROOMNO",
+        "C2,2026-03-03,2026-03-06,101",     # clashes with the stored stay
+        "C2,2026-03-05,2026-03-07,101",     # starts the day C1 leaves
+        "C3,2026-03-06,2026-03-08,101",     # clashes with the row above
+        "C3,2026-03-01,2026-03-02,999",     # not a room of this hotel
+        "C3,2026-03-01,2026-03-02,",        # no room named
+    ])
+    importer = Importer(pool, chunk=2)
+    importer.importFile(bookings, "BOOKING_RECORD")
+
+    assert importer.inserted == {"BOOKING_RECORD": 2}
+    assert importer.rejected == 3
+    assert "room 101 is already booked from 2026-03-01 to 2026-03-05 by C1" in importer.errors[0]
+    assert "room 101 is already booked from 2026-03-05 to 2026-03-07 by C2" in importer.errors[1]
+    assert "there is no room 999 in this hotel" in importer.errors[2]
+    with pool.transaction() as cursor:
+        cursor.execute("SELECT CID, CHECK_IN, ROOMNO FROM BOOKING_RECORD ORDER BY CHECK_IN, CID")
+        assert [tuple(str(value) for value in row) for row in cursor.fetchall()] == [
+            ("C1", "2026-03-01", "101"), ("C3", "2026-03-01", "None"), ("C2", "2026-03-05", "101"),
+        ]
+
+
+def test_a_stay_must_end_after_it_starts():
+    row = {"CID": "C1", "CHECK_IN": "2026-03-05", "ROOMNO": "101"}
+    assert cleanRow("BOOKING_RECORD", dict(row, CHECK_OUT="2026-03-06"))[1:3] == ("2026-03-05", "2026-03-06")
+    for checkout in ("2026-03-05", "2026-03-04"):
+        with pytest.raises(RowError, match="CHECK_OUT is not after CHECK_IN"):
+            cleanRow("BOOKING_RECORD", dict(row, CHECK_OUT=checkout))
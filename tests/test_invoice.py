@@ -0,0 +1,71 @@
+import csv
+import os
+from datetime import date
+
+import hms_invoice
+from hms_invoice import invoiceFileStem, renderInvoices
+
+
+def readIndex(directory):
+    with open(os.path.join(directory, "index.csv"), newline="") as file:
+        return list(csv.reader(file))[1:]
+
+
+def test_invoices_cover_the_charges_since_the_last_bill(tmp_path, pool, hotel):
+    for cid in ("C1", "C2"):
+        hotel.addCustomer(cid, f"Guest {cid}")
+    hotel.charge("RESTAURANT", "C1", 1, 2)
+    hotel.bill("C1", save=True)
+    hotel.charge("GAMING", "C1", 3, 2)
+    hotel.charge("FASHION", "C2", 4, 1)
+
+    out = str(tmp_path / "invoices")
+    assert renderInvoices(pool, ["C2", "C1", "C404"], out, invoiceDate=date(2026, 3, 31)) == (2, 4500)
+    # rows are appended as the invoices finish, in any order
+    assert sorted(readIndex(out)) == [
+        ["C1", "Guest C1", "500", "INVOICE-C1.txt"], ["C2", "Guest C2", "4000", "INVOICE-C2.txt"],
+    ]
+    with open(os.path.join(out, "INVOICE-C1.txt"), encoding="utf-8") as file:
+        text = file.read()
+    assert "INVOICE DATE: 2026-03-31" in text and "TOTAL AMOUNT: Rs. 500" in text
+    assert "Snooker" in text and "Vegetarian Combo" not in text
+
+
+def test_cids_with_path_characters_stay_in_the_invoice_directory(tmp_path, pool, hotel):
+    cids = ["../escape", "a/b", "a_b", "C<1>"]
+    for cid in cids:
+        hotel.addCustomer(cid, "<b>Bold</b> & Co")
+        hotel.charge("RESTAURANT", cid, 1, 1)
+
+    assert invoiceFileStem("C-01_x") == "C-01_x"
+    assert invoiceFileStem("a/b") != invoiceFileStem("a_b") == "a_b"
+    out = tmp_path / "invoices"
+    assert renderInvoices(pool, cids, str(out), "html") == (4, 1200)
+    files = sorted(os.listdir(out))
+    assert len(files) == 5 and not (tmp_path / "escape.html").exists()
+    assert all(os.sep not in name and not name.startswith(".") for name in files)
+    index = {row[0]: row[3] for row in readIndex(str(out))}
+    assert sorted(index) == sorted(cids)        # the raw CIDs, not the file stems
+    assert sorted(index.values()) == sorted(name for name in files if name != "index.csv")
+    with open(out / index["C<1>"], encoding="utf-8") as file:
+        document = file.read()
+    assert "&lt;b&gt;Bold&lt;/b&gt; &amp; Co (C&lt;1&gt;)" in document
+    assert "<td>RESTAURANT</td>" in document
+
+
+def test_each_chunk_is_on_disk_while_the_next_is_read(tmp_path, pool, hotel, monkeypatch):
+    monkeypatch.setattr(hms_invoice, "INVOICE_CHUNK", 2)
+    cids = [f"C{number}" for number in range(5)]
+    for cid in cids:
+        hotel.addCustomer(cid, cid)
+    out = str(tmp_path / "invoices")
+    seen = []
+
+    def progress(done, total):
+        seen.append((done, total, len(readIndex(out))))
+
+    assert renderInvoices(pool, cids, out, workers=2, progress=progress) == (5, 0)
+    assert [(done, total) for done, total, written in seen] == [(2, 5), (4, 5), (5, 5)]
+    # by the time a chunk has been read, every invoice of the one before it is written
+    assert [written >= done - 2 for done, total, written in seen] == [True, True, True]
+    assert len(readIndex(out)) == 5
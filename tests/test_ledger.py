@@ -0,0 +1,54 @@
+from hms_db import ConnectionPool, SQLiteBackend
+from hms_ledger import balancesAt, lastEntry, replay, takeSnapshots, verifyBalances
+from hms_schema import migrate
+
+
+def post(hotel):
+    for cid in ("C1", "C2"):
+        hotel.addCustomer(cid, f"Guest {cid}")
+    hotel.charge("RESTAURANT", "C1", 1, 2)
+    hotel.charge("GAMING", "C1", 3, 1)
+    hotel.charge("FASHION", "C2", 4, 1)
+    hotel.charge("RESTAURANT", "C2", 2, 1)
+
+
+def test_balances_agree_with_the_ledger(pool, hotel):
+    post(hotel)
+    with pool.transaction() as cursor:
+        assert verifyBalances(cursor) == []
+        balances, tail = balancesAt(cursor, lastEntry(cursor))
+    assert balances == {"C1": [0, 600, 250, 0], "C2": [0, 500, 0, 4000]}
+    assert tail == 4
+
+
+def test_verify_reports_a_tampered_balance(pool, hotel):
+    post(hotel)
+    with pool.transaction() as cursor:
+        cursor.execute("UPDATE BALANCE SET GAMINGBILL = 999 WHERE CID = 'C1'")
+        assert verifyBalances(cursor) == [("C1", [0, 600, 999, 0], [0, 600, 250, 0])]
+
+
+def test_snapshots_shorten_the_tail_without_changing_balances(pool, hotel):
+    post(hotel)
+    with pool.transaction() as cursor:
+        before = balancesAt(cursor, lastEntry(cursor))[0]
+        assert takeSnapshots(cursor, minTail=1, settleSeconds=0) == (2, 4)
+    hotel.charge("RESTAURANT", "C1", 3, 1)
+    with pool.transaction() as cursor:
+        balances, tail = balancesAt(cursor, lastEntry(cursor))
+        assert tail == 1
+        assert balances["C1"] == [0, 1350, 250, 0] and balances["C2"] == before["C2"]
+        # an audit at an earlier entry ignores the later charge
+        assert balancesAt(cursor, 4)[0] == before
+        assert verifyBalances(cursor) == []
+
+
+def test_replay_rebuilds_the_same_balances(tmp_path, pool, hotel):
+    post(hotel)
+    target = ConnectionPool(SQLiteBackend(str(tmp_path / "copy.db")), size=1)
+    migrate(target, verbose=False)
+    assert replay(pool, target, upTo=3) == (2, 3)
+    with target.transaction() as cursor:
+        assert verifyBalances(cursor) == []
+        assert balancesAt(cursor, lastEntry(cursor))[0] == {"C1": [0, 600, 250, 0], "C2": [0, 0, 0, 4000]}
+    target.close()
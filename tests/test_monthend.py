@@ -0,0 +1,58 @@
+import pytest
+
+from hms_billing import LEDGER_INSERT, billCheckedOut, openBalances
+from hms_db import ConnectionPool, SQLiteBackend
+from hms_monthend import planShards, processesAvailable, runMonthEnd
+from hms_ops import BOOKING_INSERT, CUSTOMER_INSERT
+from hms_schema import migrate
+from hms_tariff import unbilledCharges
+
+
+def seed(pool, customers=12):
+    with pool.transaction() as cursor:
+        for number in range(customers):
+            cid = f"C{number:03d}"
+            cursor.execute(CUSTOMER_INSERT, (cid, f"Guest {number}", "", "", "", "", ""))
+            openBalances(cursor, [cid])
+            cursor.execute(LEDGER_INSERT, ("2026-03-10T10:00:00", cid, "RESTAURANT", 1, 1, None, 100 + number))
+            cursor.execute(LEDGER_INSERT, ("2026-04-01T10:00:00", cid, "GAMING", 1, 1, None, 999))
+            cursor.execute(BOOKING_INSERT, (cid, "2026-03-01", "2026-03-05", None))
+
+
+def monthBills(pool):
+    with pool.transaction() as cursor:
+        cursor.execute("SELECT PERIOD, COUNT(*), SUM(TOTALAMOUNT) FROM MONTH_BILL GROUP BY PERIOD")
+        return cursor.fetchall()
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_month_end_in_worker_processes(backend, pool, workers):
+    seed(pool)
+    assert processesAvailable(backend) == (True, None)
+    bills, amount, failed = runMonthEnd(backend, pool, "2026-03", workers, shardSize=5, report=lambda line: None)
+    assert (bills, amount, failed) == (12, sum(100 + number for number in range(12)), [])
+    assert [status for shard, lo, hi, status in planShards(pool, "2026-03")] == ["DONE"] * 3
+    # a second run bills nothing twice
+    assert runMonthEnd(backend, pool, "2026-03", workers, report=lambda line: None) == (0, 0, [])
+    assert monthBills(pool) == [("2026-03", 12, amount)]
+
+
+def test_month_end_bills_do_not_count_as_final_bills(backend, pool):
+    seed(pool)
+    runMonthEnd(backend, pool, "2026-03", 2, shardSize=5, report=lambda line: None)
+    with pool.transaction() as cursor:
+        assert len(unbilledCharges(cursor)[0]) == 24
+    assert len(billCheckedOut(pool)) == 12
+    with pool.transaction() as cursor:
+        assert unbilledCharges(cursor)[0] == []
+
+
+def test_in_memory_database_falls_back_to_threads():
+    backend = SQLiteBackend(":memory:")
+    pool = ConnectionPool(backend, size=1)
+    migrate(pool, verbose=False)
+    seed(pool, 3)
+    notes = []
+    assert runMonthEnd(backend, pool, "2026-03", 2, report=notes.append)[0] == 3
+    assert any("threads" in note for note in notes)
+
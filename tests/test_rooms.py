@@ -0,0 +1,83 @@
+import threading
+from datetime import date, timedelta
+
+import pytest
+
+from hms_ops import Conflict, Hotel
+from hms_rooms import AvailabilityEngine
+
+D = date.fromisoformat
+
+
+def test_stay_in_unknown_room_keeps_engine_unconfigured():
+    engine = AvailabilityEngine(origin=D("2026-01-01"))
+    assert engine.reserve(101, D("2026-01-02"), D("2026-01-04"), "C1") == []
+    assert not engine.configured
+    assert engine.rooms() == []
+    assert not engine.isFree(101, D("2026-01-03"), D("2026-01-05"))
+
+
+def test_free_rooms_and_half_open_stays():
+    engine = AvailabilityEngine(origin=D("2026-01-01"))
+    for room in (101, 102, 103):
+        engine.addRoom(room, 1)
+    engine.addRoom(201, 2)
+    engine.reserve(101, D("2026-01-02"), D("2026-01-05"), "C1")
+    assert engine.freeRooms(1, D("2026-01-03"), D("2026-01-04")) == [102, 103]
+    assert engine.freeRooms(1, D("2026-01-05"), D("2026-01-06")) == [101, 102, 103]
+    assert engine.reserve(101, D("2026-01-04"), D("2026-01-06"), "C2")[0][2] == "C1"
+    engine.release(101, D("2026-01-02"), D("2026-01-05"), "C1")
+    assert engine.isFree(101, D("2026-01-02"), D("2026-01-05"))
+
+
+def test_bookings_without_rooms_table_do_not_lock_the_hotel(pool, hotel):
+    hotel.addCustomer("C1", "Asha")
+    hotel.addCustomer("C2", "Ravi")
+    hotel.book("C1", "2026-01-02", "2026-01-04", 101)
+    hotel.book("C2", "2026-01-02", "2026-01-04", 102)
+    with pytest.raises(Conflict):
+        hotel.book("C2", "2026-01-03", "2026-01-05", 101)
+    hotel.charge("ROOM_RENT", "C1", 1, 1, 101)
+
+    reloaded = Hotel(pool)
+    assert not reloaded.rooms.configured
+    reloaded.book("C1", "2026-02-02", "2026-02-04", 103)
+
+
+def test_room_rent_is_charged_against_the_guests_own_booking(pool, hotel):
+    hotel.addCustomer("C1", "Asha")
+    hotel.addCustomer("C2", "Ravi")
+    today = date.today()
+    hotel.book("C2", today, today + timedelta(days=10), 101)
+    # C1's stay starts after C2 leaves; the rent is for that stay, not from today
+    hotel.book("C1", today + timedelta(days=20), today + timedelta(days=24), 101)
+    assert hotel.charge("ROOM_RENT", "C1", 1, 4, 101)[1] == 40000
+    with pool.transaction() as cursor:
+        cursor.execute("SELECT COUNT(*) FROM BOOKING_RECORD WHERE CID = 'C1'")
+        assert cursor.fetchone() == (1,)
+
+
+def test_room_rent_without_a_booking_holds_the_room(pool, hotel):
+    for cid in ("C1", "C2"):
+        hotel.addCustomer(cid, cid)
+    results = []
+
+    def rent(cid):
+        try:
+            results.append(hotel.charge("ROOM_RENT", cid, 2, 3, 205))
+        except Conflict as err:
+            results.append(err)
+
+    threads = [threading.Thread(target=rent, args=(cid,)) for cid in ("C1", "C2")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(type(result).__name__ for result in results) == ["Conflict", "tuple"]
+    with pool.transaction() as cursor:
+        cursor.execute("SELECT CHECK_IN, CHECK_OUT, ROOMNO FROM BOOKING_RECORD")
+        assert [tuple(str(value) for value in row) for row in cursor.fetchall()] == [
+            (date.today().isoformat(), (date.today() + timedelta(days=3)).isoformat(), "205"),
+        ]
+        cursor.execute("SELECT COUNT(*) FROM LEDGER")
+        assert cursor.fetchone() == (1,)
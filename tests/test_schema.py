@@ -0,0 +1,101 @@
+import pytest
+
+import hms_schema
+from hms_billing import checkBalances, computeBill
+from hms_db import ConnectionPool
+from hms_schema import MIGRATIONS, MigrationError, migrate, schemaVersion
+
+
+def legacyPool(backend, monkeypatch):
+    """A pool over a database with only the tables gauri.py used to create."""
+    pool = ConnectionPool(backend, size=1)
+    monkeypatch.setattr(hms_schema, "MIGRATIONS", MIGRATIONS[:1])
+    migrate(pool, verbose=False)
+    monkeypatch.undo()
+    return pool
+
+
+def insertLegacy(pool, customers=(), rooms=(), restaurant=(), bookings=(), bills=()):
+    with pool.transaction() as cursor:
+        for cid, name in customers:
+            cursor.execute("INSERT INTO C_DETAILS VALUES (%s, %s, '', '', '', '', '')", (cid, name))
+        for row in rooms:
+            cursor.execute("INSERT INTO ROOM_RENT VALUES (%s, %s, %s, %s, %s)", row)
+        for row in restaurant:
+            cursor.execute("INSERT INTO RESTAURANT VALUES (%s, %s, %s, %s)", row)
+        for row in bookings:
+            cursor.execute("INSERT INTO BOOKING_RECORD VALUES (%s, %s, %s)", row)
+        for row in bills:
+            cursor.execute("INSERT INTO TOTAL VALUES (%s, %s, %s, %s, %s, %s, %s)", row)
+
+
+def test_fresh_database_reaches_latest_version_once(pool, capsys):
+    latest = MIGRATIONS[-1][0]
+    with pool.transaction() as cursor:
+        assert schemaVersion(cursor) == latest
+    assert migrate(pool) == latest
+    assert capsys.readouterr().out == ""
+
+
+def test_legacy_data_upgrades(backend, monkeypatch):
+    pool = legacyPool(backend, monkeypatch)
+    insertLegacy(
+        pool,
+        customers=[("C1", "Asha"), ("C2", "Ravi")],
+        rooms=[("C1", 2, 3, 101, 15000)],
+        restaurant=[("C1", "1", 2, 600), ("C2", "3", 1, 750)],
+        bookings=[("C1", "2026-03-01", "2026-03-04")],
+        # a lifetime bill saved after the room rent and before the restaurant
+        bills=[("C1", "Asha", 15000, 0, 0, 0, 15000)],
+    )
+    assert migrate(pool, verbose=False) == MIGRATIONS[-1][0]
+    with pool.transaction() as cursor:
+        cursor.execute("SELECT CID, ROOMRENT, RESTAURANTBILL, TOTALAMOUNT FROM BALANCE ORDER BY CID")
+        assert cursor.fetchall() == [("C1", 15000, 600, 15600), ("C2", 0, 750, 750)]
+        cursor.execute("SELECT ROOMNO FROM BOOKING_RECORD")
+        assert cursor.fetchall() == [(101,)]
+        cursor.execute("SELECT COUNT(*), SUM(AMOUNT) FROM LEDGER")
+        assert cursor.fetchone() == (3, 16350)
+        cursor.execute("SELECT PRICE FROM TARIFF WHERE SERVICE = 'GAMING' AND CHOICE = 4")
+        assert cursor.fetchone() == (400,)
+        # the old bill covers the room rent, so only the restaurant is still due
+        assert computeBill(cursor, "C1")[2:7] == (0, 600, 0, 0, 600)
+        assert computeBill(cursor, "C2").total == 750
+        assert checkBalances(cursor) == []
+    pool.close()
+
+
+def test_duplicate_customers_are_reported_before_adding_keys(backend, monkeypatch):
+    pool = legacyPool(backend, monkeypatch)
+    insertLegacy(pool, customers=[("C1", "Asha"), ("C1", "Asha K"), ("C2", "Ravi")])
+    with pytest.raises(MigrationError, match="C_DETAILS has more than one row for C1\n"):
+        migrate(pool, verbose=False)
+    with pool.transaction() as cursor:
+        assert schemaVersion(cursor) == 1
+        cursor.execute("SELECT COUNT(*) FROM C_DETAILS")
+        assert cursor.fetchone() == (3,)
+    pool.close()
+
+
+def test_orphan_rows_are_reported_per_table(backend, monkeypatch):
+    pool = legacyPool(backend, monkeypatch)
+    insertLegacy(
+        pool,
+        customers=[("C1", "Asha")],
+        restaurant=[("C1", "1", 1, 300)] + [(f"X{number:02d}", "1", 1, 300) for number in range(12)],
+        bookings=[("GONE", "2026-03-01", "2026-03-02")],
+    )
+    with pytest.raises(MigrationError) as raised:
+        migrate(pool, verbose=False)
+    message = str(raised.value)
+    assert "BOOKING_RECORD has rows for unknown customer GONE\n" in message
+    assert "RESTAURANT has rows for unknown customer X00, X01" in message
+    assert "X09 and 2 more" in message
+    assert "C1" not in message
+
+    # once the rows are dealt with the upgrade goes through
+    with pool.transaction() as cursor:
+        cursor.execute("DELETE FROM RESTAURANT WHERE CID <> 'C1'")
+        cursor.execute("DELETE FROM BOOKING_RECORD")
+    assert migrate(pool, verbose=False) == MIGRATIONS[-1][0]
+    pool.close()
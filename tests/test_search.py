@@ -0,0 +1,41 @@
+from hms_search import CustomerIndex
+
+
+def make_index():
+    index = CustomerIndex()
+    index.add("C1", "Gauri Sharma", "9876543210", "gauri@example.com")
+    index.add("C2", "Ravi Kumar", "9123456789", "ravi@example.com")
+    index.add("C3", "Asha Verma", "9988776655", "asha@example.com")
+    return index
+
+
+def test_typo_and_partial_name():
+    index = make_index()
+    assert index.search("gauri sharm")[0][1] == "C1"
+    assert index.search("ravi kumra")[0][1] == "C2"
+
+
+def test_phone_suffix():
+    assert make_index().search("43210")[0][1] == "C1"
+
+
+def test_two_character_queries_do_not_crash():
+    index = make_index()
+    assert {result[1] for result in index.search("98")} == {"C1", "C3"}
+    assert index.search("as")[0][1] == "C3"
+    assert index.search("zz") == []
+    assert index.search("9") == []
+
+
+def test_updated_and_removed_customers():
+    index = make_index()
+    index.add("C2", "Ravi Menon", "9123456789", "ravi@example.com")
+    assert index.search("ravi menon")[0][1] == "C2"
+    assert [result for result in index.search("kumar") if result[1] == "C2"] == []
+    index.remove("C3")
+    assert index.search("asha verma") == []
+
+
+def test_hotel_find_customers(hotel):
+    hotel.addCustomer("C1", "Gauri Sharma", phone="9876543210")
+    assert hotel.findCustomers("98")[0][1] == "C1"
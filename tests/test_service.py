@@ -0,0 +1,77 @@
+import http.client
+import json
+import threading
+import time
+
+import pytest
+
+from hms_service import PooledHTTPServer
+
+
+@pytest.fixture
+def server(hotel):
+    server = PooledHTTPServer(("127.0.0.1", 0), hotel, workers=2)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def request(server, method, path, body=None):
+    connection = http.client.HTTPConnection(*server.server_address, timeout=10)
+    try:
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        connection.request(method, path, body=body, headers=headers)
+        response = connection.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        connection.close()
+
+
+def test_error_statuses(server):
+    assert request(server, "GET", "/nowhere")[0] == 404
+    assert request(server, "GET", "/customers/C404")[0] == 404
+    assert request(server, "POST", "/customers", "not json")[0] == 400
+    status, document = request(server, "POST", "/customers", json.dumps({"cid": "C1", "name": "Asha"}))
+    assert status == 201
+    assert request(server, "POST", "/customers", json.dumps({"cid": "C1", "name": "Asha"}))[0] == 409
+
+
+def test_bad_content_length_answers_400(server):
+    for length in ("abc", "-5", str(10 ** 6)):
+        connection = http.client.HTTPConnection(*server.server_address, timeout=10)
+        try:
+            connection.putrequest("POST", "/customers")
+            connection.putheader("Content-Length", length)
+            connection.endheaders()
+            response = connection.getresponse()
+            assert response.status == 400
+            assert "error" in json.loads(response.read())
+        finally:
+            connection.close()
+    assert request(server, "POST", "/customers", json.dumps({"cid": "C1", "name": "Asha"}))[0] == 201
+
+
+def test_short_search_query(server):
+    request(server, "POST", "/customers", json.dumps({"cid": "C1", "name": "Asha", "phone": "9876543210"}))
+    status, document = request(server, "GET", "/customers?q=98")
+    assert status == 200
+    assert [match["cid"] for match in document["matches"]] == ["C1"]
+
+
+def test_unexpected_exception_answers_500_and_is_recorded(server, monkeypatch):
+    def broken(*args, **kwargs):
+        raise IndexError("boom")
+
+    monkeypatch.setattr(server.hotel, "findCustomers", broken)
+    status, document = request(server, "GET", "/customers?q=asha")
+    assert status == 500
+    assert "IndexError" in document["error"]
+    # the sample is taken just after the reply is sent
+    for attempt in range(50):
+        endpoints = request(server, "GET", "/stats")[1]["endpoints"]
+        if "GET /customers?q=" in endpoints:
+            break
+        time.sleep(0.01)
+    assert endpoints["GET /customers?q="]["errors"] == 1
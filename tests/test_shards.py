@@ -0,0 +1,50 @@
+import pytest
+
+from hms_db import PoolTimeout, SQLiteBackend
+from hms_ops import HotelError
+from hms_schema import MigrationError
+from hms_shards import ShardRouter, groupSummary
+
+
+@pytest.fixture
+def router(tmp_path):
+    router = ShardRouter(
+        {"MIAMI": SQLiteBackend(str(tmp_path / "miami.db")), "GOA": SQLiteBackend(str(tmp_path / "goa.db"))},
+        prefixes={"MI": "MIAMI", "GO": "GOA"},
+        poolSize=1,
+    )
+    yield router
+    router.close()
+
+
+def test_a_property_only_takes_cids_that_route_to_it(router):
+    miami = router.hotel("MIAMI")
+    miami.addCustomer("MI001", "Asha")
+    with pytest.raises(HotelError, match="belongs to property GOA, not MIAMI"):
+        miami.addCustomer("GO001", "Ravi")
+    with pytest.raises(HotelError, match="matches no property's prefix"):
+        miami.addCustomer("XX001", "Ravi")
+    assert router.hotelFor("GO001").addCustomer("GO001", "Ravi")[0] == "GO001"
+
+
+def test_open_balance_is_net_of_bills(router):
+    goa = router.hotel("GOA")
+    goa.addCustomer("GO001", "Ravi")
+    goa.charge("RESTAURANT", "GO001", 1, 2)
+    goa.bill("GO001", save=True)
+    goa.charge("GAMING", "GO001", 3, 1)
+    row, err = groupSummary(router)["GOA"]
+    assert err is None
+    assert (row["open_balance"], row["bills"], row["billed"]) == (250, 1, 600)
+
+
+@pytest.mark.parametrize("error", [PoolTimeout("no connection"), MigrationError("bad CIDs")])
+def test_one_failing_property_does_not_abort_the_report(router, error):
+    def summary(name, pool):
+        if name == "GOA":
+            raise error
+        return name
+
+    results = router.fanOut(summary)
+    assert results["MIAMI"] == ("MIAMI", None)
+    assert results["GOA"] == (None, error)
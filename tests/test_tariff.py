@@ -0,0 +1,52 @@
+from datetime import date
+
+import hms_tariff
+from hms_tariff import SERVICES, TariffCatalog, main, setPrice, unbilledCharges
+
+GAMING, RESTAURANT = SERVICES.index("GAMING"), SERVICES.index("RESTAURANT")
+
+
+def test_charges_are_priced_and_settled_per_guest(pool):
+    catalog = TariffCatalog.load(pool)
+    assert list(catalog.priceCharges([RESTAURANT, GAMING, GAMING], [2, 4, 99], [3, 2, 1])) == [1500, 800, 0]
+
+    guests, totals, amounts = catalog.settle(
+        ["C2", "C1", "C2", "C1"], [RESTAURANT, GAMING, GAMING, GAMING], [1, 3, 1, 3], [2, 1, 1, 2])
+    assert guests == ["C1", "C2"]
+    assert [list(row) for row in totals] == [[0, 0, 750, 0], [0, 600, 150, 0]]
+    assert list(amounts) == [600, 250, 150, 500]
+
+
+def test_settled_totals_stay_exact_beyond_float_precision():
+    catalog = TariffCatalog([("FASHION", 1, "Shirts", 2 ** 53 + 1)])
+    fashion = SERVICES.index("FASHION")
+    guests, totals, amounts = catalog.settle(["C1", "C1"], [fashion, fashion], [1, 1], [1, 1])
+    assert int(totals[0][fashion]) == 2 ** 54 + 2
+
+
+def test_settle_is_a_dry_run_over_unbilled_charges(pool, hotel, capsys, monkeypatch):
+    for cid in ("C1", "C2"):
+        hotel.addCustomer(cid, cid)
+    hotel.charge("RESTAURANT", "C1", 1, 2)
+    hotel.bill("C1", save=True)
+    hotel.charge("RESTAURANT", "C1", 2, 1)
+    hotel.charge("GAMING", "C2", 3, 1)
+    setPrice(pool, "RESTAURANT", 2, 550)
+
+    with pool.transaction() as cursor:
+        assert unbilledCharges(cursor) == (["C1", "C2"], [RESTAURANT, GAMING], [2, 3], [1, 1], [500, 250])
+        assert unbilledCharges(cursor, date.today())[0] == ["C1", "C2"]
+        assert unbilledCharges(cursor, date(2020, 1, 1))[0] == []
+
+    monkeypatch.setattr(hms_tariff, "ConnectionPool", lambda backend, size: pool)
+    monkeypatch.setattr(pool, "close", lambda: None)
+    main(["--sqlite", "unused.db", "--settle"])
+    out = capsys.readouterr().out
+    assert "C1" in out and "550" in out
+    assert "2 CHARGES FOR 2 GUESTS" in out and "1 DIFFER FROM THE AMOUNT CHARGED" in out
+    assert "DRY RUN" in out
+    with pool.transaction() as cursor:
+        cursor.execute("SELECT AMOUNT FROM LEDGER ORDER BY ENTRY_NO")
+        assert cursor.fetchall() == [(600,), (500,), (250,)]
+        cursor.execute("SELECT RESTAURANTBILL FROM BALANCE WHERE CID = 'C1'")
+        assert cursor.fetchone() == (1100,)